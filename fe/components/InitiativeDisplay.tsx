@@ -135,18 +135,6 @@ const InitiativeDisplay: React.FC<InitiativeDisplayProps> = ({ initialInitiative
         fetchTags();
     }, [apiUrl]);
 
-
-    // --- Pobierz tagi ---
-    useEffect(() => {
-        if (!apiUrl) return;
-        setIsLoading(true);
-        fetch(`${apiUrl}/tags/`)
-            .then(r => r.ok ? r.json() : Promise.reject())
-            .then((data: ApiTag[]) => setAvailableTags(data))
-            .catch(() => setApiError('Nie udało się załadować tagów'))
-            .finally(() => setIsLoading(false));
-    }, [apiUrl]);
-
     // --- Handlery CRUD (logika API bez zmian, ale payload będzie inny) ---
     const refreshDataAndClearMessages = useCallback(() => {
         router.refresh();
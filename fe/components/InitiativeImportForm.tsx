@@ -1,18 +1,28 @@
 // components/InitiativeImportForm.tsx
 'use client'; // Ten komponent potrzebuje interaktywności klienta
 
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { ArrowUpTrayIcon } from '@heroicons/react/24/outline'; // Ikona do przycisku
 
-// Typ dla odpowiedzi z backendu (dostosuj, jeśli Twoja odpowiedź jest inna)
+// Typ dla odpowiedzi z backendu - import działa w tle jako zadanie (ImportJob)
 interface ImportResponse {
+    id?: string;
+    status?: 'PENDING' | 'RUNNING' | 'COMPLETED' | 'FAILED' | 'CANCELLED';
+    status_url?: string;
     message: string;
-    imported_count?: number; // Opcjonalne, jeśli API zwraca
+    rows_total?: number | null;
+    rows_processed?: number;
+    imported_count?: number;
+    skipped_count?: number;
     skipped_rows?: Array<{ row: number; reason: string }>;
+    throughput?: number | null; // Wiersze na sekundę
+    eta_seconds?: number | null;
     errors?: string[]; // Dla ogólnych błędów
     error?: string; // Dla prostszych błędów
 }
 
+const POLL_INTERVAL_MS = 1000;
+
 interface InitiativeImportFormProps {
     onImportSuccess: () => void; // Funkcja zwrotna po udanym imporcie (do odświeżenia danych)
     apiUrl: string; // Przekazujemy URL API jako prop
@@ -23,6 +33,64 @@ const InitiativeImportForm: React.FC<InitiativeImportFormProps> = ({ onImportSuc
     const [uploadStatus, setUploadStatus] = useState<'idle' | 'uploading' | 'success' | 'error'>('idle');
     const [feedbackMessage, setFeedbackMessage] = useState<string | null>(null);
     const [skippedRows, setSkippedRows] = useState<Array<{ row: number; reason: string }> | null>(null);
+    const [jobUrl, setJobUrl] = useState<string | null>(null);
+    const [upsertMode, setUpsertMode] = useState(false); // Aktualizuj istniejące zamiast dodawać duplikaty
+    const pollTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
+
+    // Zatrzymaj odpytywanie przy odmontowaniu komponentu
+    useEffect(() => () => {
+        if (pollTimer.current) clearTimeout(pollTimer.current);
+    }, []);
+
+    const describeProgress = (job: ImportResponse) => {
+        const total = job.rows_total ? ` z ~${job.rows_total}` : '';
+        const eta = job.eta_seconds != null ? `, pozostało ok. ${Math.ceil(job.eta_seconds)} s` : '';
+        return `Przetworzono ${job.rows_processed ?? 0}${total} wierszy${eta}.`;
+    };
+
+    // Odpytuj endpoint zadania aż do zakończenia importu
+    const pollJob = async (url: string) => {
+        try {
+            const response = await fetch(url);
+            const job: ImportResponse = await response.json();
+            if (!response.ok) {
+                throw new Error(job.error || `Błąd serwera: ${response.statusText} (Status: ${response.status})`);
+            }
+            handleJobUpdate(job, url);
+        } catch (error) {
+            console.error('Błąd importu:', error);
+            setUploadStatus('error');
+            setFeedbackMessage(error instanceof Error ? error.message : "Wystąpił nieoczekiwany błąd podczas importu.");
+            setJobUrl(null);
+        }
+    };
+
+    const handleJobUpdate = (job: ImportResponse, url: string) => {
+        setSkippedRows(job.skipped_rows && job.skipped_rows.length > 0 ? job.skipped_rows : null);
+        if (job.status === 'PENDING' || job.status === 'RUNNING') {
+            setFeedbackMessage(describeProgress(job));
+            pollTimer.current = setTimeout(() => pollJob(url), POLL_INTERVAL_MS);
+            return;
+        }
+        setJobUrl(null);
+        if (job.status === 'COMPLETED') {
+            setUploadStatus('success');
+            setFeedbackMessage(job.message || "Import zakończony pomyślnie.");
+        } else {
+            setUploadStatus('error');
+            setFeedbackMessage(job.error || job.message);
+        }
+        onImportSuccess(); // Odśwież dane - część wierszy mogła zostać zapisana także przy anulowaniu
+    };
+
+    const handleCancel = async () => {
+        if (!jobUrl) return;
+        try {
+            await fetch(jobUrl, { method: 'DELETE' });
+        } catch (error) {
+            console.error('Błąd anulowania importu:', error);
+        }
+    };
 
     const handleFileChange = (event: React.ChangeEvent<HTMLInputElement>) => {
         if (event.target.files && event.target.files.length > 0) {
@@ -57,6 +125,9 @@ const InitiativeImportForm: React.FC<InitiativeImportFormProps> = ({ onImportSuc
 
         const formData = new FormData();
         formData.append('file', selectedFile); // Klucz 'file' musi pasować do oczekiwanego przez backend (parser MultiPartParser)
+        if (upsertMode) {
+            formData.append('mode', 'upsert'); // Dopasowanie po nazwie i podmiocie wdrażającym
+        }
 
         try {
             const response = await fetch(`${apiUrl}/initiatives/import/`, {
@@ -69,14 +140,12 @@ const InitiativeImportForm: React.FC<InitiativeImportFormProps> = ({ onImportSuc
 
             const result: ImportResponse = await response.json();
 
-            if (response.ok) {
-                setUploadStatus('success');
-                setFeedbackMessage(result.message || "Import zakończony pomyślnie.");
-                setSkippedRows(result.skipped_rows || null);
-                setSelectedFile(null); // Wyczyść wybór pliku po sukcesie
+            if (response.ok && result.status_url) {
+                setSelectedFile(null); // Wyczyść wybór pliku po przyjęciu pliku
                 // @ts-ignore - reset input value so the same file can be selected again
                 event.target.reset();
-                onImportSuccess(); // Wywołaj funkcję zwrotną (np. do odświeżenia tabeli)
+                setJobUrl(result.status_url);
+                handleJobUpdate(result, result.status_url);
             } else {
                 // Spróbuj wyciągnąć błąd z różnych możliwych pól
                 const errorMessage = result.error || (result.errors ? result.errors.join(', ') : `Błąd serwera: ${response.statusText} (Status: ${response.status})`);
@@ -107,10 +176,23 @@ const InitiativeImportForm: React.FC<InitiativeImportFormProps> = ({ onImportSuc
                         aria-describedby="file_input_help"
                     />
                     <p className="mt-1 text-sm text-gray-500 dark:text-gray-300" id="file_input_help">
-                        Dozwolone formaty: CSV (UTF-8), XLSX. Upewnij się, że plik ma poprawne nagłówki kolumn.
+                        Dozwolone formaty: CSV (UTF-8 lub Windows-1250), XLSX. Upewnij się, że plik ma poprawne nagłówki kolumn.
                     </p>
                 </div>
 
+                <div className="flex items-center">
+                    <input
+                        id="upsert-mode"
+                        type="checkbox"
+                        checked={upsertMode}
+                        onChange={(e) => setUpsertMode(e.target.checked)}
+                        className="w-4 h-4 text-blue-600 bg-gray-100 border-gray-300 rounded focus:ring-blue-500 dark:bg-gray-700 dark:border-gray-600"
+                    />
+                    <label htmlFor="upsert-mode" className="ml-2 text-sm text-gray-900 dark:text-white">
+                        Aktualizuj istniejące inicjatywy (dopasowanie po nazwie i podmiocie)
+                    </label>
+                </div>
+
                 <button
                     type="submit"
                     disabled={!selectedFile || uploadStatus === 'uploading'}
@@ -131,6 +213,15 @@ const InitiativeImportForm: React.FC<InitiativeImportFormProps> = ({ onImportSuc
                         </>
                     )}
                 </button>
+                {jobUrl && (
+                    <button
+                        type="button"
+                        onClick={handleCancel}
+                        className="ml-3 inline-flex items-center px-5 py-2.5 text-sm font-medium text-center text-gray-900 bg-white border border-gray-300 rounded-lg hover:bg-gray-100 focus:ring-4 focus:ring-gray-200 dark:bg-gray-800 dark:text-white dark:border-gray-600 dark:hover:bg-gray-700"
+                    >
+                        Anuluj import
+                    </button>
+                )}
             </form>
 
             {/* Wyświetlanie informacji zwrotnej */}
@@ -2,115 +2,335 @@
 # -*- coding: utf-8 -*-
 
 import os
-import fnmatch
 import re
+import sys
+import time
 import argparse
-from pathlib import Path
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Katalogi pomijane zawsze (przed regułami z .gitignore)
+DEFAULT_IGNORES = ['.git/', '.svn/', '.hg/', '__pycache__/', 'node_modules/', 'venv/', 'env/', '.venv/']
+# Liczba bajtów z początku pliku sprawdzanych przy wykrywaniu plików binarnych
+SNIFF_BYTES = 8192
+# Bajty uznawane za tekst (ASCII drukowalne, białe znaki, wszystko >= 0x80 jako możliwe UTF-8)
+TEXT_BYTES = bytes(range(32, 127)) + b'\n\r\t\f\b\x1b' + bytes(range(128, 256))
+SEPARATOR = '=' * 80
+
+
+def translate_bracket(pattern, start):
+    """
+    Wyrażenie [...] zaczynające się na pozycji start: (zbiór regex, pozycja ']')
+    albo None, gdy nie ma zamykającego ']'. ']' tuż po '[' lub '[!' jest znakiem
+    dosłownym; pozostałe znaki (poza zakresami 'a-z') są escapowane, więc '[' czy
+    '&&' w środku nie tworzą zagnieżdżonych zbiorów.
+    """
+    i, n = start + 1, len(pattern)
+    negate = pattern[i:i + 1] in ('!', '^')
+    if negate:
+        i += 1
+    chars = []
+    while i < n:
+        c = pattern[i]
+        if c == ']' and chars:
+            break
+        if c == '\\' and i + 1 < n:
+            i += 1
+            c = pattern[i]
+        chars.append(c)
+        i += 1
+    else:
+        return None
+    body = []
+    for index, c in enumerate(chars):
+        # '-' między dwoma znakami to zakres, na brzegu - znak dosłowny
+        is_range = c == '-' and 0 < index < len(chars) - 1
+        body.append('-' if is_range else re.escape(c))
+    return '[' + ('^' if negate else '') + ''.join(body) + ']', i
+
+
+def translate_pattern(pattern):
+    """Zamienia wzorzec gitignore (bez '!' i końcowego '/') na wyrażenie regularne."""
+    # Wzorzec ze ukośnikiem na początku lub w środku jest zakotwiczony w katalogu .gitignore
+    anchored = '/' in pattern.rstrip('/')
+    pattern = pattern.lstrip('/') if anchored else pattern
+    out = [] if anchored else ['(?:.*/)?']
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/') and (i + 2 == n or pattern[i + 2] == '/'):
+                # '**/' - dowolna liczba katalogów (także zero), końcowe '/**' - cała zawartość
+                if i + 2 == n:
+                    out.append('.*')
+                    i += 2
+                else:
+                    out.append('(?:.*/)?')
+                    i += 3
+                continue
+            while i < n and pattern[i] == '*':
+                i += 1
+            out.append('[^/]*')
+            continue
+        if c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            bracket = translate_bracket(pattern, i)
+            if bracket is None:
+                out.append(re.escape(c))
+            else:
+                regex, i = bracket
+                out.append(regex)
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
 
 def parse_gitignore(gitignore_path):
     """Parsuje plik .gitignore i zwraca listę wzorców."""
     if not os.path.exists(gitignore_path):
         return []
-    
+
     patterns = []
     with open(gitignore_path, 'r', encoding='utf-8', errors='replace') as f:
         for line in f:
-            line = line.strip()
+            line = line.rstrip('\n').rstrip('\r')
             # Pomijamy puste linie i komentarze
-            if not line or line.startswith('#'):
+            if not line.strip() or line.startswith('#'):
                 continue
-            # Usuwamy ew. ukośnik na końcu
-            if line.endswith('/'):
-                line = line[:-1]
-            patterns.append(line)
+            # Końcowe spacje usuwane, chyba że poprzedzone '\'
+            stripped = line.rstrip(' ')
+            if stripped.endswith('\\') and len(stripped) < len(line):
+                stripped += ' '
+            patterns.append(stripped)
     return patterns
 
-def should_ignore(file_path, ignore_patterns):
-    """Sprawdza, czy plik powinien być zignorowany na podstawie wzorców z .gitignore."""
-    file_path_str = str(file_path)
-    
-    # Konwertujemy wzorce gitignore na wzorce fnmatch
-    for pattern in ignore_patterns:
-        # Obsługa wzorców z gwiazdką
-        if '*' in pattern:
-            pattern = pattern.replace('.', '\\.')
-            pattern = pattern.replace('*', '.*')
-            if re.search(pattern, file_path_str):
-                return True
-        # Wzorce bez gwiazdek
-        elif pattern in file_path_str:
-            return True
-    
-    # Ignoruj binarne pliki i katalogi systemowe
-    binary_extensions = ['.pyc', '.pyo', '.so', '.o', '.a', '.lib', '.dll', '.exe', '.bin', 
-                         '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.ico', '.db', 
-                         '.sqlite', '.pdf', '.zip', '.tar', '.gz', '.rar', '.7z']
-    system_dirs = ['.git', '.svn', '.hg', '__pycache__', 'node_modules', 'venv', 'env', '.venv']
-    
-    # Sprawdź, czy plik ma rozszerzenie binarne
-    if any(file_path_str.endswith(ext) for ext in binary_extensions):
-        return True
-    
-    # Sprawdź, czy ścieżka zawiera katalog systemowy
-    if any(f'/{dir_}/' in file_path_str or file_path_str.startswith(f'{dir_}/') for dir_ in system_dirs):
-        return True
-    
+
+class IgnoreRules:
+    """
+    Reguły jednego pliku .gitignore skompilowane do dwóch wyrażeń (dla plików
+    i katalogów). Alternatywy są w odwrotnej kolejności, więc pierwsza
+    dopasowana to ostatnia pasująca reguła - jak w git (wygrywa ostatnia, '!' neguje).
+    """
+    def __init__(self, patterns, base=''):
+        self.base = base # ścieżka katalogu .gitignore względem korzenia, z '/' na końcu
+        file_rules, dir_rules = [], []
+        for pattern in patterns:
+            negated = pattern.startswith('!')
+            pattern = pattern[1:] if negated else pattern
+            if pattern.startswith('\\'):
+                # '\!' i '\#' na początku to znaki dosłowne
+                pattern = pattern[1:] if pattern[1:2] in ('!', '#') else pattern
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if not pattern:
+                continue
+            rule = (self._translate(pattern), negated)
+            dir_rules.append(rule)
+            if not dir_only:
+                file_rules.append(rule)
+        self._files = self._compile(file_rules)
+        self._dirs = self._compile(dir_rules)
+
+    @staticmethod
+    def _translate(pattern):
+        regex = translate_pattern(pattern)
+        try:
+            # Ostrzeżenia (np. FutureWarning o zagnieżdżonym zbiorze) też jako błąd - przy -W error by nim były
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                re.compile(regex)
+        except (re.error, Warning):
+            # Reguła, której nie da się skompilować, pasuje dosłownie zamiast przerywać całe skanowanie
+            anchored = '/' in pattern
+            regex = ('' if anchored else '(?:.*/)?') + re.escape(pattern.lstrip('/'))
+        return regex
+
+    @staticmethod
+    def _compile(rules):
+        if not rules:
+            return None
+        alternatives = [f'(?P<{"n" if negated else "i"}{index}>{regex})' for index, (regex, negated) in enumerate(reversed(rules))]
+        return re.compile('|'.join(alternatives), re.DOTALL)
+
+    def match(self, rel_path, is_dir):
+        """True (ignoruj), False (wyjątek '!') albo None, gdy żadna reguła nie pasuje."""
+        if not rel_path.startswith(self.base):
+            return None
+        regex = self._dirs if is_dir else self._files
+        match = regex.fullmatch(rel_path[len(self.base):]) if regex else None
+        if match is None:
+            return None
+        return match.lastgroup[0] == 'i'
+
+
+def is_ignored(rel_path, is_dir, rules_stack):
+    # Rozstrzyga najgłębszy .gitignore, który ma pasującą regułę
+    for rules in reversed(rules_stack):
+        decision = rules.match(rel_path, is_dir)
+        if decision is not None:
+            return decision
     return False
 
-def save_file_contents(project_dir, output_file, ignore_patterns):
-    """Zapisuje zawartość wszystkich istotnych plików projektu do pliku tekstowego."""
-    project_path = Path(project_dir)
-    
-    with open(output_file, 'w', encoding='utf-8', errors='replace') as out_f:
-        for root, dirs, files in os.walk(project_path):
-            # Filtrujemy katalogi, które należy zignorować
-            dirs[:] = [d for d in dirs if not should_ignore(Path(root) / d, ignore_patterns)]
-            
-            for file in files:
-                file_path = Path(root) / file
-                rel_path = file_path.relative_to(project_path)
-                
-                # Sprawdź, czy plik powinien być zignorowany
-                if should_ignore(rel_path, ignore_patterns):
-                    continue
-                
-                # Zapisz zawartość pliku
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                        content = f.read()
-                    
-                    # Dodaj separatory i informacje o pliku
-                    out_f.write(f"\n{'=' * 80}\n")
-                    out_f.write(f"PLIK: {rel_path}\n")
-                    out_f.write(f"{'=' * 80}\n\n")
-                    out_f.write(content)
-                    out_f.write("\n\n")
-                except Exception as e:
-                    out_f.write(f"\n{'=' * 80}\n")
-                    out_f.write(f"PLIK: {rel_path}\n")
-                    out_f.write(f"{'=' * 80}\n\n")
-                    out_f.write(f"Nie można odczytać pliku: {str(e)}\n\n")
+
+def walk(directory, rel_dir, rules_stack, skip_files):
+    """
+    Przechodzi drzewo przez os.scandir w stałej kolejności (pliki, potem
+    podkatalogi, alfabetycznie) i zwraca (ścieżka względna, ścieżka, rozmiar).
+    Zignorowane katalogi nie są odwiedzane; .gitignore z podkatalogów działają
+    tak jak w git.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+
+    if any(entry.name == '.gitignore' for entry in entries):
+        patterns = parse_gitignore(os.path.join(directory, '.gitignore'))
+        if patterns:
+            rules_stack = rules_stack + [IgnoreRules(patterns, rel_dir)]
+
+    subdirs = []
+    for entry in entries:
+        rel_path = rel_dir + entry.name
+        try:
+            # Dowiązania do katalogów nie są odwiedzane (pętle)
+            if entry.is_dir(follow_symlinks=False):
+                if not is_ignored(rel_path, True, rules_stack):
+                    subdirs.append(entry)
+                continue
+            if not entry.is_file() or is_ignored(rel_path, False, rules_stack):
+                continue
+            stat = entry.stat()
+            if (stat.st_dev, stat.st_ino) in skip_files:
+                continue
+            yield rel_path, entry.path, stat.st_size
+        except OSError:
+            continue
+    for entry in subdirs:
+        yield from walk(entry.path, rel_dir + entry.name + '/', rules_stack, skip_files)
+
+
+def is_binary(chunk):
+    """Plik uznajemy za binarny, gdy ma bajt NUL lub ponad 30% bajtów spoza tekstu."""
+    if not chunk:
+        return False
+    if b'\0' in chunk:
+        return True
+    return len(chunk.translate(None, TEXT_BYTES)) / len(chunk) > 0.3
+
+
+def read_file(path, size, max_size):
+    """Odczyt w wątku roboczym; zwraca (status, treść): 'text', 'binary', 'too_large' lub 'error'."""
+    if max_size is not None and size > max_size:
+        return 'too_large', f'Pominięto: plik ma {size} bajtów (limit --max-size: {max_size})\n'
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+            if is_binary(head):
+                return 'binary', None
+            data = head + f.read()
+    except OSError as e:
+        return 'error', f'Nie można odczytać pliku: {e}\n'
+    return 'text', data.decode('utf-8', errors='replace')
+
+
+def parse_size(value):
+    """Rozmiar w bajtach, z opcjonalnym przyrostkiem K, M lub G (np. 512K, 2M)."""
+    match = re.fullmatch(r'\s*(\d+)\s*([kKmMgG]?)[bB]?\s*', value)
+    if not match:
+        raise argparse.ArgumentTypeError(f'Nieprawidłowy rozmiar: {value}')
+    number, unit = match.groups()
+    return int(number) * 1024 ** ' KMG'.index(unit.upper() or ' ')
+
+
+def save_file_contents(project_dir, out_f, jobs=None, max_size=None, skip_files=(), flush=False):
+    """
+    Zapisuje zawartość wszystkich istotnych plików projektu do pliku tekstowego.
+
+    Pliki są czytane równolegle w puli wątków, ale zapisywane w kolejności
+    przejścia drzewa; w toku jest co najwyżej kilka plików na wątek, więc
+    pamięć nie rośnie z rozmiarem drzewa. Zwraca słownik ze statystykami.
+    """
+    jobs = jobs or min(32, (os.cpu_count() or 1) + 4)
+    files = walk(project_dir, '', [IgnoreRules(DEFAULT_IGNORES)], set(skip_files))
+    stats = {'text': 0, 'binary': 0, 'too_large': 0, 'error': 0, 'bytes': 0}
+
+    def write(rel_path, status, content):
+        stats[status] += 1
+        if status == 'binary':
+            return
+        out_f.write(f"\n{SEPARATOR}\n")
+        out_f.write(f"PLIK: {rel_path}\n")
+        out_f.write(f"{SEPARATOR}\n\n")
+        out_f.write(content)
+        out_f.write("\n\n" if status == 'text' else "\n")
+        if status == 'text':
+            stats['bytes'] += len(content)
+        if flush:
+            out_f.flush()
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for rel_path, path, size in files:
+            pending.append((rel_path, pool.submit(read_file, path, size, max_size)))
+            if len(pending) >= jobs * 4:
+                rel, future = pending.popleft()
+                write(rel, *future.result())
+        while pending:
+            rel, future = pending.popleft()
+            write(rel, *future.result())
+    return stats
+
 
 def main():
     parser = argparse.ArgumentParser(description='Zapisuje zawartość plików projektu do pliku tekstowego z uwzględnieniem reguł z .gitignore')
     parser.add_argument('-d', '--directory', default='.', help='Katalog projektu (domyślnie: bieżący katalog)')
-    parser.add_argument('-o', '--output', default='project_files.txt', help='Nazwa pliku wyjściowego (domyślnie: project_files.txt)')
+    parser.add_argument('-o', '--output', default='project_files.txt', help='Nazwa pliku wyjściowego, "-" to standardowe wyjście (domyślnie: project_files.txt)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Liczba wątków czytających pliki (domyślnie: liczba CPU + 4, maks. 32)')
+    parser.add_argument('--max-size', type=parse_size, default=None, help='Pomijaj pliki większe niż podany rozmiar, np. 512K, 2M')
+    parser.add_argument('--stream', action='store_true', help='Zapisuj i opróżniaj bufor po każdym pliku (np. przy potoku z -o -)')
     args = parser.parse_args()
-    
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs musi być dodatnie')
+
     project_dir = args.directory
-    output_file = args.output
-    
-    # Znajdź plik .gitignore w katalogu projektu
+    to_stdout = args.output == '-'
+    # Komunikaty na stderr, gdy wynik idzie na standardowe wyjście
+    log = sys.stderr if to_stdout else sys.stdout
+
+    # .gitignore w katalogu projektu (pliki z podkatalogów wczytuje walk())
     gitignore_path = os.path.join(project_dir, '.gitignore')
     ignore_patterns = parse_gitignore(gitignore_path)
-    
-    print(f"Rozpoczynam skanowanie katalogu: {project_dir}")
-    print(f"Znaleziono {len(ignore_patterns)} wzorców do ignorowania")
-    
-    # Zapisz zawartość plików
-    save_file_contents(project_dir, output_file, ignore_patterns)
-    
-    print(f"Zapisano zawartość plików do: {output_file}")
+
+    print(f"Rozpoczynam skanowanie katalogu: {project_dir}", file=log)
+    print(f"Znaleziono {len(ignore_patterns)} wzorców do ignorowania", file=log)
+
+    start = time.perf_counter()
+    if to_stdout:
+        sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+        stats = save_file_contents(project_dir, sys.stdout, args.jobs, args.max_size, flush=args.stream)
+    else:
+        with open(args.output, 'w', encoding='utf-8', errors='replace') as out_f:
+            # Plik wyjściowy w skanowanym katalogu nie trafia sam do siebie
+            output_stat = os.fstat(out_f.fileno())
+            skip_files = {(output_stat.st_dev, output_stat.st_ino)}
+            stats = save_file_contents(project_dir, out_f, args.jobs, args.max_size, skip_files, flush=args.stream)
+
+    print(
+        f"Zapisano {stats['text']} plików ({stats['bytes']} znaków) w {time.perf_counter() - start:.2f} s; "
+        f"pominięto binarnych: {stats['binary']}, za dużych: {stats['too_large']}, błędów odczytu: {stats['error']}",
+        file=log,
+    )
+    if not to_stdout:
+        print(f"Zapisano zawartość plików do: {args.output}", file=log)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 
 import os
+
+from django.core.exceptions import ImproperlyConfigured
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,6 +53,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    # Czas, zapytania SQL i rozmiar każdej odpowiedzi (nagłówek Server-Timing, logi, /api/_metrics/)
+    'initiatives.instrumentation.PerformanceMiddleware',
+    # Kompresja zstd/gzip wg Accept-Encoding (pod pomiarami - mierzony rozmiar po kompresji)
+    'initiatives.compression.CompressionMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -93,12 +99,57 @@ WSGI_APPLICATION = 'initiative_tracker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Profil bazy wybierany zmienną DB_ENGINE: 'sqlite' (domyślnie) lub 'postgres'
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    # Wymaga psycopg[pool] (psycopg 3)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'initiative_tracker'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Sprawdza połączenie przed ponownym użyciem (zerwane po restarcie bazy)
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if os.environ.get('DB_POOL', '1') == '1':
+        # Wbudowana pula psycopg - wyklucza się z CONN_MAX_AGE > 0
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        # Połączenia trwałe: jedno na wątek, utrzymywane przez N sekund
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Zapis blokuje bazę od początku transakcji - zamiast błędu
+                # "database is locked" przy próbie podniesienia blokady czeka busy_timeout
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+    if os.environ.get('SQLITE_TUNING', '1') == '1':
+        # WAL: odczyty nie czekają na zapis, synchronous=NORMAL jest bezpieczne w trybie WAL
+        DATABASES['default']['OPTIONS']['init_command'] = ';'.join([
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+            f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        ])
 
 
 # Password validation
@@ -141,6 +192,83 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 UPLOAD_URL = '/upload/'
 UPLOAD_ROOT = os.path.join(BASE_DIR, 'upload')
 
+# Import inicjatyw z plików CSV/XLSX
+# Liczba wierszy zapisywanych jednym bulk_create
+INITIATIVE_IMPORT_BATCH_SIZE = int(os.environ.get('INITIATIVE_IMPORT_BATCH_SIZE', 1000))
+# Import działa w tle w puli wątków procesu (bez zewnętrznego brokera)
+INITIATIVE_IMPORT_ASYNC = os.environ.get('INITIATIVE_IMPORT_ASYNC', '1') == '1'
+INITIATIVE_IMPORT_WORKERS = int(os.environ.get('INITIATIVE_IMPORT_WORKERS', 2))
+# Procesy mapujące i walidujące wiersze (1 = bez puli procesów)
+INITIATIVE_IMPORT_PROCESSES = int(os.environ.get('INITIATIVE_IMPORT_PROCESSES', os.cpu_count() or 1))
+
+# Cache odpowiedzi API (initiatives/cache.py)
+# Wersje zakresów (unieważnianie) muszą być wspólne dla wszystkich procesów workerów -
+# locmem jest osobny dla każdego procesu, więc dozwolony tylko przy DEBUG (jeden proces serwera
+# deweloperskiego). Domyślnie poza DEBUG: cache plikowy we wspólnym katalogu API_CACHE_LOCATION.
+API_CACHE_BACKEND = os.environ.get('API_CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+if API_CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('API_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        }
+    }
+elif API_CACHE_BACKEND == 'locmem' and DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'initiative-api',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f'API_CACHE_BACKEND={API_CACHE_BACKEND!r}: dozwolone "file" lub "locmem" (tylko przy DEBUG).'
+    )
+# Czas życia zapisanej odpowiedzi w sekundach (unieważnianie i tak następuje przy zapisie)
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+
+# Kolumnowa migawka inicjatyw w pamięci procesu dla /api/initiatives/crosstab/
+# (initiatives/snapshot.py, wymaga NumPy - bez niego zliczanie w SQL)
+INITIATIVE_SNAPSHOT = os.environ.get('INITIATIVE_SNAPSHOT', '1') == '1'
+
+# Kompresja odpowiedzi (initiatives/compression.py; zstd wymaga pakietu zstandard)
+API_COMPRESSION = os.environ.get('API_COMPRESSION', '1') == '1'
+# Odpowiedzi krótsze niż tyle bajtów wysyłane bez kompresji (strumienie zawsze kompresowane)
+API_COMPRESSION_MIN_SIZE = int(os.environ.get('API_COMPRESSION_MIN_SIZE', 1024))
+
+# Pomiary wydajności żądań (initiatives/instrumentation.py)
+PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', '1') == '1'
+# Żądanie oznaczane w logu, gdy wykona więcej zapytań SQL niż tyle...
+PERF_QUERY_THRESHOLD = int(os.environ.get('PERF_QUERY_THRESHOLD', 50))
+# ...powtórzy to samo zapytanie co najmniej tyle razy (N+1)...
+PERF_DUPLICATE_QUERY_THRESHOLD = int(os.environ.get('PERF_DUPLICATE_QUERY_THRESHOLD', 10))
+# ...albo będzie trwało dłużej niż tyle milisekund
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', 1000))
+# Adresy IP (po przecinku), z których wolno pobierać /api/_metrics/, np. serwer Prometheusa;
+# domyślnie żadne - tylko zalogowani administratorzy. Sprawdzany jest REMOTE_ADDR, więc za reverse
+# proxy nie wpisuj adresu proxy (ani 127.0.0.1, gdy proxy działa lokalnie) - każde żądanie z zewnątrz
+# przychodziłoby z niego
+PERF_METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.environ.get('PERF_METRICS_ALLOWED_IPS', '').split(',') if ip.strip()
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Jedna linia JSON na żądanie (INFO), oznaczone żądania jako WARNING
+        'initiatives.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERF_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,11 +1,84 @@
 # initiatives/admin.py
-from django.contrib import admin
-from .models import Initiative, Tag
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import SCOPE_INITIATIVES, SCOPE_TAGS, invalidate
+from .models import ImportJob, Initiative, Tag
+from .pagination import EstimatedCountPaginator
+from .search import matching_ids_sql, query_words
+from .text import clean_tag_name, tag_key
+
+# Rozmiar paczki id w akcjach zbiorczych (limit parametrów SQLite)
+ACTION_BATCH_SIZE = 500
+
+
+def pk_batches(queryset):
+    """Lists of the queryset's pks in pk order, one query per batch (without loading all ids at once)."""
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while batch := list((pks if last is None else pks.filter(pk__gt=last))[:ACTION_BATCH_SIZE]):
+        yield batch
+        last = batch[-1]
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ('name',)
-    search_fields = ('name',)
+    list_display = ('name', 'key')
+    search_fields = ('name', 'key')
+
+
+class TagFilter(admin.SimpleListFilter):
+    """
+    Tag filter with a text field (suggestions from /api/tags/autocomplete/)
+    instead of a link for every tag. Matches the tag id or the canonical
+    key of the name, with EXISTS instead of a DISTINCT join.
+    """
+    title = 'tag'
+    parameter_name = 'tag'
+    template = 'admin/initiatives/tag_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        condition = Q(tag__key=tag_key(value))
+        if value.isdigit():
+            condition |= Q(tag_id=int(value))
+        through = Initiative.tags.through
+        return queryset.filter(Exists(through.objects.filter(condition, initiative_id=OuterRef('pk'))))
+
+    def choices(self, changelist):
+        yield {
+            'parameter_name': self.parameter_name,
+            'value': self.value() or '',
+            'autocomplete_url': reverse('tag-autocomplete'),
+            # Pozostałe parametry listy zachowane przy wysłaniu formularza
+            'hidden_params': [
+                (name, value)
+                for name, values in changelist.params.items()
+                if name != self.parameter_name
+                for value in (values if isinstance(values, list) else [values])
+            ],
+            'clear_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+
+class InitiativeActionForm(ActionForm):
+    tag = forms.CharField(required=False, label='Tag (dla akcji tagów)')
+
 
 @admin.register(Initiative)
 class InitiativeAdmin(admin.ModelAdmin):
@@ -23,10 +96,10 @@ class InitiativeAdmin(admin.ModelAdmin):
         'entity_status',
         'implementation_area',
         'funding_source',
-        'tags',
+        TagFilter,
         'created_at'
     )
-    # Wyszukujemy w odpowiednich polach
+    # Wyszukujemy w odpowiednich polach (z indeksem pełnotekstowym - patrz get_search_results)
     search_fields = (
         'name',
         'acronym',
@@ -34,7 +107,16 @@ class InitiativeAdmin(admin.ModelAdmin):
         'location_text',
         'description'
     )
-    filter_horizontal = ('tags',) # Dla wygody edycji tagów
+    autocomplete_fields = ('tags',) # Tagi podpowiadane zamiast ładowania wszystkich
+
+    # Duże tabele: bez drugiego COUNT(*) całej tabeli, liczba wyników szacowana,
+    # sortowanie zgodne z indeksem initiative_keyset_idx (-created_at, id)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    ordering = ('-created_at', 'id')
+    sortable_by = ('created_at',)
+    action_form = InitiativeActionForm
+    actions = ['add_tag', 'remove_tag']
 
     # Organizacja formularza w panelu admina
     fieldsets = (
@@ -50,4 +132,104 @@ class InitiativeAdmin(admin.ModelAdmin):
     # Nie definiujemy 'fields', jeśli używamy 'fieldsets'
 
     # Można dodać pola tylko do odczytu w adminie (np. daty)
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = query_words(search_term)
+        sql = matching_ids_sql(terms) if terms else None
+        if sql is None:
+            return super().get_search_results(request, queryset, search_term)
+        # Podzapytanie po id - bez złączeń, więc bez duplikatów
+        return queryset.filter(pk__in=RawSQL(*sql)), False
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if not self.has_change_permission(request):
+            return actions
+        for code, label in Initiative.ENTITY_STATUS_CHOICES:
+            name = f'set_entity_status_{code.lower()}'
+            actions[name] = (self.entity_status_action(code), name, f'Ustaw status podmiotu: {label}')
+        return actions
+
+    @staticmethod
+    def entity_status_action(code):
+        def set_entity_status(modeladmin, request, queryset):
+            count = 0
+            with transaction.atomic():
+                now = timezone.now()
+                for batch in pk_batches(queryset):
+                    # Jedno UPDATE na paczkę zamiast save() każdego obiektu; updated_at ręcznie (auto_now nie działa)
+                    count += Initiative.objects.filter(pk__in=batch).update(entity_status=code, updated_at=now)
+                    modeladmin.log_changes(request, batch, f'Zmieniono status podmiotu na {code} (akcja zbiorcza).')
+                invalidate(SCOPE_INITIATIVES)
+            modeladmin.message_user(request, f'Zmieniono status {count} inicjatyw.', messages.SUCCESS)
+        return set_entity_status
+
+    def log_changes(self, request, pks, message):
+        """One CHANGE LogEntry per initiative, bulk inserted (log_change() for set-wise actions)."""
+        LogEntry.objects.log_actions(
+            user_id=request.user.pk,
+            queryset=Initiative.objects.filter(pk__in=pks).only('pk', 'name'),
+            action_flag=CHANGE,
+            change_message=message,
+        )
+
+    def delete_queryset(self, request, queryset):
+        # Wywoływane przez delete_selected po stronie potwierdzenia (z wpisami LogEntry).
+        # Usuwanie paczkami po pk (limit parametrów SQLite, bez wczytywania wszystkich id);
+        # sygnały post_delete aktualizują indeks wyszukiwania i cache
+        with transaction.atomic():
+            pks = queryset.order_by('pk').values_list('pk', flat=True)
+            while batch := list(pks[:ACTION_BATCH_SIZE]):
+                Initiative.objects.filter(pk__in=batch).delete()
+
+    def action_tag(self, request):
+        name = clean_tag_name(request.POST.get('tag', ''))
+        if not name:
+            self.message_user(request, 'Podaj nazwę tagu w polu "Tag".', messages.ERROR)
+        return name
+
+    @admin.action(description='Dodaj tag do zaznaczonych inicjatyw', permissions=['change'])
+    def add_tag(self, request, queryset):
+        name = self.action_tag(request)
+        if not name:
+            return
+        through = Initiative.tags.through
+        added = 0
+        with transaction.atomic():
+            tag, _ = Tag.objects.get_or_create(key=tag_key(name), defaults={'name': name})
+            for batch in pk_batches(queryset):
+                tagged = set(through.objects.filter(initiative_id__in=batch, tag=tag).values_list('initiative_id', flat=True))
+                links = through.objects.bulk_create([
+                    through(initiative_id=pk, tag_id=tag.pk) for pk in batch if pk not in tagged
+                ])
+                added += len(links)
+                if links:
+                    self.log_changes(request, [link.initiative_id for link in links], f'Dodano tag "{tag.name}" (akcja zbiorcza).')
+            invalidate(SCOPE_INITIATIVES, SCOPE_TAGS)
+        # Liczone tylko nowe powiązania - inicjatywy z tym tagiem już wcześniej pomijane
+        self.message_user(request, f'Dodano tag "{tag.name}" do {added} inicjatyw.', messages.SUCCESS)
+
+    @admin.action(description='Usuń tag z zaznaczonych inicjatyw', permissions=['change'])
+    def remove_tag(self, request, queryset):
+        name = self.action_tag(request)
+        if not name:
+            return
+        through = Initiative.tags.through
+        removed = 0
+        with transaction.atomic():
+            for batch in pk_batches(queryset):
+                links = through.objects.filter(initiative_id__in=batch, tag__key=tag_key(name))
+                tagged = list(links.values_list('initiative_id', flat=True))
+                if not tagged:
+                    continue
+                removed += through.objects.filter(pk__in=links.values('pk')).delete()[0]
+                self.log_changes(request, tagged, f'Usunięto tag "{name}" (akcja zbiorcza).')
+            invalidate(SCOPE_INITIATIVES, SCOPE_TAGS)
+        self.message_user(request, f'Usunięto tag z {removed} inicjatyw.', messages.SUCCESS)
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'status', 'rows_processed', 'imported_count', 'skipped_count', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = [field.name for field in ImportJob._meta.fields]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class InitiativesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'initiatives'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - rejestracja odbiorników sygnałów
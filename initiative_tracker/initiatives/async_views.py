@@ -0,0 +1,104 @@
+# initiatives/async_views.py
+"""
+Native async variants of the hot read endpoints, served under /api/async/.
+
+DRF views are synchronous, so under ASGI every request to them runs in a
+worker thread. These are plain async Django views on the async ORM
+(aiterator, aget, aaggregate); with the async-capable middleware stack
+(PerformanceMiddleware included) the request stays on the event loop
+and only the queries themselves go to Django's database thread.
+
+The responses are byte-identical to the compact JSON of the sync
+endpoints (fast_serializers), use the same filters, sparse fieldsets
+(?fields= / ?exclude=), keyset pagination and response cache.
+?expand=tags and other renderers are only available on the sync
+endpoints.
+"""
+from functools import wraps
+
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from .cache import SCOPE_INITIATIVES, SCOPE_TAGS, acached_read
+from .facets import afacet_counts
+from .fast_serializers import (
+    atag_ids_by_initiative, encode_json, requested_fields, requested_tag_fields, serialize_rows, values_fields,
+)
+from .filters import InitiativeFilterBackend
+from .models import Initiative, Tag
+from .pagination import KeysetPagination
+
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def json_response(data, status=200):
+    return HttpResponse(encode_json(data), content_type=JSON_CONTENT_TYPE, status=status)
+
+
+def async_api_view(view):
+    """
+    GET-only async view receiving a DRF Request (query_params for the
+    shared filter and pagination classes); APIException becomes a JSON error.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            return await view(Request(request), *args, **kwargs)
+        except APIException as e:
+            # Ten sam kształt co domyślny exception handler DRF
+            data = e.detail if isinstance(e.detail, (dict, list)) else {'detail': e.detail}
+            return json_response(data, status=e.status_code)
+    return wrapper
+
+
+def filtered_initiatives(request):
+    queryset = Initiative.objects.order_by('-created_at', 'id')
+    return InitiativeFilterBackend().filter_queryset(request, queryset, None)
+
+
+@async_api_view
+@acached_read(SCOPE_INITIATIVES, SCOPE_TAGS)
+async def initiative_list(request):
+    fields = requested_fields(request)
+    queryset = filtered_initiatives(request).values(*values_fields(fields))
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    if page is not None:
+        tag_ids = await atag_ids_by_initiative([row['id'] for row in page]) if 'tags' in fields else {}
+        return json_response(paginator.get_paginated_data(serialize_rows(page, tag_ids, fields)))
+    # Bez paginacji dwa zapytania: wiersze porcjami, potem tagi z podzapytaniem powtarzającym filtry
+    rows = [row async for row in queryset.aiterator(chunk_size=2000)]
+    tag_ids = await atag_ids_by_initiative(queryset) if 'tags' in fields else {}
+    return json_response(serialize_rows(rows, tag_ids, fields))
+
+
+@async_api_view
+@acached_read(SCOPE_INITIATIVES, SCOPE_TAGS)
+async def initiative_detail(request, pk):
+    fields = requested_fields(request)
+    try:
+        row = await Initiative.objects.values(*values_fields(fields)).aget(pk=pk)
+    except Initiative.DoesNotExist:
+        return json_response({'detail': 'No Initiative matches the given query.'}, status=404)
+    tag_ids = await atag_ids_by_initiative([pk]) if 'tags' in fields else {}
+    return json_response(serialize_rows([row], tag_ids, fields)[0])
+
+
+@async_api_view
+@acached_read(SCOPE_INITIATIVES, SCOPE_TAGS)
+async def initiative_facets(request):
+    return json_response(await afacet_counts(filtered_initiatives(request)))
+
+
+@async_api_view
+@acached_read(SCOPE_TAGS)
+async def tag_list(request):
+    fields = requested_tag_fields(request)
+    # Tabela ma dwie kolumny - zawsze obie; ?exclude=id,name daje [{}, ...] jak widok synchroniczny
+    tags = Tag.objects.order_by('name').values('id', 'name')
+    return json_response([{name: tag[name] for name in fields} async for tag in tags])
@@ -0,0 +1,78 @@
+# initiatives/autocomplete.py
+"""
+In-process index for tag autocomplete.
+
+Tags are kept in an array sorted by folded name (text.fold), so the tags
+starting with a prefix form one contiguous range found with bisect. The
+usage count of every tag (number of initiatives) is computed once, when
+the index is built. Results of prefixes matching many tags (short ones)
+are memoized, the rest are picked from the range with heapq.
+
+The index is built lazily on first use and rebuilt when the 'tags' cache
+version (cache.py, bumped by signals and bulk writers) differs from the
+one it was built with, so every process notices changes made by others.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+
+from django.db.models import Count
+
+from .cache import SCOPE_TAGS, get_version
+from .models import Tag
+from .text import fold
+
+# Zakresy dłuższe niż tyle tagów są zapamiętywane (np. prefiksy 1-2 znakowe)
+MEMOIZE_RANGE_SIZE = 500
+MAX_MEMOIZED = 2000
+
+
+class TagIndex:
+    def __init__(self, rows):
+        """rows: iterable of (id, name, usage)."""
+        entries = sorted((fold(name), -usage, name, pk) for pk, name, usage in rows)
+        self.keys = [entry[0] for entry in entries]
+        self.tags = [{'id': pk, 'name': name, 'usage': -usage} for _, usage, name, pk in entries]
+        self.memo = {}
+
+    @classmethod
+    def from_database(cls):
+        return cls(Tag.objects.annotate(usage=Count('initiatives')).values_list('id', 'name', 'usage'))
+
+    def complete(self, prefix, limit):
+        """Top `limit` tags starting with the prefix, most used first."""
+        prefix = fold(prefix).strip()
+        memo_key = (prefix, limit)
+        if memo_key in self.memo:
+            return self.memo[memo_key]
+
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff', start)
+        # Przy remisie liczby użyć - alfabetycznie (kolejność w tablicy)
+        positions = heapq.nsmallest(
+            limit, range(start, end), key=lambda position: (-self.tags[position]['usage'], position)
+        )
+        result = [self.tags[position] for position in positions]
+        if end - start > MEMOIZE_RANGE_SIZE and len(self.memo) < MAX_MEMOIZED:
+            self.memo[memo_key] = result
+        return result
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_tag_index():
+    global _index, _index_version
+    version = get_version(SCOPE_TAGS)
+    if _index is None or _index_version != version:
+        with _lock:
+            if _index is None or _index_version != version:
+                _index = TagIndex.from_database()
+                _index_version = version
+    return _index
+
+
+def complete_tags(prefix, limit=10):
+    return get_tag_index().complete(prefix, limit)
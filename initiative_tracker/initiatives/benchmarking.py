@@ -0,0 +1,78 @@
+# initiatives/benchmarking.py
+"""
+Helpers shared by the benchmark management commands.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .models import Initiative, Tag
+from .search import index_initiatives
+
+
+@contextmanager
+def benchmark_database(verbosity=0, test_name=None):
+    """
+    Run the block against a throwaway test database, created and destroyed
+    the same way the test runner does it. The real database is never touched.
+    test_name overrides TEST['NAME'], e.g. a file path instead of SQLite's
+    in-memory test database.
+    """
+    old_name = connection.settings_dict['NAME']
+    if test_name is not None:
+        connection.settings_dict['TEST'] = {**connection.settings_dict['TEST'], 'NAME': test_name}
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def time_calls(func, repeat):
+    """Call func `repeat` times and return latency stats in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(durations), 2),
+        'p50_ms': round(percentile(durations, 0.5), 2),
+        'p99_ms': round(percentile(durations, 0.99), 2),
+        'mean_ms': round(statistics.fmean(durations), 2),
+    }
+
+
+def populate_initiatives(count, tag_count=200, tags_per_initiative=3, seed=0):
+    """Bulk insert `count` simple initiatives with random tags (and index them)."""
+    rng = random.Random(seed)
+    tags = Tag.objects.bulk_create([Tag(name=f'tag-{i}', key=f'tag-{i}') for i in range(tag_count)])
+    initiatives = Initiative.objects.bulk_create([
+        Initiative(
+            name=f'Inicjatywa {i}',
+            implementing_entity_name=f'Podmiot {i % 500}',
+            entity_status=rng.choice(Initiative.ENTITY_STATUS_CHOICES)[0],
+            implementation_area=rng.choice(Initiative.IMPLEMENTATION_AREA_CHOICES)[0],
+            funding_source=rng.choice(Initiative.FUNDING_SOURCE_CHOICES)[0],
+            description='Opis inicjatywy ' * rng.randint(1, 20),
+        )
+        for i in range(count)
+    ], batch_size=1000)
+    through = Initiative.tags.through
+    through.objects.bulk_create([
+        through(initiative_id=initiative.pk, tag_id=tag.pk)
+        for initiative in initiatives
+        for tag in rng.sample(tags, tags_per_initiative)
+    ], batch_size=5000)
+    # bulk_create nie wysyła sygnałów - indeks wyszukiwania uzupełniany ręcznie
+    index_initiatives(initiatives)
+    return initiatives
@@ -0,0 +1,187 @@
+# initiatives/cache.py
+"""
+Response cache for read endpoints with version-based invalidation.
+
+Each scope ('initiatives', 'tags') has a version number in the cache.
+Signals (see signals.py) and bulk writers bump it, which makes every
+cached response of that scope unreachable at once. The ETag is derived
+from the cache key (scope versions + normalized request), so a matching
+If-None-Match is answered with 304 before anything is queried or
+serialized.
+
+The versions must be shared by all worker processes, so outside DEBUG
+the settings use the file-based backend (API_CACHE_BACKEND=file) and
+refuse the per-process locmem one.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .instrumentation import timed
+
+SCOPE_INITIATIVES = 'initiatives'
+SCOPE_TAGS = 'tags'
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope):
+    return f'api-cache:version:{scope}'
+
+
+def _initial_version():
+    # Wersja startowa z zegara - po wyrzuceniu klucza z cache nie wróci
+    # żadna wcześniej użyta wersja (i zapisane pod nią odpowiedzi)
+    return time.time_ns() // 1000
+
+
+def get_version(scope):
+    cache = get_cache()
+    version = cache.get(_version_key(scope))
+    if version is None:
+        cache.add(_version_key(scope), _initial_version(), timeout=None)
+        version = cache.get(_version_key(scope))
+    return version
+
+
+def bump_version(*scopes):
+    """Invalidate all cached responses of the given scopes."""
+    cache = get_cache()
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError: # Klucz jeszcze nie istnieje lub został wyrzucony
+            cache.set(_version_key(scope), _initial_version(), timeout=None)
+
+
+def invalidate(*scopes):
+    """
+    Bump the scopes now and once more after the surrounding transaction
+    commits, so a response cached from pre-commit data in between is
+    not served afterwards.
+    """
+    bump_version(*scopes)
+    transaction.on_commit(lambda: bump_version(*scopes))
+
+
+def build_cache_key(request, scopes, view_kwargs):
+    versions = ','.join(f'{scope}={get_version(scope)}' for scope in scopes)
+    # Kolejność parametrów i puste wartości nie zmieniają odpowiedzi
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    raw = '|'.join([
+        versions,
+        request.path,
+        getattr(request, 'accepted_media_type', None) or '',
+        repr(sorted(view_kwargs.items())),
+        repr(params),
+    ])
+    return 'api-cache:response:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _render(view, request, response):
+    """Render a DRF Response the same way finalize_response would."""
+    if isinstance(response, Response):
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = view.get_renderer_context()
+        with timed('render'):
+            response.render()
+    return response
+
+
+def _lookup(request, scopes, view_kwargs):
+    """(key, etag, cached entry or None, 304 response or None)."""
+    key = build_cache_key(request, scopes, view_kwargs)
+    etag = f'"{key.rsplit(":", 1)[1][:20]}"'
+    entry = get_cache().get(key)
+    not_modified = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=entry['last_modified'] if entry else None,
+    )
+    return key, etag, entry, not_modified
+
+
+def _store(key, response, modified):
+    entry = {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'last_modified': int(modified.timestamp()) if modified else None,
+    }
+    get_cache().set(key, entry, getattr(settings, 'API_CACHE_TIMEOUT', 300))
+    return entry
+
+
+def _finish(response, etag, entry):
+    if response is None:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['ETag'] = etag
+    if entry['last_modified'] is not None:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    return response
+
+
+def cached_read(*scopes, last_modified=None):
+    """
+    Cache successful GET responses of a view method.
+
+    last_modified: optional callable (view, request, **kwargs) -> datetime,
+    evaluated only when the response is built, stored with it and sent as
+    Last-Modified.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            key, etag, entry, not_modified = _lookup(request, scopes, kwargs)
+            if not_modified is not None:
+                return not_modified
+
+            response = None
+            if entry is None:
+                response = _render(self, request, method(self, request, *args, **kwargs))
+                if response.status_code != 200 or response.streaming:
+                    return response
+                modified = last_modified(self, request, **kwargs) if last_modified else None
+                entry = _store(key, response, modified)
+            return _finish(response, etag, entry)
+        return wrapper
+    return decorator
+
+
+def acached_read(*scopes):
+    """
+    cached_read for async function views returning HttpResponse (ETag
+    only). The cache backend is called directly: locmem and file caches
+    do no network I/O.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key, etag, entry, not_modified = _lookup(request, scopes, kwargs)
+            if not_modified is not None:
+                return not_modified
+
+            response = None
+            if entry is None:
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                entry = _store(key, response, None)
+            return _finish(response, etag, entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,172 @@
+# initiatives/compression.py
+"""
+Response compression negotiated from Accept-Encoding: zstd when the
+zstandard package is installed and the client accepts it, otherwise gzip.
+
+Responses shorter than API_COMPRESSION_MIN_SIZE are sent as they are.
+Streaming responses (exports) are compressed on the fly; the compressor
+is flushed every STREAM_FLUSH_BYTES of input, so the client receives data
+progressively without a flush per CSV row. HTML is never compressed
+(BREACH - admin pages carry CSRF tokens), and neither are formats that
+are compressed already (xlsx, archives, images).
+"""
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .instrumentation import timed
+
+try:
+    import zstandard
+except ImportError: # Opcjonalna zależność - bez niej tylko gzip
+    zstandard = None
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Ile bajtów wejścia strumienia zbierać przed opróżnieniem kompresora
+STREAM_FLUSH_BYTES = 64 * 1024
+# Typy treści pomijane (już skompresowane lub HTML z tokenem CSRF)
+SKIPPED_CONTENT_TYPES = (
+    'text/html', 'image/', 'audio/', 'video/', 'application/zip', 'application/gzip',
+    'application/zstd', 'application/vnd.openxmlformats',
+)
+
+
+def available_encodings():
+    """Supported codings in order of preference."""
+    return ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """Best coding for an Accept-Encoding header (q-values respected), or None."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available_encodings():
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        # Przy równych q wygrywa kolejność available_encodings()
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(encoding, data):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # 31: nagłówek gzip
+    return compressor.compress(data) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental compressor; feed() returns whatever output is ready."""
+    def __init__(self, encoding):
+        if encoding == 'zstd':
+            self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self.flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.flush_mode = zlib.Z_SYNC_FLUSH
+        self.pending = 0
+
+    def feed(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        output = self.compressor.compress(chunk)
+        self.pending += len(chunk)
+        if self.pending >= STREAM_FLUSH_BYTES:
+            output += self.compressor.flush(self.flush_mode)
+            self.pending = 0
+        return output
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def compress_stream(encoding, chunks):
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        output = compressor.feed(chunk)
+        if output:
+            yield output
+    yield compressor.finish()
+
+
+async def acompress_stream(encoding, chunks):
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        output = compressor.feed(chunk)
+        if output:
+            yield output
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Works in both sync (WSGI) and async (ASGI) handler chains, like PerformanceMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not getattr(settings, 'API_COMPRESSION', True) or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(SKIPPED_CONTENT_TYPES):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        # Vary także wtedy, gdy klient nie chce kompresji - pośrednie cache
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(encoding, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(encoding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            with timed('compress'):
+                compressed = compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Skompresowana treść nie jest identyczna bajtowo - ETag słaby (jak GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
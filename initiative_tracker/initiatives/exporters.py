@@ -0,0 +1,89 @@
+# initiatives/exporters.py
+"""
+Streaming export of initiatives to CSV, XLSX and NDJSON.
+
+The column layout is the importer's COLUMN_MAPPING (choice codes, tags as
+a comma separated list), so an exported file can be imported again.
+Rows are read with a server-side .iterator(), tags are fetched per chunk,
+so memory use does not depend on the size of the table.
+"""
+import codecs
+import csv
+import tempfile
+from collections import defaultdict
+from itertools import islice
+
+import openpyxl
+
+from .fast_serializers import encode_json
+from .importer import COLUMN_MAPPING
+from .models import Initiative
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_HEADERS = list(COLUMN_MAPPING)
+EXPORT_FIELDS = list(COLUMN_MAPPING.values())
+VALUE_FIELDS = [field for field in EXPORT_FIELDS if field != 'tags']
+
+
+def iter_export_records(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one dict per initiative: model fields plus 'tags' as a list of names."""
+    rows = queryset.prefetch_related(None).values('id', *VALUE_FIELDS).iterator(chunk_size=chunk_size)
+    through = Initiative.tags.through
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        tag_names = defaultdict(list)
+        links = through.objects.filter(
+            initiative_id__in=[row['id'] for row in chunk]
+        ).order_by('tag_id').values_list('initiative_id', 'tag__name')
+        for initiative_id, name in links:
+            tag_names[initiative_id].append(name)
+        for row in chunk:
+            row['tags'] = tag_names.get(row['id'], [])
+            yield row
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the header and then one list of cell values per initiative."""
+    yield EXPORT_HEADERS
+    for record in iter_export_records(queryset, chunk_size):
+        yield [
+            ', '.join(record['tags']) if field == 'tags' else (record[field] or '')
+            for field in EXPORT_FIELDS
+        ]
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    # BOM - Excel poprawnie rozpozna UTF-8, importer go pomija
+    yield codecs.BOM_UTF8
+    writer = csv.writer(_Echo())
+    for row in iter_export_rows(queryset):
+        yield writer.writerow(row).encode('utf-8')
+
+
+def stream_ndjson(queryset):
+    for record in iter_export_records(queryset):
+        yield encode_json(record) + b'\n'
+
+
+def write_xlsx(queryset):
+    """
+    Write the export with openpyxl's write-only mode into a temporary file
+    and return it rewound; rows are never held in memory together.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Inicjatywy')
+    for row in iter_export_rows(queryset):
+        sheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,57 @@
+# initiatives/facets.py
+"""
+Facet counts for the (filtered) initiative list.
+
+The choice facets and the total come from a single aggregate query with
+one conditional COUNT per choice, tags from one grouped query over the
+through table, so the cost is two queries regardless of the filters.
+"""
+from django.db.models import Count, Q
+
+from .models import Initiative
+
+CHOICE_FACETS = ('entity_status', 'implementation_area', 'funding_source')
+
+
+def facet_queries(queryset):
+    """(aggregate expressions, queryset to aggregate, tag counts queryset)."""
+    queryset = queryset.order_by().prefetch_related(None)
+    aggregates = {'total': Count('pk')}
+    for field_name in CHOICE_FACETS:
+        for code, _ in Initiative._meta.get_field(field_name).choices:
+            aggregates[f'{field_name}:{code}'] = Count('pk', filter=Q(**{field_name: code}))
+
+    through = Initiative.tags.through
+    tag_counts = (
+        through.objects.filter(initiative_id__in=queryset.values('pk'))
+        .values('tag_id', 'tag__name')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'tag__name')
+    )
+    return aggregates, queryset, tag_counts
+
+
+def format_facets(counts, tag_counts):
+    facets = {'total': counts['total']}
+    for field_name in CHOICE_FACETS:
+        facets[field_name] = [
+            {'value': code, 'label': label, 'count': counts[f'{field_name}:{code}']}
+            for code, label in Initiative._meta.get_field(field_name).choices
+        ]
+    facets['tags'] = [
+        {'id': row['tag_id'], 'name': row['tag__name'], 'count': row['count']}
+        for row in tag_counts
+    ]
+    return facets
+
+
+def facet_counts(queryset):
+    aggregates, queryset, tag_counts = facet_queries(queryset)
+    return format_facets(queryset.aggregate(**aggregates), tag_counts)
+
+
+async def afacet_counts(queryset):
+    """facet_counts for async views."""
+    aggregates, queryset, tag_counts = facet_queries(queryset)
+    counts = await queryset.aaggregate(**aggregates)
+    return format_facets(counts, [row async for row in tag_counts])
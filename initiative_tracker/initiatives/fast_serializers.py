@@ -0,0 +1,163 @@
+# initiatives/fast_serializers.py
+"""
+Read-only fast path for initiative list responses.
+
+Rows are fetched with .values(), choice labels come from dicts built once
+at import time, tag ids from one query over the M2M table, and the result
+is encoded with orjson when it is installed. The output is byte-identical
+to InitiativeSerializer rendered by DRF's JSONRenderer.
+
+serialize_columns builds the columnar layout (see ColumnarJSONRenderer)
+straight from the same rows: choice codes in the rows, each label table
+once.
+"""
+import json
+from collections import defaultdict
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .fieldsets import selected_fields
+from .models import Initiative
+from .serializers import InitiativeSerializer, TagSerializer
+
+try:
+    import orjson
+except ImportError: # Opcjonalna zależność - bez niej używamy json ze standardowej biblioteki
+    orjson = None
+
+# Etykiety pól choice, liczone raz zamiast get_*_display dla każdego wiersza
+DISPLAY_FIELDS = {
+    'entity_status_display': ('entity_status', dict(Initiative.ENTITY_STATUS_CHOICES)),
+    'implementation_area_display': ('implementation_area', dict(Initiative.IMPLEMENTATION_AREA_CHOICES)),
+    'funding_source_display': ('funding_source', dict(Initiative.FUNDING_SOURCE_CHOICES)),
+}
+DATETIME_FIELDS = ('created_at', 'updated_at')
+
+# Ta sama kolejność pól co w InitiativeSerializer
+LIST_FIELDS = [field for field in InitiativeSerializer.Meta.fields if field != 'tags_details']
+VALUES_FIELDS = [field for field in LIST_FIELDS if field not in DISPLAY_FIELDS and field != 'tags']
+# Format kolumnowy: bez pól *_display, etykiety (kod -> etykieta) wysyłane raz
+COLUMNAR_FIELDS = [field for field in LIST_FIELDS if field not in DISPLAY_FIELDS]
+LABEL_TABLES = {source: labels for source, labels in DISPLAY_FIELDS.values()}
+# Kolumny potrzebne zawsze: klucz paginacji keyset (-created_at, id)
+KEY_FIELDS = ('id', 'created_at')
+
+
+def requested_fields(request):
+    """LIST_FIELDS narrowed by ?fields= / ?exclude= (validated against InitiativeSerializer)."""
+    kept = selected_fields(request, InitiativeSerializer.Meta.fields)
+    return LIST_FIELDS if kept is None else [field for field in LIST_FIELDS if field in kept]
+
+
+def requested_tag_fields(request):
+    """TagSerializer fields narrowed by ?fields= / ?exclude= (validated like the sync TagViewSet)."""
+    kept = selected_fields(request, TagSerializer.Meta.fields)
+    return TagSerializer.Meta.fields if kept is None else kept
+
+
+def values_fields(fields):
+    """Columns to fetch with .values() for the given output fields (?fields= / ?exclude=)."""
+    needed = {DISPLAY_FIELDS[field][0] if field in DISPLAY_FIELDS else field for field in fields}
+    return [field for field in VALUES_FIELDS if field in needed or field in KEY_FIELDS]
+
+
+def format_datetime(value):
+    """Same output as DRF's DateTimeField with the default ISO 8601 format."""
+    if not value:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def tag_links(initiatives):
+    """(initiative_id, tag_id) pairs of a list of ids or a queryset of initiatives (used as a subquery)."""
+    through = Initiative.tags.through
+    if isinstance(initiatives, QuerySet):
+        links = through.objects.filter(initiative_id__in=initiatives.values('id'))
+    else:
+        links = through.objects.filter(initiative_id__in=initiatives)
+    return links.order_by('initiative_id', 'tag_id').values_list('initiative_id', 'tag_id')
+
+
+def tag_ids_by_initiative(initiatives):
+    """
+    Map initiative id -> sorted tag ids with a single query.
+    Accepts a list of ids or a queryset of initiatives (used as a subquery).
+    """
+    tag_ids = defaultdict(list)
+    for initiative_id, tag_id in tag_links(initiatives):
+        tag_ids[initiative_id].append(tag_id)
+    return tag_ids
+
+
+async def atag_ids_by_initiative(initiatives):
+    """tag_ids_by_initiative for async views (one query, all pairs loaded at once)."""
+    tag_ids = defaultdict(list)
+    # async for pobiera wynik w całości (bez porcji jak aiterator()) - pary id są małe
+    async for initiative_id, tag_id in tag_links(initiatives):
+        tag_ids[initiative_id].append(tag_id)
+    return tag_ids
+
+
+def serialize_rows(rows, tag_ids, fields=LIST_FIELDS):
+    """Turn .values() rows into dicts shaped like InitiativeSerializer output (only `fields`)."""
+    data = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field in DISPLAY_FIELDS:
+                source, labels = DISPLAY_FIELDS[field]
+                item[field] = labels.get(row[source], row[source])
+            elif field == 'tags':
+                item[field] = tag_ids.get(row['id'], [])
+            elif field in DATETIME_FIELDS:
+                item[field] = format_datetime(row[field])
+            else:
+                item[field] = row[field]
+        data.append(item)
+    return data
+
+
+def columnar(items):
+    """
+    Serializer output (list of dicts) -> {'columns', 'labels', 'rows'}:
+    *_display fields are dropped, rows are lists in column order.
+    """
+    items = list(items)
+    columns = [field for field in items[0] if field not in DISPLAY_FIELDS] if items else COLUMNAR_FIELDS
+    return {
+        'columns': columns,
+        'labels': {source: labels for source, labels in LABEL_TABLES.items() if source in columns},
+        'rows': [[item[field] for field in columns] for item in items],
+    }
+
+
+def serialize_columns(rows, tag_ids, fields=LIST_FIELDS):
+    """Turn .values() rows into the columnar layout; same result as columnar(serialize_rows(...))."""
+    columns = [field for field in fields if field not in DISPLAY_FIELDS]
+    data = []
+    for row in rows:
+        values = []
+        for field in columns:
+            if field == 'tags':
+                values.append(tag_ids.get(row['id'], []))
+            elif field in DATETIME_FIELDS:
+                values.append(format_datetime(row[field]))
+            else:
+                values.append(row[field])
+        data.append(values)
+    labels = {source: labels for source, labels in LABEL_TABLES.items() if source in columns}
+    return {'columns': columns, 'labels': labels, 'rows': data}
+
+
+def encode_json(data):
+    """Compact UTF-8 JSON, identical to JSONRenderer with default settings."""
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    # JSONRenderer zawsze escapuje U+2028 i U+2029
+    return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,104 @@
+# initiatives/fieldsets.py
+"""
+Sparse fieldsets: ?fields= and ?exclude= (comma separated) on read endpoints.
+
+SparseFieldsetMixin trims the serializer's fields. SparseFieldsetViewMixin
+pushes the same projection down into the queryset: .only() on the model
+columns the kept fields read, and prefetches of relations no kept field
+reads are dropped, so unused columns and tag queries never run.
+"""
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+# Pola *_display czytają kolumnę pola choice
+DISPLAY_SOURCE = re.compile(r'get_(\w+)_display')
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def selected_fields(request, available):
+    """
+    Names from `available` kept by ?fields= / ?exclude= (in `available`
+    order), or None when neither parameter is given. Unknown names are a 400.
+    """
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXCLUDE_PARAM not in params:
+        return None
+    include = parse_names(params.get(FIELDS_PARAM, ''))
+    exclude = parse_names(params.get(EXCLUDE_PARAM, ''))
+    unknown = [name for name in include + exclude if name not in available]
+    if unknown:
+        raise ValidationError({
+            FIELDS_PARAM if set(unknown) & set(include) else EXCLUDE_PARAM:
+                f'Nieznane pola: {", ".join(unknown)}. Dostępne: {", ".join(available)}.'
+        })
+    return [name for name in available if (not include or name in include) and name not in exclude]
+
+
+def is_sparse_read(request):
+    return request is not None and request.method in SAFE_METHODS
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin dropping the fields not kept by ?fields= / ?exclude= (reads only)."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if not is_sparse_read(request):
+            return
+        kept = selected_fields(request, self.Meta.fields)
+        if kept is not None:
+            for name in [name for name in self.fields if name not in kept]:
+                self.fields.pop(name)
+
+
+def projection(model, fields):
+    """(concrete columns, relation names) of `model` read by bound serializer fields."""
+    columns, relations = set(), set()
+    for field in fields.values():
+        source = field.source.split('.')[0]
+        match = DISPLAY_SOURCE.fullmatch(source)
+        if match:
+            source = match.group(1)
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if model_field.many_to_many or model_field.one_to_many:
+            relations.add(model_field.name)
+        elif model_field.concrete:
+            columns.add(model_field.name)
+    return columns, relations
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin narrowing the queryset of sparse_actions to the fields kept
+    by ?fields= / ?exclude=; required_columns are always loaded (e.g. the
+    pagination key).
+    """
+    sparse_actions = ('list', 'retrieve')
+    required_columns = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.request
+        if (
+            self.action not in self.sparse_actions
+            or not is_sparse_read(request)
+            or selected_fields(request, self.get_serializer_class().Meta.fields) is None
+        ):
+            return queryset
+        columns, relations = projection(queryset.model, self.get_serializer().fields)
+        lookups = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if getattr(lookup, 'prefetch_through', lookup).split('__')[0] in relations
+        ]
+        return queryset.only(*columns, *self.required_columns).prefetch_related(None).prefetch_related(*lookups)
@@ -0,0 +1,109 @@
+# initiatives/filters.py
+import datetime
+
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Initiative
+from .search import matching_ids_sql, query_words
+from .text import tag_key
+
+
+def split_param(value):
+    """'a, b,,c' -> ['a', 'b', 'c']"""
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+def parse_datetime_param(name, value, end_of_day=False):
+    """Accept an ISO date or datetime; naive values are taken in the current time zone."""
+    try:
+        parsed = parse_datetime(value)
+        day = parse_date(value) if parsed is None else None
+    except ValueError:
+        parsed = day = None
+    if parsed is None:
+        if day is None:
+            raise ValidationError({name: f'Nieprawidłowa data: {value}'})
+        parsed = datetime.datetime.combine(day, datetime.time.max if end_of_day else datetime.time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class InitiativeFilterBackend(BaseFilterBackend):
+    """
+    Query parameter filters for initiatives, shared by the list and the
+    endpoints that work on the same filter set.
+
+    - entity_status, implementation_area, funding_source: comma separated codes
+    - tags: comma separated tag ids or names, matches initiatives with any of them
+    - created_after, created_before: ISO date or datetime (inclusive)
+    - search: every word must prefix-match a word of the indexed text
+      (full-text index, see search.py; icontains without an index)
+    """
+    CHOICE_FILTERS = ('entity_status', 'implementation_area', 'funding_source')
+    SEARCH_FIELDS = ('name', 'acronym', 'description')
+
+    @staticmethod
+    def choice_values(params, field_name):
+        """Validated codes of a choice filter ([] when the parameter is not given)."""
+        values = split_param(params.get(field_name))
+        allowed = dict(Initiative._meta.get_field(field_name).choices)
+        invalid = [value for value in values if value not in allowed]
+        if invalid:
+            raise ValidationError({field_name: f'Nieprawidłowe wartości: {", ".join(invalid)}'})
+        return values
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        for field_name in self.CHOICE_FILTERS:
+            values = self.choice_values(params, field_name)
+            if values:
+                queryset = queryset.filter(**{f'{field_name}__in': values})
+
+        tags = split_param(params.get('tags'))
+        if tags:
+            # Identyfikatory albo nazwy (porównywane po kluczu kanonicznym tagu)
+            tag_ids = [int(tag) for tag in tags if tag.isdigit()]
+            tag_keys = [tag_key(tag) for tag in tags if not tag.isdigit()]
+            # EXISTS zamiast JOIN - bez duplikatów i bez DISTINCT
+            through = Initiative.tags.through
+            queryset = queryset.filter(Exists(
+                through.objects.filter(initiative_id=OuterRef('pk')).filter(
+                    Q(tag_id__in=tag_ids) | Q(tag__key__in=tag_keys)
+                )
+            ))
+
+        if params.get('created_after'):
+            queryset = queryset.filter(
+                created_at__gte=parse_datetime_param('created_after', params['created_after'])
+            )
+        if params.get('created_before'):
+            queryset = queryset.filter(
+                created_at__lte=parse_datetime_param('created_before', params['created_before'], end_of_day=True)
+            )
+
+        search = params.get('search', '').strip()
+        if search:
+            queryset = self.search(queryset, search)
+
+        return queryset
+
+    def search(self, queryset, search):
+        terms = query_words(search)
+        if not terms:
+            return queryset
+        sql = matching_ids_sql(terms)
+        if sql is not None:
+            return queryset.filter(pk__in=RawSQL(*sql))
+        for word in search.split():
+            condition = Q()
+            for field_name in self.SEARCH_FIELDS:
+                condition |= Q(**{f'{field_name}__icontains': word})
+            queryset = queryset.filter(condition)
+        return queryset
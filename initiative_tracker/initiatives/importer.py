@@ -0,0 +1,561 @@
+# initiatives/importer.py
+"""
+Batched import engine for initiatives loaded from CSV/XLSX files.
+"""
+import codecs
+import csv
+import hashlib
+import io
+import json
+import mmap
+import multiprocessing
+import operator
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from functools import reduce
+from itertools import chain, islice
+
+import openpyxl # Do obsługi plików XLSX
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import SCOPE_INITIATIVES, SCOPE_TAGS, invalidate
+from .models import ImportJob, Initiative, Tag
+from .row_mapping import map_chunk
+from .search import index_initiatives
+from .text import tag_key
+
+DEFAULT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+# Ile kluczy naturalnych w jednym zapytaniu o istniejące inicjatywy (limit parametrów SQL)
+KEY_LOOKUP_BATCH_SIZE = 400
+
+# Tryby importu
+MODE_CREATE = ImportJob.MODE_CREATE # Każdy wiersz to nowa inicjatywa
+MODE_UPSERT = ImportJob.MODE_UPSERT # Aktualizacja istniejących po kluczu naturalnym, reszta dodawana
+DEFAULT_NATURAL_KEY = ('name', 'implementing_entity_name')
+
+# Oczekiwane nagłówki kolumn (klucz: nagłówek w pliku, wartość: pole w modelu)
+# Upewnij się, że te nagłówki pasują do Twoich plików CSV/XLSX
+COLUMN_MAPPING = {
+    'Nazwa': 'name',
+    'Akronim': 'acronym',
+    'Podmiot wdrażający': 'implementing_entity_name',
+    'Statut podmiotu': 'entity_status',
+    'Obszar wdrażania': 'implementation_area',
+    'Miejsce realizacji': 'location_text',
+    'Strona WWW podmiotu': 'implementing_entity_url',
+    'Opis': 'description',
+    'Timing': 'timing',
+    'Źródło finansowania': 'funding_source',
+    'URL': 'url',
+    'Tagi (oddzielone przecinkiem)': 'tags', # Specjalna obsługa dla tagów
+}
+
+# Pola choice przyjmują w pliku zarówno klucz ('NGO'), jak i etykietę ('Organizacja pozarządowa (NGO)')
+CHOICE_LOOKUPS = {
+    field_name: {
+        text.lower(): code
+        for code, label in Initiative._meta.get_field(field_name).choices
+        for text in (code, label)
+    }
+    for field_name in ('entity_status', 'implementation_area', 'funding_source')
+}
+
+# Pola modelu zapisywane przez import (bez tagów)
+IMPORTED_FIELDS = [field for field in COLUMN_MAPPING.values() if field != 'tags']
+
+REQUIRED_FIELDS = {
+    'name': 'Brak wymaganej nazwy inicjatywy.',
+    'implementing_entity_name': 'Brak nazwy podmiotu wdrażającego.',
+    'entity_status': 'Brak statutu podmiotu.',
+    'implementation_area': 'Brak obszaru wdrażania.',
+    'funding_source': 'Brak źródła finansowania.',
+}
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported (e.g. missing columns)."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_processed = 0
+        self.imported_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.valid_count = 0 # Wiersze poprawne (także w trybie dry_run, gdy nic nie jest zapisywane)
+        self.skipped_rows = []
+
+    def skip(self, row_number, reason):
+        self.skipped_rows.append({'row': row_number, 'reason': reason})
+
+
+class MappedFile(io.RawIOBase):
+    """
+    Read-only raw file backed by mmap. The OS pages the file in on demand
+    and reads are plain memory copies, without a read() syscall per chunk.
+    """
+    def __init__(self, path):
+        self.name = path
+        self._file = open(path, 'rb')
+        # mmap pustego pliku rzuca ValueError
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'): # Linux/macOS, Python 3.8+
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+        else:
+            self._map = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._map is None:
+            return 0
+        data = self._map.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if self._map is None:
+            return 0
+        self._map.seek(offset, whence)
+        return self._map.tell()
+
+    def tell(self):
+        return self._map.tell() if self._map is not None else 0
+
+    def close(self):
+        if not self.closed:
+            if self._map is not None:
+                self._map.close()
+            self._file.close()
+        super().close()
+
+
+def open_mapped(path):
+    """Open a local file for the row readers through a memory map."""
+    # BufferedReader.name zwraca nazwę z MappedFile - potrzebną w read_rows
+    return io.BufferedReader(MappedFile(path), buffer_size=READ_CHUNK_SIZE)
+
+
+def _binary_stream(file_obj):
+    """Return the underlying binary file of a Django upload (temp file or BytesIO)."""
+    stream = getattr(file_obj, 'file', file_obj)
+    # NamedTemporaryFile opakowuje właściwy obiekt pliku
+    return getattr(stream, 'file', stream)
+
+
+def detect_encoding(binary):
+    """
+    Guess the text encoding of a binary stream: BOM first, then a chunked
+    UTF-8 validity check, falling back to cp1250 (Polish Excel exports).
+    """
+    binary.seek(0)
+    head = binary.read(4)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    binary.seek(0)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        while True:
+            chunk = binary.read(READ_CHUNK_SIZE)
+            decoder.decode(chunk, final=not chunk)
+            if not chunk:
+                return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1250'
+
+
+def read_csv_rows(file_obj):
+    """Yield CSV rows, decoding the upload incrementally."""
+    binary = _binary_stream(file_obj)
+    encoding = detect_encoding(binary)
+    binary.seek(0)
+    text = io.TextIOWrapper(binary, encoding=encoding, newline='')
+    try:
+        header_line = text.readline()
+        try:
+            # Eksporty z polskiego Excela często używają średnika
+            delimiter = csv.Sniffer().sniff(header_line, delimiters=',;\t').delimiter
+        except csv.Error:
+            delimiter = ','
+        yield from csv.reader(chain([header_line], text), delimiter=delimiter)
+    finally:
+        # Nie zamykaj pliku uploadu razem z wrapperem
+        text.detach()
+
+
+def read_xlsx_rows(file_obj):
+    """Yield worksheet rows from the first sheet; the workbook is always closed."""
+    workbook = openpyxl.load_workbook(_binary_stream(file_obj), read_only=True, data_only=True)
+    try:
+        sheet = workbook.active # Odczytaj pierwszy arkusz
+        for row in sheet.iter_rows(values_only=True):
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+READERS = {
+    '.csv': read_csv_rows,
+    '.xlsx': read_xlsx_rows,
+}
+
+
+def get_reader(file_name):
+    """Return the row reader for a file name, chosen by its extension."""
+    file_name = file_name.lower()
+    for extension, reader in READERS.items():
+        if file_name.endswith(extension):
+            return reader
+    raise ImportFileError('Nieobsługiwany format pliku. Dozwolone: CSV, XLSX.')
+
+
+def read_rows(file_obj):
+    """Return a row generator for an uploaded or opened file."""
+    return get_reader(file_obj.name)(file_obj)
+
+
+def estimate_row_count(path):
+    """
+    Cheap estimate of the number of data rows, used for progress and ETA.
+    CSV: newline count (quoted multi-line cells are counted twice).
+    XLSX: the sheet dimension stored in the workbook, if present.
+    """
+    if path.lower().endswith('.xlsx'):
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+
+    lines = 0
+    last_chunk = b''
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            lines += chunk.count(b'\n')
+            last_chunk = chunk
+    if last_chunk and not last_chunk.endswith(b'\n'):
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def column_indices(header):
+    """Map expected column names to their positions in the file header."""
+    header = [str(h).strip() if h is not None else '' for h in header]
+    missing = [h for h in COLUMN_MAPPING if h not in header]
+    if missing:
+        raise ImportFileError(f'Brakujące wymagane kolumny w pliku: {", ".join(missing)}')
+    return {col_name: header.index(col_name) for col_name in COLUMN_MAPPING}
+
+
+def parse_mode(value):
+    if not value:
+        return MODE_CREATE
+    if value not in dict(ImportJob.MODE_CHOICES):
+        raise ImportFileError(f'Nieprawidłowy tryb importu: {value}. Dozwolone: {MODE_CREATE}, {MODE_UPSERT}.')
+    return value
+
+
+def parse_natural_key(value):
+    """Parse a comma separated list of model fields used to match existing initiatives."""
+    if not value:
+        return DEFAULT_NATURAL_KEY
+    if isinstance(value, str):
+        value = value.split(',')
+    key = tuple(field.strip() for field in value if field.strip())
+    allowed = [field for field in COLUMN_MAPPING.values() if field != 'tags']
+    invalid = [field for field in key if field not in allowed]
+    if not key or invalid:
+        raise ImportFileError(f'Nieprawidłowy klucz naturalny. Dozwolone pola: {", ".join(allowed)}')
+    return key
+
+
+def content_hash(values, tag_ids):
+    """
+    Hash of the imported content of one initiative: the mapped fields and its
+    tag ids. Empty strings and None are treated as the same value.
+    """
+    payload = [values.get(field) or None for field in IMPORTED_FIELDS]
+    payload.append(sorted(tag_ids))
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def build_row_spec():
+    """
+    Precompute everything the row mapping needs from the model into plain
+    data, so it can be shipped to worker processes.
+    """
+    spec = {}
+    for header_name, model_field in COLUMN_MAPPING.items():
+        if model_field == 'tags':
+            # Długość sprawdzana przy mapowaniu wiersza - tagi są tworzone poza obsługą błędów paczki
+            spec[header_name] = {'field': model_field, 'max_length': Tag._meta.get_field('name').max_length}
+            continue
+        field = Initiative._meta.get_field(model_field)
+        spec[header_name] = {
+            'field': model_field,
+            'null': field.null,
+            'max_length': field.max_length,
+            'required': REQUIRED_FIELDS.get(model_field),
+            'choices': CHOICE_LOOKUPS.get(model_field),
+        }
+    return spec
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class InitiativeImporter:
+    """
+    Imports rows in chunks with a constant number of queries per chunk:
+    tags are resolved with one bulk insert and one lookup, initiatives and
+    their tag links are written with bulk_create.
+
+    With workers > 1 the CPU-bound row mapping runs in a process pool,
+    while this process writes the mapped chunks to the database in order.
+
+    In MODE_UPSERT rows are matched to existing initiatives by natural_key.
+    Rows whose content hash matches the stored data are not written at all,
+    changed ones go through bulk_update with a set-wise tag diff.
+
+    Used by the background import jobs (jobs.py) and by the
+    import_initiatives management command.
+    """
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, on_chunk=None, workers=1,
+                 mode=MODE_CREATE, natural_key=DEFAULT_NATURAL_KEY, dry_run=False):
+        self.batch_size = batch_size
+        # Tylko odczyt i walidacja wierszy, bez zapisu do bazy
+        self.dry_run = dry_run
+        self.workers = workers
+        self.mode = mode
+        self.natural_key = tuple(natural_key)
+        # Wywoływane po każdej paczce z bieżącym wynikiem (postęp, anulowanie)
+        self.on_chunk = on_chunk
+        self.result = ImportResult()
+        self._tag_ids = {} # Cache: klucz tagu (text.tag_key) -> id, współdzielony między paczkami
+
+    def run(self, rows):
+        """Import all rows; the first row is the header."""
+        rows = iter(rows)
+        try:
+            header = next(rows) # Odczytaj nagłówek
+        except StopIteration:
+            raise ImportFileError('Plik jest pusty.')
+        col_indices = column_indices(header)
+
+        # Start=2 bo nagłówek to wiersz 1
+        chunks = chunked(enumerate(rows, start=2), self.batch_size)
+        with closing(self.map_chunks(chunks, col_indices)) as mapped_chunks:
+            for row_count, (prepared, skipped) in mapped_chunks:
+                self.result.skipped_rows.extend(skipped)
+                self.result.valid_count += len(prepared)
+                if prepared and not self.dry_run:
+                    self.resolve_tags(name for _, _, tag_names in prepared for name in tag_names)
+                    self.write_chunk(prepared)
+                self.result.rows_processed += row_count
+                if self.on_chunk:
+                    self.on_chunk(self.result)
+        return self.result
+
+    def map_chunks(self, chunks, col_indices):
+        """
+        Yield (row_count, (prepared, skipped)) for each chunk, in file order.
+        The process pool is only started once the file turns out to have
+        more than one chunk.
+        """
+        spec = build_row_spec()
+        first = next(chunks, None)
+        second = next(chunks, None)
+        chunks = chain([c for c in (first, second) if c is not None], chunks)
+        if self.workers <= 1 or second is None:
+            for chunk in chunks:
+                yield len(chunk), map_chunk(chunk, col_indices, spec)
+            return
+
+        # 'spawn' - procesy robocze nie dziedziczą wątków ani połączeń z bazą
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append((len(chunk), pool.submit(map_chunk, chunk, col_indices, spec)))
+                # Ograniczona liczba paczek w locie - pamięć nie rośnie z rozmiarem pliku
+                if len(pending) >= self.workers * 2:
+                    row_count, future = pending.popleft()
+                    yield row_count, future.result()
+            while pending:
+                row_count, future = pending.popleft()
+                yield row_count, future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def resolve_tags(self, names):
+        """Make sure all tag names exist and are present in the id cache."""
+        missing = {}
+        for name in names:
+            key = tag_key(name)
+            if key not in self._tag_ids:
+                missing.setdefault(key, name)
+        if not missing:
+            return
+        # Tagi istniejące pod tym samym kluczem (np. "Nauka" dla "nauka") są pomijane
+        Tag.objects.bulk_create(
+            [Tag(name=name, key=key) for key, name in missing.items()], ignore_conflicts=True
+        )
+        self._tag_ids.update(Tag.objects.filter(key__in=missing).values_list('key', 'id'))
+
+    def tag_id(self, name):
+        return self._tag_ids[tag_key(name)]
+
+    def write_chunk(self, prepared):
+        if self.mode == MODE_UPSERT:
+            prepared = self.drop_duplicate_keys(prepared)
+            write = self.upsert_rows
+        else:
+            write = self.insert_rows
+        try:
+            with transaction.atomic():
+                counts = write(prepared)
+        except DatabaseError:
+            # Paczka nie przeszła w całości - zapisz wiersze pojedynczo, aby wskazać błędne
+            counts = {}
+            for row_number, initiative_data, tag_names in prepared:
+                try:
+                    with transaction.atomic():
+                        row_counts = write([(row_number, initiative_data, tag_names)])
+                except DatabaseError as e:
+                    # Błąd zapisu do bazy (np. naruszenie unikalności)
+                    self.result.skip(row_number, f'Błąd zapisu do bazy: {e}')
+                    continue
+                for name, count in row_counts.items():
+                    counts[name] = counts.get(name, 0) + count
+
+        # bulk_create/bulk_update nie wysyłają sygnałów - unieważnij cache odpowiedzi ręcznie
+        invalidate(SCOPE_INITIATIVES, SCOPE_TAGS)
+
+        self.result.imported_count += counts.get('inserted', 0)
+        self.result.updated_count += counts.get('updated', 0)
+        self.result.unchanged_count += counts.get('unchanged', 0)
+
+    def insert_rows(self, prepared):
+        initiatives = Initiative.objects.bulk_create(
+            [Initiative(**initiative_data) for _, initiative_data, _ in prepared]
+        )
+        self.link_tags(zip(initiatives, (tag_names for _, _, tag_names in prepared)))
+        index_initiatives(initiatives)
+        return {'inserted': len(initiatives)}
+
+    def natural_key_of(self, values):
+        # Pusty napis i None to ta sama wartość klucza (jak w content_hash)
+        return tuple(values.get(field) or None for field in self.natural_key)
+
+    def key_condition(self, key):
+        """Q matching initiatives with the given natural key; an empty part matches both NULL and ''."""
+        condition = Q()
+        for field, value in zip(self.natural_key, key):
+            condition &= Q(**{field: value}) if value is not None else Q(**{f'{field}__isnull': True}) | Q(**{field: ''})
+        return condition
+
+    def drop_duplicate_keys(self, prepared):
+        """Within a chunk the first row with a given natural key wins."""
+        first_rows = {}
+        unique = []
+        for row in prepared:
+            key = self.natural_key_of(row[1])
+            if key in first_rows:
+                self.result.skip(row[0], f'Zduplikowany klucz naturalny (jak w wierszu {first_rows[key]}).')
+                continue
+            first_rows[key] = row[0]
+            unique.append(row)
+        return unique
+
+    def upsert_rows(self, prepared):
+        by_key = {self.natural_key_of(row[1]): row for row in prepared}
+
+        # Istniejące inicjatywy dopasowane po całym kluczu (OR warunków na wiersz), potem jedno zapytanie o ich tagi
+        existing = {}
+        keys = list(by_key)
+        for start in range(0, len(keys), KEY_LOOKUP_BATCH_SIZE):
+            condition = reduce(operator.or_, (
+                self.key_condition(key) for key in keys[start:start + KEY_LOOKUP_BATCH_SIZE]
+            ))
+            for values in Initiative.objects.filter(condition).order_by('id').values('id', *IMPORTED_FIELDS):
+                existing.setdefault(self.natural_key_of(values), values)
+
+        through = Initiative.tags.through
+        current_links = {}
+        for link_id, initiative_id, tag_id in through.objects.filter(
+            initiative_id__in=[values['id'] for values in existing.values()]
+        ).values_list('id', 'initiative_id', 'tag_id'):
+            current_links.setdefault(initiative_id, {})[tag_id] = link_id
+
+        to_insert = []
+        to_update = []
+        links_to_add = []
+        links_to_delete = []
+        unchanged = 0
+        for key, (row_number, initiative_data, tag_names) in by_key.items():
+            values = existing.get(key)
+            if values is None:
+                to_insert.append((row_number, initiative_data, tag_names))
+                continue
+
+            tag_ids = {self.tag_id(name) for name in tag_names}
+            links = current_links.get(values['id'], {})
+            if content_hash(initiative_data, tag_ids) == content_hash(values, links.keys()):
+                unchanged += 1
+                continue
+
+            to_update.append(Initiative(id=values['id'], **initiative_data))
+            links_to_add.extend((values['id'], tag_id) for tag_id in tag_ids - links.keys())
+            links_to_delete.extend(link_id for tag_id, link_id in links.items() if tag_id not in tag_ids)
+
+        if to_update:
+            # bulk_update nie ustawia auto_now - zrób to ręcznie
+            now = timezone.now()
+            for initiative in to_update:
+                initiative.updated_at = now
+            Initiative.objects.bulk_update(to_update, IMPORTED_FIELDS + ['updated_at'])
+            index_initiatives(to_update)
+        if links_to_delete:
+            through.objects.filter(id__in=links_to_delete).delete()
+        if links_to_add:
+            through.objects.bulk_create(
+                [through(initiative_id=initiative_id, tag_id=tag_id) for initiative_id, tag_id in links_to_add]
+            )
+
+        counts = self.insert_rows(to_insert) if to_insert else {}
+        counts.update(updated=len(to_update), unchanged=unchanged)
+        return counts
+
+    def link_tags(self, initiatives_with_tags):
+        through = Initiative.tags.through
+        links = {
+            (initiative.pk, self.tag_id(name))
+            for initiative, tag_names in initiatives_with_tags
+            for name in tag_names
+        }
+        through.objects.bulk_create(
+            [through(initiative_id=initiative_id, tag_id=tag_id) for initiative_id, tag_id in links]
+        )
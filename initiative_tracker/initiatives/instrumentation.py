@@ -0,0 +1,308 @@
+# initiatives/instrumentation.py
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware keeps the metrics of the current request in a
+context variable, and an execute wrapper installed on every DB
+connection when it is opened adds each query to them. It records the
+wall time, the number and total time of queries, the time spent in
+serializers (timed(), DB time excluded) and rendering, and the response
+size. The numbers are
+sent back in a Server-Timing header, written as one JSON log line to the
+'initiatives.performance' logger and added to in-process Prometheus
+metrics (see render_metrics and the /api/_metrics/ endpoint).
+
+A request is flagged (log level WARNING) when it runs more than
+PERF_QUERY_THRESHOLD queries, repeats one statement at least
+PERF_DUPLICATE_QUERY_THRESHOLD times (the usual N+1 pattern) or takes
+longer than PERF_SLOW_REQUEST_MS.
+
+Metrics are kept per process; each worker exposes its own counters, so
+a scrape of a multi-worker deployment sees one process at a time. For
+streaming responses the numbers cover the time until the response is
+returned, not the streaming of the body.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('initiatives.performance')
+
+# Granice kubełków histogramu czasu odpowiedzi (sekundy)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Długość zapytania SQL zapisywanego w logu przy wykryciu N+1
+MAX_LOGGED_SQL = 200
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def is_enabled():
+    return getattr(settings, 'PERF_INSTRUMENTATION', True)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.spans = {} # nazwa -> sekundy (serialize, render)
+
+    def execute(self, execute, sql, params, many, context):
+        """Execute wrapper timing every query (see record_query)."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            self.statements[sql] += 1
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every database connection when it is
+    opened; counts the query into the current request's metrics, if any.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block (minus its DB queries, which are
+    counted separately) to the current request's `name` span. Outside an
+    instrumented request it does nothing.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    db_time = metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.add_span(name, time.perf_counter() - start - (metrics.db_time - db_time))
+
+
+class TimedSerializerMixin:
+    """Serializer mixin recording the evaluation of .data as the 'serialize' span."""
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+def detect_problems(metrics, duration):
+    """Flags for a finished request, e.g. ['n_plus_one', 'slow']."""
+    flags = []
+    if metrics.query_count > getattr(settings, 'PERF_QUERY_THRESHOLD', 50):
+        flags.append('too_many_queries')
+    if metrics.statements:
+        _, repeats = metrics.statements.most_common(1)[0]
+        if repeats >= getattr(settings, 'PERF_DUPLICATE_QUERY_THRESHOLD', 10):
+            flags.append('n_plus_one')
+    if duration * 1000 > getattr(settings, 'PERF_SLOW_REQUEST_MS', 1000):
+        flags.append('slow')
+    return flags
+
+
+def server_timing(metrics, duration):
+    parts = [f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries"']
+    parts.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in metrics.spans.items())
+    parts.append(f'total;dur={duration * 1000:.1f}')
+    return ', '.join(parts)
+
+
+def response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get('Content-Length')
+    return int(length) if length else None
+
+
+class MetricsRegistry:
+    """Prometheus counters and latency histograms per route (view name)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter() # (route, method, status) -> liczba
+            self.histograms = {} # (route, method) -> [kubełki..., +Inf, suma]
+            self.db_queries = Counter() # route -> liczba zapytań
+            self.db_seconds = Counter() # route -> sekundy
+            self.response_bytes = Counter() # route -> bajty
+            self.flagged = Counter() # (route, flag) -> liczba
+
+    def observe(self, route, method, status, duration, metrics, size, flags):
+        with self._lock:
+            self.requests[route, method, status] += 1
+            histogram = self.histograms.setdefault((route, method), [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+            histogram[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+            histogram[-1] += duration
+            self.db_queries[route] += metrics.query_count
+            self.db_seconds[route] += metrics.db_time
+            self.response_bytes[route] += size or 0
+            for flag in flags:
+                self.flagged[route, flag] += 1
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format (0.0.4)."""
+        def labels(**values):
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in values.values())
+            return '{' + ','.join(f'{name}="{value}"' for name, value in zip(values, escaped)) + '}'
+
+        lines = []
+        with self._lock:
+            lines += [
+                '# HELP initiatives_http_requests_total HTTP requests by route, method and status.',
+                '# TYPE initiatives_http_requests_total counter',
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'initiatives_http_requests_total{labels(route=route, method=method, status=status)} {count}')
+
+            lines += [
+                '# HELP initiatives_http_request_duration_seconds Request wall time by route and method.',
+                '# TYPE initiatives_http_request_duration_seconds histogram',
+            ]
+            for (route, method), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), histogram):
+                    cumulative += count
+                    lines.append(
+                        f'initiatives_http_request_duration_seconds_bucket'
+                        f'{labels(route=route, method=method, le=bound)} {cumulative}'
+                    )
+                lines.append(f'initiatives_http_request_duration_seconds_sum{labels(route=route, method=method)} {histogram[-1]:.6f}')
+                lines.append(f'initiatives_http_request_duration_seconds_count{labels(route=route, method=method)} {cumulative}')
+
+            for name, kind, help_text, values in (
+                ('initiatives_db_queries_total', 'counter', 'Database queries by route.', self.db_queries),
+                ('initiatives_db_duration_seconds_total', 'counter', 'Database time by route.', self.db_seconds),
+                ('initiatives_http_response_bytes_total', 'counter', 'Response body bytes by route.', self.response_bytes),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{labels(route=route)} {value:g}' for route, value in sorted(values.items())]
+
+            lines += [
+                '# HELP initiatives_flagged_requests_total Requests flagged as slow or with too many/repeated queries.',
+                '# TYPE initiatives_flagged_requests_total counter',
+            ]
+            for (route, flag), count in sorted(self.flagged.items()):
+                lines.append(f'initiatives_flagged_requests_total{labels(route=route, flag=flag)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def render_metrics():
+    return registry.render()
+
+
+class PerformanceMiddleware:
+    """Works in both sync (WSGI) and async (ASGI) handler chains without thread hops."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not is_enabled():
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not is_enabled():
+            return await self.get_response(request)
+
+        # Zapytania async ORM wykonywane w wątku bazy widzą tę samą zmienną
+        # kontekstu (sync_to_async kopiuje kontekst)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        # Odpowiedzi DRF są renderowane po widoku - czas renderowania osobno
+        metrics = _current.get()
+        if metrics is not None and not response.is_rendered:
+            start = time.perf_counter()
+
+            def record_render(rendered):
+                metrics.add_span('render', time.perf_counter() - start)
+
+            response.add_post_render_callback(record_render)
+        return response
+
+    def finish(self, request, response, metrics, duration):
+        match = request.resolver_match
+        route = match.view_name if match else '<unmatched>'
+        size = response_size(response)
+        flags = detect_problems(metrics, duration)
+        response['Server-Timing'] = server_timing(metrics, duration)
+        registry.observe(route, request.method, response.status_code, duration, metrics, size, flags)
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': metrics.query_count,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in metrics.spans.items()},
+            'response_bytes': size,
+        }
+        if flags:
+            record['flags'] = flags
+            if 'n_plus_one' in flags:
+                sql, repeats = metrics.statements.most_common(1)[0]
+                record['repeated_query'] = {'sql': sql[:MAX_LOGGED_SQL], 'count': repeats}
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,163 @@
+# initiatives/jobs.py
+"""
+Background import jobs.
+
+Jobs run in an in-process thread pool, so no external broker is needed.
+Progress is stored on the ImportJob row, so any worker process can report it.
+Every chunk of rows is committed separately. A cancelled or failed job
+keeps the chunks that were already written.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .importer import (
+    DEFAULT_BATCH_SIZE,
+    ImportFileError,
+    InitiativeImporter,
+    estimate_row_count,
+    get_reader,
+    open_mapped,
+    parse_mode,
+    parse_natural_key,
+    read_rows,
+)
+from .models import ImportJob
+
+# Ile powodów pominięcia wierszy przechowujemy w zadaniu
+MAX_REPORTED_SKIPPED_ROWS = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ImportCancelled(Exception):
+    """Raised from the progress callback when cancellation was requested."""
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'INITIATIVE_IMPORT_WORKERS', 2),
+                thread_name_prefix='initiative-import',
+            )
+    return _executor
+
+
+def create_job(uploaded_file, mode=None, natural_key=None):
+    """Validate the file type and options, store the upload on disk and create a pending job."""
+    get_reader(uploaded_file.name) # Rzuca ImportFileError dla nieobsługiwanego formatu
+    mode = parse_mode(mode)
+    natural_key = parse_natural_key(natural_key) if mode == ImportJob.MODE_UPSERT else ()
+
+    job = ImportJob(file_name=uploaded_file.name, mode=mode, natural_key=','.join(natural_key))
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    directory = os.path.join(settings.UPLOAD_ROOT, 'imports')
+    os.makedirs(directory, exist_ok=True)
+    job.file_path = os.path.join(directory, f'{job.pk}{extension}')
+
+    # Zapis po kawałkach - plik może mieć setki MB
+    with open(job.file_path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    job.save()
+    return job
+
+
+def submit_job(job):
+    """Run the job in the thread pool, or inline when INITIATIVE_IMPORT_ASYNC is off."""
+    if getattr(settings, 'INITIATIVE_IMPORT_ASYNC', True):
+        # Wątek musi widzieć zatwierdzony rekord zadania
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.pk))
+    else:
+        run_job(job.pk)
+
+
+def cancel_job(job):
+    """Request cancellation; a job that has not started yet is cancelled immediately."""
+    ImportJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+    ImportJob.objects.filter(pk=job.pk, status=ImportJob.STATUS_PENDING).update(
+        status=ImportJob.STATUS_CANCELLED,
+        finished_at=timezone.now(),
+    )
+    job.refresh_from_db()
+    return job
+
+
+def _run_in_worker(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        # Połączenia z bazą są per wątek - nie zostawiaj ich otwartych w puli
+        connection.close()
+
+
+def _report_progress(job_id, result):
+    ImportJob.objects.filter(pk=job_id).update(
+        rows_processed=result.rows_processed,
+        imported_count=result.imported_count,
+        updated_count=result.updated_count,
+        unchanged_count=result.unchanged_count,
+        skipped_count=len(result.skipped_rows),
+        skipped_rows=result.skipped_rows[:MAX_REPORTED_SKIPPED_ROWS],
+    )
+    if ImportJob.objects.filter(pk=job_id, cancel_requested=True).exists():
+        raise ImportCancelled()
+
+
+def run_job(job_id):
+    job = ImportJob.objects.get(pk=job_id)
+    if job.is_finished:
+        return job
+
+    job.status = ImportJob.STATUS_RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    importer = InitiativeImporter(
+        batch_size=getattr(settings, 'INITIATIVE_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        on_chunk=lambda result: _report_progress(job_id, result),
+        workers=getattr(settings, 'INITIATIVE_IMPORT_PROCESSES', 1),
+        mode=job.mode,
+        natural_key=parse_natural_key(job.natural_key),
+    )
+    try:
+        job.rows_total = estimate_row_count(job.file_path)
+        ImportJob.objects.filter(pk=job_id).update(rows_total=job.rows_total)
+        with open_mapped(job.file_path) as f, closing(read_rows(f)) as rows:
+            importer.run(rows)
+        job.status = ImportJob.STATUS_COMPLETED
+    except ImportCancelled:
+        job.status = ImportJob.STATUS_CANCELLED
+    except ImportFileError as e:
+        job.status = ImportJob.STATUS_FAILED
+        job.error = str(e)
+    except Exception as e:
+        # Ogólny błąd przetwarzania pliku
+        job.status = ImportJob.STATUS_FAILED
+        job.error = f'Wystąpił błąd podczas przetwarzania pliku: {e}'
+    finally:
+        result = importer.result
+        job.rows_processed = result.rows_processed
+        job.imported_count = result.imported_count
+        job.updated_count = result.updated_count
+        job.unchanged_count = result.unchanged_count
+        job.skipped_count = len(result.skipped_rows)
+        job.skipped_rows = result.skipped_rows[:MAX_REPORTED_SKIPPED_ROWS]
+        job.finished_at = timezone.now()
+        job.save(update_fields=[
+            'status', 'error', 'rows_total', 'rows_processed', 'imported_count',
+            'updated_count', 'unchanged_count', 'skipped_count', 'skipped_rows', 'finished_at',
+        ])
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+    return job
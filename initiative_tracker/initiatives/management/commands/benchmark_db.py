@@ -0,0 +1,140 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from initiatives.benchmarking import benchmark_database, percentile, populate_initiatives
+from initiatives.fast_serializers import VALUES_FIELDS, tag_ids_by_initiative
+from initiatives.models import Initiative
+
+
+def describe_profile():
+    database = settings.DATABASES['default']
+    options = database.get('OPTIONS', {})
+    if database['ENGINE'].endswith('postgresql'):
+        pool = options.get('pool')
+        return f"PostgreSQL, pool={pool or 'brak'}, CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}"
+    return f"SQLite, init_command={options.get('init_command') or 'brak'}"
+
+
+class Command(BaseCommand):
+    help = (
+        'Mierzy przepustowość równoległych odczytów i zapisów dla aktywnego profilu bazy '
+        '(na tymczasowej bazie testowej). Profile porównuje się zmiennymi środowiskowymi, np. '
+        'SQLITE_TUNING=0, DB_ENGINE=postgres.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Liczba inicjatyw (domyślnie: 5000)')
+        parser.add_argument('--readers', type=int, default=4, help='Wątki czytające (domyślnie: 4)')
+        parser.add_argument('--writers', type=int, default=2, help='Wątki zapisujące (domyślnie: 2)')
+        parser.add_argument('--seconds', type=float, default=5, help='Czas pomiaru (domyślnie: 5 s)')
+
+    def handle(self, *args, **options):
+        test_name = None
+        if connection.vendor == 'sqlite':
+            # Pragmy (WAL, mmap) działają tylko na bazie w pliku, nie w pamięci
+            test_dir = tempfile.mkdtemp()
+            test_name = os.path.join(test_dir, 'benchmark.sqlite3')
+
+        with benchmark_database(test_name=test_name):
+            ids = [initiative.pk for initiative in populate_initiatives(options['rows'])]
+            journal_mode = None
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+            results = self.run_workload(ids, options)
+
+        if test_name:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(test_name + suffix):
+                    os.remove(test_name + suffix)
+            os.rmdir(os.path.dirname(test_name))
+
+        self.stdout.write(f'Profil: {describe_profile()}')
+        if journal_mode:
+            self.stdout.write(f'journal_mode: {journal_mode}')
+        self.stdout.write(
+            f"{options['readers']} wątków czytających, {options['writers']} zapisujących, "
+            f"{options['seconds']} s:"
+        )
+        for kind in ('read', 'write'):
+            stats = results[kind]
+            self.stdout.write(
+                f"  {kind:<6} {stats['ops_per_s']:>9.1f} op/s   p50 {stats['p50_ms']:>8.2f} ms   "
+                f"p99 {stats['p99_ms']:>8.2f} ms   błędy {stats['errors']}"
+            )
+
+    def run_workload(self, ids, options):
+        deadline = time.perf_counter() + options['seconds']
+        latencies = {'read': [], 'write': []}
+        errors = {'read': 0, 'write': 0}
+        lock = threading.Lock()
+        statuses = [code for code, _ in Initiative.ENTITY_STATUS_CHOICES]
+
+        def read(rng):
+            # Strona listy z filtrem, tak jak szybka ścieżka API
+            rows = list(
+                Initiative.objects.filter(entity_status=rng.choice(statuses))
+                .order_by('-created_at', 'id').values(*VALUES_FIELDS)[:50]
+            )
+            tag_ids_by_initiative([row['id'] for row in rows])
+
+        def write(rng):
+            with transaction.atomic():
+                Initiative.objects.filter(pk=rng.choice(ids)).update(
+                    description=f'Zmieniony opis {rng.random()}'
+                )
+                Initiative.objects.create(
+                    name=f'Nowa inicjatywa {rng.random()}',
+                    implementing_entity_name='Podmiot benchmarku',
+                    entity_status=rng.choice(statuses),
+                    implementation_area=Initiative.IMPLEMENTATION_AREA_LOCAL,
+                    funding_source=Initiative.FUNDING_SOURCE_PUBLIC,
+                )
+
+        def worker(kind, operation, seed):
+            rng = random.Random(seed)
+            local_latencies, local_errors = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        operation(rng)
+                    except OperationalError: # np. "database is locked"
+                        local_errors += 1
+                        continue
+                    local_latencies.append((time.perf_counter() - start) * 1000)
+            finally:
+                # Każdy wątek ma własne połączenie - zamknij je (lub oddaj do puli)
+                connection.close()
+            with lock:
+                latencies[kind].extend(local_latencies)
+                errors[kind] += local_errors
+
+        threads = [
+            threading.Thread(target=worker, args=('read', read, seed))
+            for seed in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=('write', write, 1000 + seed))
+            for seed in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {
+            kind: {
+                'ops_per_s': round(len(values) / options['seconds'], 1),
+                'p50_ms': round(percentile(values, 0.5), 2) if values else 0,
+                'p99_ms': round(percentile(values, 0.99), 2) if values else 0,
+                'errors': errors[kind],
+            }
+            for kind, values in latencies.items()
+        }
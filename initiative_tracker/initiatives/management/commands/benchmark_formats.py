@@ -0,0 +1,71 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from initiatives.benchmarking import benchmark_database, populate_initiatives, time_calls
+from initiatives.compression import available_encodings, compress
+from initiatives.fast_serializers import VALUES_FIELDS, encode_json, serialize_columns, serialize_rows, tag_ids_by_initiative
+from initiatives.renderers import MessagePackRenderer, msgpack
+from initiatives.views import InitiativeViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Porównuje formaty listy inicjatyw (JSON, JSON kolumnowy, MessagePack) bez i z kompresją: '
+        'bajty wysyłane do klienta oraz czas kodowania i kompresji (na tymczasowej bazie testowej).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Liczba inicjatyw (domyślnie: 10000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Liczba powtórzeń (domyślnie: 5)')
+        parser.add_argument('--output', default=None, help='Plik JSON na wyniki')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows i --repeat muszą być dodatnie.')
+
+        with benchmark_database():
+            populate_initiatives(options['rows'])
+            # Wiersze pobrane raz - mierzone jest samo kodowanie, bez bazy
+            queryset = InitiativeViewSet.queryset.all().prefetch_related(None).values(*VALUES_FIELDS)
+            rows = list(queryset)
+            tag_ids = tag_ids_by_initiative(queryset)
+
+        formats = {
+            'json': lambda: encode_json(serialize_rows(rows, tag_ids)),
+            'columnar': lambda: encode_json(serialize_columns(rows, tag_ids)),
+        }
+        if msgpack is not None:
+            formats['msgpack'] = lambda: MessagePackRenderer().render(serialize_rows(rows, tag_ids))
+        else:
+            self.stderr.write('Pakiet msgpack nie jest zainstalowany - pomijam MessagePack.')
+
+        results = []
+        for name, encode in formats.items():
+            body = encode()
+            encode_stats = time_calls(encode, options['repeat'])
+            results.append({'format': name, 'encoding': 'identity', 'bytes': len(body), 'encode_ms': encode_stats['p50_ms'], 'compress_ms': 0.0})
+            for encoding in available_encodings():
+                compressed = compress(encoding, body)
+                compress_stats = time_calls(lambda: compress(encoding, body), options['repeat'])
+                results.append({
+                    'format': name,
+                    'encoding': encoding,
+                    'bytes': len(compressed),
+                    'encode_ms': encode_stats['p50_ms'],
+                    'compress_ms': compress_stats['p50_ms'],
+                })
+
+        baseline = results[0]['bytes']
+        self.stdout.write(f"Lista {options['rows']} inicjatyw, {options['repeat']} powtórzeń (p50):")
+        self.stdout.write(f"  {'format':<10} {'kodowanie':<10} {'bajty':>12} {'%':>7} {'kodowanie ms':>13} {'kompresja ms':>13}")
+        for result in results:
+            self.stdout.write(
+                f"  {result['format']:<10} {result['encoding']:<10} {result['bytes']:>12} "
+                f"{100 * result['bytes'] / baseline:>6.1f}% {result['encode_ms']:>13.1f} {result['compress_ms']:>13.1f}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({'rows': options['rows'], 'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Zapisano wyniki do: {options['output']}"))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from initiatives.benchmarking import benchmark_database, populate_initiatives, time_calls
+from initiatives.fast_serializers import VALUES_FIELDS, encode_json, serialize_rows, tag_ids_by_initiative
+from initiatives.serializers import InitiativeSerializer
+from initiatives.views import InitiativeViewSet
+
+
+class Command(BaseCommand):
+    help = 'Porównuje InitiativeSerializer z szybką ścieżką listy (na tymczasowej bazie testowej).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Liczba inicjatyw (domyślnie: 5000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Liczba powtórzeń (domyślnie: 5)')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            populate_initiatives(options['rows'])
+            request = Request(APIRequestFactory().get('/api/initiatives/'))
+
+            def serializer_path():
+                queryset = InitiativeViewSet.queryset.all()
+                data = InitiativeSerializer(queryset, many=True, context={'request': request}).data
+                return JSONRenderer().render(data)
+
+            def fast_path():
+                queryset = InitiativeViewSet.queryset.all().prefetch_related(None).values(*VALUES_FIELDS)
+                return encode_json(serialize_rows(queryset.iterator(chunk_size=2000), tag_ids_by_initiative(queryset)))
+
+            if serializer_path() != fast_path():
+                self.stderr.write(self.style.ERROR('Wyniki obu ścieżek różnią się!'))
+
+            results = {
+                'InitiativeSerializer': time_calls(serializer_path, options['repeat']),
+                'fast path': time_calls(fast_path, options['repeat']),
+            }
+
+        self.stdout.write(f"Lista {options['rows']} inicjatyw, {options['repeat']} powtórzeń:")
+        for name, stats in results.items():
+            self.stdout.write(f"  {name:<22} p50 {stats['p50_ms']:>9.1f} ms   min {stats['min_ms']:>9.1f} ms")
+        speedup = results['InitiativeSerializer']['p50_ms'] / max(results['fast path']['p50_ms'], 0.001)
+        self.stdout.write(self.style.SUCCESS(f'Przyspieszenie: {speedup:.1f}x'))
@@ -0,0 +1,187 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from initiatives.benchmarking import benchmark_database, time_calls
+from initiatives.synthetic import TAG_VOCABULARY, write_file
+
+# Odczyty mierzone po imporcie: nazwa -> parametry zapytania
+READ_SCENARIOS = {
+    'list_page': ('initiative-list', {'page_size': 50}),
+    'list_full': ('initiative-list', {}),
+    'filter': ('initiative-list', {'entity_status': 'NGO,UNIVERSITY', 'tags': TAG_VOCABULARY[0], 'page_size': 50}),
+    'search': ('initiative-list', {'search': 'zielona energia', 'page_size': 50}),
+    'facets': ('initiative-facets', {}),
+    'export_csv': ('initiative-export', {'format': 'csv'}),
+}
+# Bez cache odpowiedzi każde powtórzenie dociera do bazy
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fetch(client, url):
+    """GET the url and read the whole body (streaming responses included)."""
+    response = client.get(url)
+    if response.status_code != 200:
+        raise CommandError(f'{url}: HTTP {response.status_code}')
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    return len(body)
+
+
+def measure_once(func, trace_memory=True):
+    """
+    Run func once, returning (result, seconds, query count, peak traced
+    memory in KiB). tracemalloc slows Python code down a lot, so without
+    trace_memory the peak is None and the time is realistic.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        peak = round(tracemalloc.get_traced_memory()[1] / 1024) if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return result, elapsed, len(queries), peak
+
+
+class Command(BaseCommand):
+    help = (
+        'Zestaw benchmarków na syntetycznych danych (tymczasowa baza testowa): import pliku '
+        'przez InitiativeImportView oraz lista, filtry, wyszukiwanie, fasety i eksport przez '
+        'klienta testowego Django. Wyniki w JSON do porównań między commitami.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Liczba wierszy pliku importu (domyślnie: 10000)')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv', help='Format pliku importu')
+        parser.add_argument('--seed', type=int, default=0, help='Ziarno generatora danych')
+        parser.add_argument('--repeat', type=int, default=10, help='Powtórzenia każdego odczytu (domyślnie: 10)')
+        parser.add_argument('--output', default=None, help='Plik JSON na wyniki (domyślnie: tylko wypisanie)')
+        parser.add_argument('--cached', action='store_true', help='Mierz z włączonym cache odpowiedzi')
+        parser.add_argument(
+            '--import-memory', action='store_true',
+            help='Mierz szczytową pamięć importu (tracemalloc wielokrotnie wydłuża czas importu)',
+        )
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(READ_SCENARIOS), default=None,
+            help='Mierzone odczyty (można podać wiele razy; domyślnie wszystkie)',
+        )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows i --repeat muszą być dodatnie.')
+
+        with tempfile.TemporaryDirectory() as upload_root:
+            path = os.path.join(upload_root, f"synthetic.{options['format']}")
+            start = time.perf_counter()
+            write_file(path, options['rows'], seed=options['seed'])
+            self.stderr.write(f'Wygenerowano plik w {time.perf_counter() - start:.1f} s')
+
+            overrides = {'INITIATIVE_IMPORT_ASYNC': False, 'UPLOAD_ROOT': upload_root}
+            if not options['cached']:
+                overrides['CACHES'] = NO_CACHE
+            with override_settings(**overrides), benchmark_database():
+                results = self.run_suite(path, options)
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'rows': options['rows'],
+                'format': options['format'],
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+                'cached': options['cached'],
+                'import_memory': options['import_memory'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        self.print_report(report)
+
+    def run_suite(self, path, options):
+        client = Client()
+        results = {}
+
+        def import_file():
+            with open(path, 'rb') as f:
+                return client.post(reverse('initiative-import'), {'file': f}).json()
+
+        job, elapsed, queries, peak_kb = measure_once(import_file, trace_memory=options['import_memory'])
+        if job['status'] != 'COMPLETED':
+            raise CommandError(f"Import zakończony statusem {job['status']}: {job.get('message')}")
+        results['import'] = {
+            'rows': job['rows_processed'],
+            'imported': job['imported_count'],
+            'seconds': round(elapsed, 3),
+            'rows_per_s': round(job['rows_processed'] / elapsed),
+            'mb_per_s': round(os.path.getsize(path) / elapsed / 1024 / 1024, 2),
+            'queries': queries,
+            'peak_kb': peak_kb,
+        }
+
+        for name in options['scenario'] or READ_SCENARIOS:
+            url_name, params = READ_SCENARIOS[name]
+            url = reverse(url_name)
+            if params:
+                url += '?' + urlencode(params)
+            # Rozgrzewka, potem liczba zapytań i pamięć (tracemalloc spowalnia), na końcu czasy
+            size = fetch(client, url)
+            _, _, queries, peak_kb = measure_once(lambda: fetch(client, url))
+            results[name] = {
+                'url': url,
+                'bytes': size,
+                'queries': queries,
+                'peak_kb': peak_kb,
+                **time_calls(lambda: fetch(client, url), options['repeat']),
+            }
+        return results
+
+    def print_report(self, report):
+        meta = report['meta']
+        self.stdout.write(
+            f"{meta['rows']} wierszy ({meta['format']}), baza {meta['database']}, "
+            f"{meta['repeat']} powtórzeń, cache {'włączony' if meta['cached'] else 'wyłączony'}:"
+        )
+        results = dict(report['results'])
+        imported = results.pop('import')
+        self.stdout.write(
+            f"  {'import':<12} {imported['seconds']:>9.2f} s   {imported['rows_per_s']:>8} wierszy/s   "
+            f"zapytania {imported['queries']:>6}   pamięć {imported['peak_kb'] or '-':>8} KiB"
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f"  {name:<12} p50 {stats['p50_ms']:>9.1f} ms   p99 {stats['p99_ms']:>9.1f} ms   "
+                f"zapytania {stats['queries']:>3}   pamięć {stats['peak_kb']:>8} KiB"
+            )
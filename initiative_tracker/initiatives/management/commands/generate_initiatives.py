@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from initiatives.synthetic import write_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Generuje deterministyczny plik CSV lub XLSX z syntetycznymi inicjatywami '
+        '(kolumny zgodne z importem). Ten sam --seed daje ten sam plik.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Plik wynikowy (.csv lub .xlsx)')
+        parser.add_argument('--rows', type=int, default=1000, help='Liczba wierszy (domyślnie: 1000)')
+        parser.add_argument('--seed', type=int, default=0, help='Ziarno generatora (domyślnie: 0)')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 0:
+            raise CommandError('--rows nie może być ujemne.')
+        write_file(options['path'], options['rows'], seed=options['seed'])
+        self.stdout.write(self.style.SUCCESS(f"Zapisano {options['rows']} wierszy do {options['path']}"))
@@ -0,0 +1,104 @@
+import os
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from initiatives.importer import (
+    DEFAULT_BATCH_SIZE,
+    MODE_UPSERT,
+    ImportFileError,
+    InitiativeImporter,
+    open_mapped,
+    parse_mode,
+    parse_natural_key,
+    read_rows,
+)
+
+# Ile powodów pominięcia wierszy wypisać
+MAX_PRINTED_SKIPPED_ROWS = 20
+# Co ile sekund wypisywać postęp
+PROGRESS_INTERVAL = 2.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Importuje inicjatywy z lokalnego pliku CSV lub XLSX (odczyt przez mmap), '
+        'bez uploadu przez API. Każda paczka wierszy jest zatwierdzana osobno.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Ścieżka do pliku CSV lub XLSX')
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=getattr(settings, 'INITIATIVE_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+            help='Liczba wierszy w paczce zapisu',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'INITIATIVE_IMPORT_PROCESSES', 1),
+            help='Procesy mapujące wiersze (1 = bez puli procesów)',
+        )
+        parser.add_argument('--mode', default=None, help="Tryb importu: 'create' (domyślnie) lub 'upsert'")
+        parser.add_argument('--key', default=None, help='Pola klucza naturalnego dla --mode upsert, np. name,implementing_entity_name')
+        parser.add_argument('--dry-run', action='store_true', help='Tylko odczyt i walidacja wierszy, bez zapisu')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'Nie znaleziono pliku: {path}')
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size i --workers muszą być dodatnie.')
+        try:
+            mode = parse_mode(options['mode'])
+            natural_key = parse_natural_key(options['key'])
+        except ImportFileError as e:
+            raise CommandError(str(e))
+
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        last_report = start
+
+        def report_progress(result):
+            nonlocal last_report
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                self.stderr.write(
+                    f'  {result.rows_processed} wierszy, {result.rows_processed / (now - start):.0f} wierszy/s'
+                )
+
+        importer = InitiativeImporter(
+            batch_size=options['batch_size'],
+            on_chunk=report_progress,
+            workers=options['workers'],
+            mode=mode,
+            natural_key=natural_key,
+            dry_run=options['dry_run'],
+        )
+        try:
+            with open_mapped(path) as f, closing(read_rows(f)) as rows:
+                result = importer.run(rows)
+        except ImportFileError as e:
+            raise CommandError(str(e))
+        elapsed = max(time.perf_counter() - start, 1e-9)
+
+        for skipped in result.skipped_rows[:MAX_PRINTED_SKIPPED_ROWS]:
+            self.stdout.write(f"  Wiersz {skipped['row']}: {skipped['reason']}")
+        if len(result.skipped_rows) > MAX_PRINTED_SKIPPED_ROWS:
+            self.stdout.write(f'  ... i {len(result.skipped_rows) - MAX_PRINTED_SKIPPED_ROWS} kolejnych')
+
+        if options['dry_run']:
+            summary = f'[dry-run] Poprawne wiersze: {result.valid_count}'
+        elif mode == MODE_UPSERT:
+            summary = (
+                f'Dodano {result.imported_count}, zaktualizowano {result.updated_count}, '
+                f'bez zmian {result.unchanged_count}'
+            )
+        else:
+            summary = f'Dodano {result.imported_count}'
+        self.stdout.write(f'{summary}, pominięto {len(result.skipped_rows)} z {result.rows_processed} wierszy.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Czas: {elapsed:.2f} s, {result.rows_processed / elapsed:.0f} wierszy/s, '
+            f'{size / elapsed / 1024 / 1024:.1f} MB/s'
+        ))
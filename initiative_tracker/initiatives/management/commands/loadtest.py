@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from initiatives.benchmarking import percentile
+
+# Maksymalny rozmiar nagłówków odpowiedzi
+MAX_HEADER_BYTES = 64 * 1024
+# Przerwa przed ponowną próbą po błędzie połączenia (bez zalewania serwera próbami)
+RETRY_DELAY = 0.05
+
+
+class HTTPError(Exception):
+    pass
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, body length, keep-alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    if len(head) > MAX_HEADER_BYTES:
+        raise HTTPError('Za długie nagłówki odpowiedzi')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    status = int(status_line.split()[1])
+    headers = {}
+    for line in header_lines:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    size = 0
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            chunk_size = int((await reader.readline()).split(b';')[0], 16)
+            if chunk_size:
+                size += len(await reader.readexactly(chunk_size))
+            await reader.readexactly(2)
+            if not chunk_size:
+                break
+    elif 'content-length' in headers:
+        size = len(await reader.readexactly(int(headers['content-length'])))
+    else:
+        size = len(await reader.read())
+        return status, size, False
+    return status, size, headers.get('connection', '').lower() != 'close'
+
+
+async def run_client(url, deadline, latencies, errors):
+    """One keep-alive connection sending requests until the deadline."""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+        f'Accept: application/json\r\nConnection: keep-alive\r\n\r\n'
+    ).encode('ascii')
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    writer = None
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        parts.hostname, port, ssl=parts.scheme == 'https', limit=MAX_HEADER_BYTES,
+                    )
+                    start = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                status, _, keep_alive = await read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, HTTPError, ValueError) as e:
+                # Odmowa lub zerwanie połączenia to błąd pomiaru, nie przerwanie całego testu
+                errors.append(type(e).__name__)
+                if writer is not None:
+                    writer.close()
+                    writer = None
+                await asyncio.sleep(max(0.0, min(RETRY_DELAY, deadline - time.perf_counter())))
+                continue
+            if status >= 400:
+                errors.append(f'HTTP {status}')
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+            if not keep_alive:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def load(url, concurrency, seconds):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(run_client(url, deadline, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = {
+        'url': url,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 2),
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+    if latencies:
+        result.update({
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(max(latencies), 2),
+        })
+    if errors:
+        result['error_types'] = sorted(set(errors))
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Test obciążeniowy działającego serwera: równoległe połączenia keep-alive wysyłają '
+        'GET przez zadany czas, wynik to liczba żądań na sekundę oraz p50/p99. Podaj kilka '
+        'adresów, aby porównać np. wdrożenie WSGI (/api/...) z ASGI (/api/async/...).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Adresy URL (http://...) mierzone po kolei')
+        parser.add_argument('--concurrency', type=int, default=50, help='Liczba równoległych połączeń (domyślnie: 50)')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Czas pomiaru każdego adresu (domyślnie: 10)')
+        parser.add_argument('--warmup', type=float, default=1.0, help='Rozgrzewka przed pomiarem w sekundach (domyślnie: 1)')
+        parser.add_argument('--output', default=None, help='Plik JSON na wyniki')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['seconds'] <= 0:
+            raise CommandError('--concurrency i --seconds muszą być dodatnie.')
+        for url in options['urls']:
+            if urlsplit(url).scheme not in ('http', 'https'):
+                raise CommandError(f'Nieprawidłowy adres: {url}')
+
+        results = []
+        for url in options['urls']:
+            if options['warmup'] > 0:
+                asyncio.run(load(url, options['concurrency'], options['warmup']))
+            result = asyncio.run(load(url, options['concurrency'], options['seconds']))
+            results.append(result)
+            self.stdout.write(
+                f"{url}\n  {result['rps']:>9.1f} żądań/s   p50 {result.get('p50_ms', 0):>8.1f} ms   "
+                f"p99 {result.get('p99_ms', 0):>8.1f} ms   błędy {result['errors']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        if len(results) > 1 and results[0]['rps']:
+            for result in results[1:]:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{result['url']}: {result['rps'] / results[0]['rps']:.2f}x żądań/s względem {results[0]['url']}"
+                ))
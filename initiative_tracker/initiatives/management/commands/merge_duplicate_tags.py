@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from initiatives.cache import SCOPE_INITIATIVES, SCOPE_TAGS, invalidate
+from initiatives.models import Initiative, Tag
+from initiatives.tag_merge import merge_duplicate_tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Scala tagi o tym samym kluczu kanonicznym ("Nauka", "nauka ") w jeden '
+        'i przepina ich powiązania z inicjatywami.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Tylko policz zmiany (wszystko jest wycofywane)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rozmiar paczki odczytu (domyślnie: 2000)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = merge_duplicate_tags(
+            Tag, Initiative.tags.through, dry_run=options['dry_run'], batch_size=options['batch_size']
+        )
+        elapsed = time.perf_counter() - start
+        if not options['dry_run']:
+            invalidate(SCOPE_TAGS, SCOPE_INITIATIVES)
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(
+            f"{prefix}Grupy duplikatów: {stats['groups']}, usunięte tagi: {stats['tags_removed']}, "
+            f"przepięte powiązania: {stats['links_moved']}, usunięte powiązania: {stats['links_removed']}, "
+            f"poprawione tagi: {stats['tags_updated']}"
+        )
+        self.stdout.write(self.style.SUCCESS(f'{prefix}Gotowe w {elapsed:.2f} s.'))
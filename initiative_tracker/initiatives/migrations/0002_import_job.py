@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:45
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('initiatives', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Oczekuje'), ('RUNNING', 'W trakcie'), ('COMPLETED', 'Zakończony'), ('FAILED', 'Błąd'), ('CANCELLED', 'Anulowany')], default='PENDING', max_length=20, verbose_name='Status')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Nazwa pliku')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Ścieżka pliku na serwerze')),
+                ('rows_total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Szacowana liczba wierszy')),
+                ('rows_processed', models.PositiveIntegerField(default=0, verbose_name='Przetworzone wiersze')),
+                ('imported_count', models.PositiveIntegerField(default=0, verbose_name='Dodane inicjatywy')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='Pominięte wiersze')),
+                ('skipped_rows', models.JSONField(blank=True, default=list, verbose_name='Powody pominięcia')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Błąd')),
+                ('cancel_requested', models.BooleanField(default=False, verbose_name='Żądanie anulowania')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Zadanie importu',
+                'verbose_name_plural': 'Zadania importu',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('initiatives', '0002_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('create', 'Dodawanie nowych'), ('upsert', 'Aktualizacja po kluczu naturalnym')], default='create', max_length=10, verbose_name='Tryb importu'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='natural_key',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Klucz naturalny'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Inicjatywy bez zmian'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Zaktualizowane inicjatywy'),
+        ),
+        migrations.AddIndex(
+            model_name='initiative',
+            index=models.Index(fields=['name', 'implementing_entity_name'], name='initiative_natural_key_idx'),
+        ),
+    ]
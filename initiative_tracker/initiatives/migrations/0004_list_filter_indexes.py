@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('initiatives', '0003_import_upsert_mode'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='initiative',
+            index=models.Index(fields=['-created_at', 'id'], name='initiative_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='initiative',
+            index=models.Index(fields=['entity_status', '-created_at', 'id'], name='initiative_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='initiative',
+            index=models.Index(fields=['implementation_area', '-created_at', 'id'], name='initiative_area_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='initiative',
+            index=models.Index(fields=['funding_source', '-created_at', 'id'], name='initiative_funding_idx'),
+        ),
+    ]
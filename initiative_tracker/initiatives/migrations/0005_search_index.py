@@ -0,0 +1,83 @@
+import unicodedata
+
+from django.db import migrations
+
+# Kopia stanu z initiatives/search.py i text.py w chwili tworzenia migracji -
+# migracja nie importuje kodu aplikacji, więc jego późniejsze zmiany jej nie dotyczą
+INDEX_TABLE = 'initiatives_search'
+INDEXED_FIELDS = ('name', 'acronym', 'implementing_entity_name', 'location_text', 'description')
+BATCH_SIZE = 2000
+
+_FOLD_TABLE = str.maketrans({'ł': 'l', 'Ł': 'L', 'đ': 'd', 'Đ': 'D', 'ø': 'o', 'Ø': 'O', 'ß': 'ss'})
+
+CREATE_SQL = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE {INDEX_TABLE} USING fts5({', '.join(INDEXED_FIELDS)}, "
+        f"tokenize='unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        f'CREATE TABLE {INDEX_TABLE} ('
+        'initiative_id bigint PRIMARY KEY REFERENCES initiatives_initiative (id) '
+        'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        f'CREATE INDEX {INDEX_TABLE}_document_idx ON {INDEX_TABLE} USING GIN (document)',
+    ],
+}
+INSERT_SQL = {
+    'sqlite': (
+        f"INSERT INTO {INDEX_TABLE} (rowid, {', '.join(INDEXED_FIELDS)}) "
+        f"VALUES ({', '.join(['%s'] * (len(INDEXED_FIELDS) + 1))})"
+    ),
+    'postgresql': (
+        f'INSERT INTO {INDEX_TABLE} (initiative_id, document) VALUES (%s, '
+        + ' || '.join(f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in ('A', 'A', 'B', 'C', 'D'))
+        + ')'
+    ),
+}
+
+
+def fold(text):
+    text = text or ''
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text.translate(_FOLD_TABLE))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in CREATE_SQL:
+        return  # Brak indeksu - wyszukiwanie przez icontains
+    Initiative = apps.get_model('initiatives', 'Initiative')
+    rows = (
+        Initiative.objects.using(connection.alias).order_by('pk')
+        .values_list('pk', *INDEXED_FIELDS).iterator(chunk_size=BATCH_SIZE)
+    )
+    with connection.cursor() as cursor:
+        for statement in CREATE_SQL[connection.vendor]:
+            cursor.execute(statement)
+        batch = []
+        for pk, *values in rows:
+            batch.append((pk, *(fold(value) for value in values)))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(INSERT_SQL[connection.vendor], batch)
+                batch = []
+        if batch:
+            cursor.executemany(INSERT_SQL[connection.vendor], batch)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('initiatives', '0004_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('initiatives', '0005_search_index'),
+    ]
+
+    operations = [
+        # Najpierw bez unikalności - klucze i scalenie duplikatów w 0007
+        migrations.AddField(
+            model_name='tag',
+            name='key',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,78 @@
+import unicodedata
+
+from django.db import migrations
+
+# Kopia logiki z initiatives/tag_merge.py i text.py w chwili tworzenia migracji -
+# działa na modelach historycznych i nie zależy od późniejszych zmian kodu aplikacji
+KEY_MAX_LENGTH = 100
+BATCH_SIZE = 500
+
+
+def clean_tag_name(name):
+    return ' '.join((name or '').split())
+
+
+def tag_key(name):
+    return unicodedata.normalize('NFC', clean_tag_name(name)).casefold()[:KEY_MAX_LENGTH]
+
+
+def merge_tags(apps, schema_editor):
+    using = schema_editor.connection.alias
+    Tag = apps.get_model('initiatives', 'Tag')
+    through = apps.get_model('initiatives', 'Initiative').tags.through
+
+    # Pierwszy tag (najmniejsze id) każdego klucza zostaje, pozostałe są scalane do niego
+    keep_ids = {}
+    mapping = {}
+    changed = []
+    for tag in Tag.objects.using(using).order_by('id').only('id', 'name', 'key').iterator(chunk_size=2000):
+        key = tag_key(tag.name)
+        if key in keep_ids:
+            mapping[tag.pk] = keep_ids[key]
+            continue
+        keep_ids[key] = tag.pk
+        name = clean_tag_name(tag.name)
+        if (tag.name, tag.key) != (name, key):
+            tag.name, tag.key = name, key
+            changed.append(tag)
+
+    old_ids = list(mapping)
+    for start in range(0, len(old_ids), BATCH_SIZE):
+        batch = old_ids[start:start + BATCH_SIZE]
+        links = through.objects.using(using).filter(tag_id__in=batch).values_list('initiative_id', 'tag_id')
+        targets = sorted({(initiative_id, mapping[tag_id]) for initiative_id, tag_id in links})
+        for chunk_start in range(0, len(targets), BATCH_SIZE):
+            chunk = targets[chunk_start:chunk_start + BATCH_SIZE]
+            # Bez par, które już istnieją
+            existing = set(
+                through.objects.using(using)
+                .filter(initiative_id__in={pair[0] for pair in chunk}, tag_id__in={pair[1] for pair in chunk})
+                .values_list('initiative_id', 'tag_id')
+            )
+            through.objects.using(using).bulk_create(
+                [through(initiative_id=initiative_id, tag_id=tag_id) for initiative_id, tag_id in chunk if (initiative_id, tag_id) not in existing],
+            )
+        through.objects.using(using).filter(tag_id__in=batch).delete()
+        Tag.objects.using(using).filter(pk__in=batch).delete()
+
+    if changed:
+        # Najpierw klucze tymczasowe - nowy klucz jednego tagu może być jeszcze starym kluczem innego
+        final_keys = [tag.key for tag in changed]
+        for tag in changed:
+            tag.key = f'#{tag.pk}'
+        Tag.objects.using(using).bulk_update(changed, ['key'], batch_size=BATCH_SIZE)
+        for tag, key in zip(changed, final_keys):
+            tag.key = key
+        Tag.objects.using(using).bulk_update(changed, ['name', 'key'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('initiatives', '0006_tag_key'),
+    ]
+
+    operations = [
+        # Scalonych tagów nie da się rozdzielić z powrotem - cofnięcie nic nie robi
+        migrations.RunPython(merge_tags, migrations.RunPython.noop),
+    ]
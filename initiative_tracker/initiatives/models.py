@@ -1,9 +1,20 @@
 # initiatives/models.py
+import uuid
+
 from django.db import models
+
+from .text import clean_tag_name, tag_key
 # Usunięto import User
 
 class Tag(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # Klucz kanoniczny (text.tag_key) - "Nauka" i "nauka " to ten sam tag
+    key = models.CharField(max_length=100, unique=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.name = clean_tag_name(self.name)
+        self.key = tag_key(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -89,4 +100,74 @@ class Initiative(models.Model):
     class Meta:
         verbose_name = "Inicjatywa"
         verbose_name_plural = "Inicjatywy"
-        ordering = ['-created_at', 'name']
\ No newline at end of file
+        ordering = ['-created_at', 'name']
+        indexes = [
+            # Domyślny klucz naturalny importu w trybie upsert
+            models.Index(fields=['name', 'implementing_entity_name'], name='initiative_natural_key_idx'),
+            # Paginacja kursorem po (-created_at, id)
+            models.Index(fields=['-created_at', 'id'], name='initiative_keyset_idx'),
+            # Filtry listy z zachowaniem kolejności stronicowania
+            models.Index(fields=['entity_status', '-created_at', 'id'], name='initiative_status_idx'),
+            models.Index(fields=['implementation_area', '-created_at', 'id'], name='initiative_area_idx'),
+            models.Index(fields=['funding_source', '-created_at', 'id'], name='initiative_funding_idx'),
+        ]
+
+class ImportJob(models.Model):
+    """Background import of a CSV/XLSX file, polled by the frontend."""
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_COMPLETED = 'COMPLETED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CANCELLED = 'CANCELLED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Oczekuje'),
+        (STATUS_RUNNING, 'W trakcie'),
+        (STATUS_COMPLETED, 'Zakończony'),
+        (STATUS_FAILED, 'Błąd'),
+        (STATUS_CANCELLED, 'Anulowany'),
+    ]
+    FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+    MODE_CREATE = 'create'
+    MODE_UPSERT = 'upsert'
+    MODE_CHOICES = [
+        (MODE_CREATE, 'Dodawanie nowych'),
+        (MODE_UPSERT, 'Aktualizacja po kluczu naturalnym'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Status")
+    file_name = models.CharField(max_length=255, verbose_name="Nazwa pliku")
+    file_path = models.CharField(max_length=500, verbose_name="Ścieżka pliku na serwerze")
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=MODE_CREATE, verbose_name="Tryb importu")
+    # Pola modelu oddzielone przecinkiem, np. 'name,implementing_entity_name'
+    natural_key = models.CharField(max_length=255, blank=True, default='', verbose_name="Klucz naturalny")
+
+    # --- Postęp ---
+    rows_total = models.PositiveIntegerField(blank=True, null=True, verbose_name="Szacowana liczba wierszy")
+    rows_processed = models.PositiveIntegerField(default=0, verbose_name="Przetworzone wiersze")
+    imported_count = models.PositiveIntegerField(default=0, verbose_name="Dodane inicjatywy")
+    updated_count = models.PositiveIntegerField(default=0, verbose_name="Zaktualizowane inicjatywy")
+    unchanged_count = models.PositiveIntegerField(default=0, verbose_name="Inicjatywy bez zmian")
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name="Pominięte wiersze")
+    # Lista {'row': ..., 'reason': ...}, przycięta do MAX_REPORTED_SKIPPED_ROWS
+    skipped_rows = models.JSONField(default=list, blank=True, verbose_name="Powody pominięcia")
+    error = models.TextField(blank=True, null=True, verbose_name="Błąd")
+    cancel_requested = models.BooleanField(default=False, verbose_name="Żądanie anulowania")
+
+    # --- Pola automatyczne ---
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f'{self.file_name} ({self.get_status_display()})'
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    class Meta:
+        verbose_name = "Zadanie importu"
+        verbose_name_plural = "Zadania importu"
+        ordering = ['-created_at']
@@ -0,0 +1,161 @@
+# initiatives/pagination.py
+import base64
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (cursor) pagination on (-created_at, id).
+
+    Every page is a single indexed range scan, so deep pages cost the same
+    as the first one. Pagination is opt-in: without 'cursor' or 'page_size'
+    in the query the full list is returned, as before.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    default_page_size = 50
+    max_page_size = 1000
+    ordering = ('-created_at', 'id')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.default_page_size))
+        except ValueError:
+            page_size = self.default_page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def page_queryset(self, queryset, request):
+        """Queryset of the requested page plus one row, or None without pagination."""
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+        # Jeden dodatkowy wiersz mówi, czy istnieje następna strona
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.last_position = self.position(page[-1]) if page else None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.finish_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset for async views."""
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.finish_page([row async for row in queryset])
+
+    @staticmethod
+    def position(item):
+        # Obsługuje zarówno instancje modelu, jak i słowniki z .values()
+        if isinstance(item, dict):
+            return item['created_at'], item['id']
+        return item.created_at, item.id
+
+    def encode_cursor(self, position):
+        created_at, pk = position
+        raw = f'{created_at.isoformat()}|{pk}'.encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+            created_at, pk = raw.split('|')
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(cursor)
+            return created_at, int(pk)
+        except (ValueError, UnicodeError, TypeError):
+            raise NotFound('Nieprawidłowy kursor.')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator that never runs an unbounded COUNT(*) on a large table.
+
+    Without filters the row count is estimated: the planner statistics on
+    PostgreSQL (pg_class.reltuples), otherwise an exact count cached for
+    estimate_timeout seconds. The estimate is used only above count_limit.
+    Filtered lists are counted up to count_limit rows, so at most
+    count_limit / per_page pages are offered.
+    """
+    count_limit = 10000
+    estimate_timeout = 300
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.where:
+            estimate = self.estimate(queryset)
+            if estimate is not None and estimate >= self.count_limit:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
+
+    def estimate(self, queryset):
+        table = queryset.model._meta.db_table
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+            # -1: tabela jeszcze nie była analizowana
+            return row[0] if row and row[0] >= 0 else None
+        return caches['default'].get_or_set(
+            f'admin-count:{queryset.db}:{table}',
+            lambda: queryset.model._base_manager.using(queryset.db).count(),
+            self.estimate_timeout,
+        )
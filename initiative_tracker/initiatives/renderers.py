@@ -0,0 +1,80 @@
+# initiatives/renderers.py
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .fast_serializers import columnar
+
+try:
+    import msgpack
+except ImportError: # Opcjonalna zależność - bez niej format msgpack nie jest oferowany
+    msgpack = None
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Used only to negotiate the export format (?format=csv|xlsx|ndjson).
+    The export view streams the file itself; only error payloads
+    (e.g. invalid filters) are rendered here, as JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class XLSXExportRenderer(ExportRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Columnar JSON for initiative lists (?format=columnar): column names
+    once, rows as arrays carrying choice codes, and each choice-label
+    table once. Paginated lists keep 'next' and get the layout in
+    'results'; other payloads (detail, errors) are plain JSON.
+    """
+    media_type = 'application/vnd.initiatives.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """The same data as JSON, encoded as MessagePack (?format=msgpack). Requires msgpack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # default=str: leniwe tłumaczenia i inne typy, które JSONRenderer zamienia na tekst
+        return msgpack.packb(data, use_bin_type=True, default=str)
+
+
+def to_columnar(data):
+    if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+        return columnar(data)
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return {**data, 'results': columnar(data['results'])}
+    return data
+
+
+# Formaty listy inicjatyw oprócz domyślnych (msgpack tylko z zainstalowanym pakietem)
+LIST_RENDERERS = [ColumnarJSONRenderer] + ([MessagePackRenderer] if msgpack is not None else [])
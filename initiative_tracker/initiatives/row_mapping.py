@@ -0,0 +1,95 @@
+# initiatives/row_mapping.py
+"""
+Pure row validation and mapping for the initiative import.
+
+This module must not import Django: it runs in ProcessPoolExecutor workers
+(spawned processes without configured settings). Everything that depends
+on the model is precomputed into a plain "row spec" by importer.build_row_spec.
+"""
+
+from .text import clean_tag_name, tag_key
+
+
+class RowError(Exception):
+    """A single row is invalid and is reported in skipped_rows."""
+
+
+def split_tags(value):
+    """Comma separated tag names, cleaned; repeats of the same tag key dropped."""
+    names = {}
+    for part in value.split(','):
+        name = clean_tag_name(part)
+        if name:
+            names.setdefault(tag_key(name), name)
+    return list(names.values())
+
+
+def map_row(row, col_indices, spec):
+    """
+    Convert one file row into model field values and a list of tag names.
+    Raises RowError when the row cannot be imported.
+
+    spec maps each column header to a dict with the model 'field' and its
+    'null', 'max_length', 'required' (error message or None) and 'choices'
+    (lower-cased code/label -> code, or None) attributes; the tags column
+    only has 'field' and the tag name 'max_length'.
+    """
+    initiative_data = {}
+    tag_names = []
+
+    for header_name, column in spec.items():
+        model_field = column['field']
+        index = col_indices[header_name]
+        cell_value = row[index] if index < len(row) else ''
+        cell_value = str(cell_value).strip() if cell_value is not None else ''
+
+        if model_field == 'tags':
+            tag_names = split_tags(cell_value)
+            max_length = column['max_length']
+            for name in tag_names:
+                if len(name) > max_length:
+                    raise RowError(f'Tag "{name[:20]}..." w kolumnie "{header_name}" przekracza {max_length} znaków.')
+            continue
+
+        if not cell_value:
+            if column['required']:
+                raise RowError(column['required'])
+            # Ustaw null dla pól które mogą być null, jeśli komórka jest pusta
+            if column['null']:
+                initiative_data[model_field] = None
+            continue
+
+        if column['choices'] is not None:
+            code = column['choices'].get(cell_value.lower())
+            if code is None:
+                raise RowError(f'Nieprawidłowa wartość "{cell_value}" w kolumnie "{header_name}".')
+            cell_value = code
+
+        max_length = column['max_length']
+        if max_length and len(cell_value) > max_length:
+            raise RowError(f'Wartość w kolumnie "{header_name}" przekracza {max_length} znaków.')
+
+        initiative_data[model_field] = cell_value
+
+    return initiative_data, tag_names
+
+
+def map_chunk(numbered_rows, col_indices, spec):
+    """
+    Map a chunk of (row_number, row) pairs.
+    Returns (prepared, skipped): prepared holds (row_number, data, tag_names),
+    skipped holds {'row': ..., 'reason': ...} dicts, both in row order.
+    """
+    prepared = []
+    skipped = []
+    for row_number, row in numbered_rows:
+        try:
+            initiative_data, tag_names = map_row(row, col_indices, spec)
+        except RowError as e:
+            skipped.append({'row': row_number, 'reason': str(e)})
+            continue
+        except Exception as e:
+            skipped.append({'row': row_number, 'reason': f'Błąd przetwarzania wiersza: {e}'})
+            continue
+        prepared.append((row_number, initiative_data, tag_names))
+    return prepared, skipped
@@ -0,0 +1,204 @@
+# initiatives/search.py
+"""
+Full-text search index over initiatives.
+
+The index lives in its own table, INDEX_TABLE, keyed by initiative id:
+an FTS5 virtual table on SQLite, a tsvector column with a GIN index on
+PostgreSQL. Text is folded (text.fold) both when indexing and when
+querying, so 'lodz' finds 'Łódź'. Every query word is prefix matched and
+all of them must occur; results are ordered by bm25 / ts_rank with the
+name and acronym weighted above the description.
+
+The table is created by migration 0005 and kept in sync by signals
+(signals.py) and the importer. Other database backends have no index:
+search_backend() returns None and callers fall back to icontains.
+"""
+from django.db import connection as default_connection
+
+from .text import fold, words
+
+INDEX_TABLE = 'initiatives_search'
+
+# Indeksowane pola w kolejności kolumn indeksu, z wagami rankingu
+INDEXED_FIELDS = ('name', 'acronym', 'implementing_entity_name', 'location_text', 'description')
+FIELD_WEIGHTS = (10.0, 8.0, 3.0, 2.0, 1.0)
+
+# Dłuższe zapytania niż tyle słów są przycinane
+MAX_QUERY_WORDS = 10
+
+
+def document_row(pk, values):
+    """(id, folded text of every indexed field) for one initiative."""
+    return (pk, *(fold(value) for value in values))
+
+
+class SQLiteSearchBackend:
+    def create(self, cursor):
+        columns = ', '.join(INDEXED_FIELDS)
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {INDEX_TABLE} USING fts5({columns}, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def index(self, cursor, rows):
+        rows = list(rows)
+        self.remove(cursor, [row[0] for row in rows])
+        placeholders = ', '.join(['%s'] * (len(INDEXED_FIELDS) + 1))
+        cursor.executemany(
+            f"INSERT INTO {INDEX_TABLE} (rowid, {', '.join(INDEXED_FIELDS)}) VALUES ({placeholders})",
+            rows,
+        )
+
+    def remove(self, cursor, ids):
+        # Po jednym rowid - bez limitu liczby parametrów zapytania SQLite
+        cursor.executemany(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def match_expression(self, terms):
+        # "słowo"* - dopasowanie prefiksu, wszystkie słowa muszą wystąpić
+        return ' '.join(f'"{word}"*' for word in terms)
+
+    def matching_ids_sql(self, terms):
+        return (
+            f'SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s',
+            [self.match_expression(terms)],
+        )
+
+    def ranked_ids_sql(self, terms, restrict_sql, restrict_params, limit, offset):
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        restrict = f' AND rowid IN ({restrict_sql})' if restrict_sql else ''
+        # bm25() zwraca wartości ujemne - im mniejsza, tym lepsze dopasowanie
+        return (
+            f'SELECT rowid, -bm25({INDEX_TABLE}, {weights}) AS rank FROM {INDEX_TABLE} '
+            f'WHERE {INDEX_TABLE} MATCH %s{restrict} ORDER BY bm25({INDEX_TABLE}, {weights}), rowid '
+            f'LIMIT %s OFFSET %s',
+            [self.match_expression(terms), *restrict_params, limit, offset],
+        )
+
+
+class PostgresSearchBackend:
+    # Wagi tsvector: A > B > C > D
+    WEIGHT_CLASSES = ('A', 'A', 'B', 'C', 'D')
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE {INDEX_TABLE} ('
+            'initiative_id bigint PRIMARY KEY REFERENCES initiatives_initiative (id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        cursor.execute(f'CREATE INDEX {INDEX_TABLE}_document_idx ON {INDEX_TABLE} USING GIN (document)')
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def index(self, cursor, rows):
+        # Tekst jest już znormalizowany - konfiguracja 'simple' bez stemmingu
+        document = ' || '.join(
+            f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in self.WEIGHT_CLASSES
+        )
+        cursor.executemany(
+            f'INSERT INTO {INDEX_TABLE} (initiative_id, document) VALUES (%s, {document}) '
+            'ON CONFLICT (initiative_id) DO UPDATE SET document = EXCLUDED.document',
+            list(rows),
+        )
+
+    def remove(self, cursor, ids):
+        ids = list(ids)
+        if ids:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE initiative_id = ANY(%s)', [ids])
+
+    def tsquery(self, terms):
+        return ' & '.join(f'{word}:*' for word in terms)
+
+    def matching_ids_sql(self, terms):
+        return (
+            f"SELECT initiative_id FROM {INDEX_TABLE} WHERE document @@ to_tsquery('simple', %s)",
+            [self.tsquery(terms)],
+        )
+
+    def ranked_ids_sql(self, terms, restrict_sql, restrict_params, limit, offset):
+        restrict = f' AND initiative_id IN ({restrict_sql})' if restrict_sql else ''
+        return (
+            f"SELECT initiative_id, ts_rank(document, query) AS rank "
+            f"FROM {INDEX_TABLE}, to_tsquery('simple', %s) AS query "
+            f'WHERE document @@ query{restrict} ORDER BY rank DESC, initiative_id LIMIT %s OFFSET %s',
+            [self.tsquery(terms), *restrict_params, limit, offset],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def search_backend(connection=None):
+    backend_class = BACKENDS.get((connection or default_connection).vendor)
+    return backend_class() if backend_class else None
+
+
+def query_words(query):
+    """Folded words of a search query; each one is prefix matched."""
+    return words(query)[:MAX_QUERY_WORDS]
+
+
+def index_initiatives(initiatives):
+    """Add or refresh index entries of saved Initiative instances."""
+    backend = search_backend()
+    rows = [
+        document_row(initiative.pk, [getattr(initiative, field) for field in INDEXED_FIELDS])
+        for initiative in initiatives
+    ]
+    if backend and rows:
+        with default_connection.cursor() as cursor:
+            backend.index(cursor, rows)
+
+
+def remove_from_index(ids):
+    backend = search_backend()
+    if backend:
+        with default_connection.cursor() as cursor:
+            backend.remove(cursor, ids)
+
+
+def rebuild_index(queryset, connection=None, batch_size=2000):
+    """Index every initiative of the queryset (e.g. to rebuild the index after restoring data)."""
+    connection = connection or default_connection
+    backend = search_backend(connection)
+    rows = queryset.order_by('pk').values_list('pk', *INDEXED_FIELDS).iterator(chunk_size=batch_size)
+    with connection.cursor() as cursor:
+        batch = []
+        for pk, *values in rows:
+            batch.append(document_row(pk, values))
+            if len(batch) >= batch_size:
+                backend.index(cursor, batch)
+                batch = []
+        if batch:
+            backend.index(cursor, batch)
+
+
+def matching_ids_sql(terms):
+    """
+    (sql, params) selecting ids of initiatives matching all query words,
+    for use as pk__in=RawSQL(...), or None when the database has no index.
+    """
+    backend = search_backend()
+    if backend is None:
+        return None
+    return backend.matching_ids_sql(terms)
+
+
+def ranked_ids(terms, queryset=None, limit=20, offset=0):
+    """
+    [(id, rank), ...] best matches first. queryset, when given, restricts
+    the matches (e.g. to the filtered list) without losing the ranking.
+    """
+    restrict_sql, restrict_params = '', ()
+    if queryset is not None:
+        restrict_sql, restrict_params = queryset.order_by().values('pk').query.sql_with_params()
+    sql, params = search_backend().ranked_ids_sql(terms, restrict_sql, restrict_params, limit, offset)
+    with default_connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
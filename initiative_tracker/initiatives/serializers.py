@@ -1,13 +1,202 @@
 # initiatives/serializers.py
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Initiative, Tag
 
-class TagSerializer(serializers.ModelSerializer):
+from .cache import SCOPE_INITIATIVES, SCOPE_TAGS, invalidate
+from .fieldsets import SparseFieldsetMixin
+from .instrumentation import TimedSerializerMixin
+from .models import ImportJob, Initiative, Tag
+from .search import index_initiatives
+from .text import clean_tag_name, tag_key
+
+# Operacje endpointu zbiorczego
+BULK_CREATE = 'create'
+BULK_UPDATE = 'update'
+BULK_DELETE = 'delete'
+BULK_OPERATIONS = (BULK_CREATE, BULK_UPDATE, BULK_DELETE)
+BULK_MAX_ITEMS = 10000
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+class TagSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
+        list_serializer_class = TimedListSerializer
+
+    def validate_name(self, value):
+        # Unikalność po kluczu kanonicznym, nie tylko po dokładnej nazwie
+        name = clean_tag_name(value)
+        duplicates = Tag.objects.filter(key=tag_key(name))
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(f'Tag "{duplicates[0].name}" już istnieje.')
+        return name
+
+class TagPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Tag id field that first looks in context['tag_cache'] ({str(id): Tag}),
+    filled by the bulk serializer with one query for all items.
+    """
+    def to_internal_value(self, data):
+        tag_cache = self.context.get('tag_cache')
+        if tag_cache is not None and str(data) in tag_cache:
+            return tag_cache[str(data)]
+        return super().to_internal_value(data)
+
+
+class BulkInitiativeListSerializer(TimedListSerializer):
+    """
+    Validates and applies a list of bulk operations:
+    {"op": "create", ...fields}, {"op": "update", "id": 1, ...fields}
+    (partial update) and {"op": "delete", "id": 1}. Without "op" an item
+    with an id is an update, otherwise a create.
+
+    Every item is validated by InitiativeSerializer. With
+    context['partial_items'] invalid items are reported in item_errors
+    and the valid ones are still applied; otherwise any error fails the
+    whole request. save() applies all writes set-wise in one transaction.
+    """
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Oczekiwano listy operacji.']})
+        if len(data) > BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'Maksymalnie {BULK_MAX_ITEMS} operacji w jednym żądaniu.']}
+            )
+
+        operations = [self.parse_operation(item) for item in data]
+        ids = {pk for op, pk, _, error in operations if pk is not None and not error}
+        self.instances = Initiative.objects.in_bulk(ids)
+        tag_ids = {
+            str(tag_id)
+            for op, _, payload, error in operations
+            if not error and isinstance(payload.get('tags'), list)
+            for tag_id in payload['tags']
+        }
+        self.child.context['tag_cache'] = {
+            str(tag.pk): tag for tag in Tag.objects.filter(pk__in=[tag_id for tag_id in tag_ids if tag_id.isdigit()])
+        }
+
+        validated = []
+        self.item_errors = []
+        seen_ids = set()
+        for index, (op, pk, payload, error) in enumerate(operations):
+            if not error and pk is not None:
+                if pk not in self.instances:
+                    error = {'id': ['Nie znaleziono inicjatywy.']}
+                elif pk in seen_ids:
+                    error = {'id': ['Inicjatywa występuje już w tym żądaniu.']}
+                seen_ids.add(pk)
+            if not error and op != BULK_DELETE:
+                # partial ustawiane na korzeniu - z niego korzystają pola przy walidacji
+                self.partial = op == BULK_UPDATE
+                self.child.instance = self.instances.get(pk)
+                try:
+                    payload = self.child.run_validation(payload)
+                except serializers.ValidationError as exc:
+                    error = exc.detail
+            if error:
+                self.item_errors.append({'index': index, 'op': op, 'id': pk, 'errors': error})
+            else:
+                validated.append({'index': index, 'op': op, 'id': pk, 'data': payload})
+        self.partial = False
+        self.child.instance = None
+
+        if self.item_errors and not self.context.get('partial_items'):
+            raise serializers.ValidationError({'errors': self.item_errors})
+        return validated
+
+    def parse_operation(self, item):
+        """(op, id, payload, error) of one raw item."""
+        if not isinstance(item, dict):
+            return None, None, {}, {'non_field_errors': ['Oczekiwano obiektu.']}
+        payload = {key: value for key, value in item.items() if key not in ('op', 'id')}
+        pk = item.get('id')
+        op = item.get('op') or (BULK_UPDATE if pk is not None else BULK_CREATE)
+        if op not in BULK_OPERATIONS:
+            return op, None, payload, {'op': [f'Dozwolone operacje: {", ".join(BULK_OPERATIONS)}.']}
+        if op == BULK_CREATE:
+            return op, None, payload, None
+        try:
+            return op, int(pk), payload, None
+        except (TypeError, ValueError):
+            return op, None, payload, {'id': ['Wymagany identyfikator inicjatywy.']}
+
+    def create(self, validated_data):
+        """Apply the operations; returns [{'index', 'op', 'id'}, ...] in input order."""
+        creates = [item for item in validated_data if item['op'] == BULK_CREATE]
+        updates = [item for item in validated_data if item['op'] == BULK_UPDATE]
+        deletes = [item['id'] for item in validated_data if item['op'] == BULK_DELETE]
+        through = Initiative.tags.through
+
+        with transaction.atomic():
+            created = Initiative.objects.bulk_create([
+                Initiative(**{name: value for name, value in item['data'].items() if name != 'tags'})
+                for item in creates
+            ])
+            links = [
+                through(initiative_id=initiative.pk, tag_id=tag.pk)
+                for item, initiative in zip(creates, created)
+                for tag in item['data'].get('tags', [])
+            ]
+            for item, initiative in zip(creates, created):
+                item['id'] = initiative.pk
+
+            updated = []
+            update_fields = {'updated_at'}
+            retagged = {}
+            now = timezone.now()
+            for item in updates:
+                initiative = self.instances[item['id']]
+                for name, value in item['data'].items():
+                    if name == 'tags':
+                        retagged[initiative.pk] = {tag.pk for tag in value}
+                    else:
+                        setattr(initiative, name, value)
+                        update_fields.add(name)
+                # bulk_update nie ustawia auto_now - zrób to ręcznie
+                initiative.updated_at = now
+                updated.append(initiative)
+            if updated:
+                Initiative.objects.bulk_update(updated, sorted(update_fields), batch_size=500)
+            if retagged:
+                # Różnica tagów: usuń niepotrzebne powiązania, dodaj brakujące
+                current = {}
+                for link_id, initiative_id, tag_id in through.objects.filter(
+                    initiative_id__in=retagged
+                ).values_list('id', 'initiative_id', 'tag_id'):
+                    current.setdefault(initiative_id, {})[tag_id] = link_id
+                stale_links = [
+                    link_id
+                    for initiative_id, tag_ids in retagged.items()
+                    for tag_id, link_id in current.get(initiative_id, {}).items()
+                    if tag_id not in tag_ids
+                ]
+                if stale_links:
+                    through.objects.filter(id__in=stale_links).delete()
+                links.extend(
+                    through(initiative_id=initiative_id, tag_id=tag_id)
+                    for initiative_id, tag_ids in retagged.items()
+                    for tag_id in tag_ids - current.get(initiative_id, {}).keys()
+                )
+            through.objects.bulk_create(links)
+
+            if deletes:
+                # delete() wysyła post_delete - indeks wyszukiwania i cache aktualne
+                Initiative.objects.filter(id__in=deletes).delete()
 
-class InitiativeSerializer(serializers.ModelSerializer):
+            # bulk_create/bulk_update nie wysyłają sygnałów
+            index_initiatives(created + updated)
+            invalidate(SCOPE_INITIATIVES, SCOPE_TAGS)
+
+        return [{'index': item['index'], 'op': item['op'], 'id': item['id']} for item in validated_data]
+
+
+class InitiativeSerializer(SparseFieldsetMixin, TimedSerializerMixin, serializers.ModelSerializer):
     # Pola *_display do odczytu czytelnych wartości dla pól 'choices'
     entity_status_display = serializers.CharField(source='get_entity_status_display', read_only=True)
     implementation_area_display = serializers.CharField(source='get_implementation_area_display', read_only=True)
@@ -15,17 +204,18 @@ class InitiativeSerializer(serializers.ModelSerializer):
 
     # Pole 'tags' przyjmuje listę ID przy zapisie (POST/PUT/PATCH)
     # i zwraca listę ID przy odczycie (GET)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = TagPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
         required=False, # Tagi nie są wymagane
     )
 
-    # Opcjonalnie: Jeśli chcesz zwracać pełne obiekty tagów w GET zamiast ID
-    # tags_details = TagSerializer(source='tags', many=True, read_only=True)
+    # Pełne obiekty tagów - tylko na żądanie (?expand=tags), z tego samego prefetch co 'tags'
+    tags_details = TagSerializer(source='tags', many=True, read_only=True)
 
     class Meta:
         model = Initiative
+        list_serializer_class = TimedListSerializer
         # Lista wszystkich pól modelu, które mają być w API
         fields = [
             'id',
@@ -46,7 +236,7 @@ class InitiativeSerializer(serializers.ModelSerializer):
             'funding_source_display', # Do odczytu
             'url', # Strona WWW inicjatywy
             'tags', # Do zapisu i odczytu (ID)
-            # 'tags_details', # Opcjonalne pole do odczytu pełnych tagów
+            'tags_details', # Opcjonalne pole do odczytu pełnych tagów (?expand=tags)
             # Pola automatyczne
             'created_at',
             'updated_at',
@@ -60,11 +250,18 @@ class InitiativeSerializer(serializers.ModelSerializer):
             'entity_status_display',
             'implementation_area_display',
             'funding_source_display',
-            # 'tags_details', # Jeśli dodano
+            'tags_details',
         ]
         # Można też określić pola tylko do zapisu, jeśli to potrzebne
         # write_only_fields = [...]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        expand = request.query_params.get('expand', '').split(',') if request else []
+        if 'tags' not in expand:
+            self.fields.pop('tags_details', None) # Mogło już zniknąć przez ?fields= / ?exclude=
+
     # Walidacja długości opisu (opcjonalnie)
     def validate_description(self, value):
         if value and len(value) > 1000:
@@ -92,4 +289,69 @@ class InitiativeSerializer(serializers.ModelSerializer):
     def validate_funding_source(self, value):
         if not value:
             raise serializers.ValidationError("Źródło finansowania jest wymagane.")
-        return value
\ No newline at end of file
+        return value
+
+class BulkInitiativeSerializer(InitiativeSerializer):
+    """InitiativeSerializer whose many=True form applies bulk operations (POST /api/initiatives/bulk/)."""
+    class Meta(InitiativeSerializer.Meta):
+        list_serializer_class = BulkInitiativeListSerializer
+
+class ImportJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    message = serializers.SerializerMethodField()
+    throughput = serializers.SerializerMethodField() # Wiersze na sekundę
+    eta_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id',
+            'status',
+            'status_display',
+            'message',
+            'file_name',
+            'mode',
+            'natural_key',
+            'rows_total',
+            'rows_processed',
+            'imported_count',
+            'updated_count',
+            'unchanged_count',
+            'skipped_count',
+            'skipped_rows',
+            'throughput',
+            'eta_seconds',
+            'error',
+            'cancel_requested',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_message(self, obj):
+        summary = f'Dodano {obj.imported_count} inicjatyw.'
+        if obj.mode == ImportJob.MODE_UPSERT:
+            summary = (
+                f'Dodano {obj.imported_count}, zaktualizowano {obj.updated_count}, '
+                f'bez zmian {obj.unchanged_count} inicjatyw.'
+            )
+        if obj.status == ImportJob.STATUS_COMPLETED:
+            return f'Import zakończony. {summary}'
+        if obj.status == ImportJob.STATUS_CANCELLED:
+            return f'Import anulowany. {summary}'
+        if obj.status == ImportJob.STATUS_FAILED:
+            return obj.error
+        return f'Przetworzono {obj.rows_processed} wierszy.'
+
+    def get_throughput(self, obj):
+        if not obj.started_at:
+            return None
+        elapsed = ((obj.finished_at or timezone.now()) - obj.started_at).total_seconds()
+        return round(obj.rows_processed / elapsed, 1) if elapsed > 0 else None
+
+    def get_eta_seconds(self, obj):
+        throughput = self.get_throughput(obj)
+        if obj.is_finished or not throughput or obj.rows_total is None:
+            return None
+        return round(max(obj.rows_total - obj.rows_processed, 0) / throughput, 1)
@@ -0,0 +1,39 @@
+# initiatives/signals.py
+"""
+Invalidate cached API responses (see cache.py) and keep the search index
+(see search.py) in sync whenever initiatives or tags change. Bulk
+operations do not send signals - code using them (e.g. the importer)
+does both itself.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import SCOPE_INITIATIVES, SCOPE_TAGS, invalidate
+from .models import Initiative, Tag
+from .search import index_initiatives, remove_from_index
+
+
+@receiver(post_save, sender=Initiative)
+def initiative_saved(sender, instance, **kwargs):
+    index_initiatives([instance])
+    invalidate(SCOPE_INITIATIVES)
+
+
+@receiver(post_delete, sender=Initiative)
+def initiative_deleted(sender, instance, **kwargs):
+    remove_from_index([instance.pk])
+    # Usunięcie powiązań z tagami zmienia liczbę użyć tagów (autocomplete)
+    invalidate(SCOPE_INITIATIVES, SCOPE_TAGS)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    # Nazwy tagów są też częścią odpowiedzi inicjatyw (?expand=tags)
+    invalidate(SCOPE_TAGS, SCOPE_INITIATIVES)
+
+
+@receiver(m2m_changed, sender=Initiative.tags.through)
+def initiative_tags_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(SCOPE_INITIATIVES, SCOPE_TAGS)
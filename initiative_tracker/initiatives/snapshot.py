@@ -0,0 +1,369 @@
+# initiatives/snapshot.py
+"""
+In-process columnar snapshot of initiatives for multi-dimensional counts
+(/api/initiatives/crosstab/).
+
+The snapshot holds NumPy arrays: initiative ids (sorted), the choice
+fields dictionary-encoded as small integer codes, created_at as int64
+microseconds (plus the month number derived from it) and the tags as a
+CSR matrix (indptr/indices over tag columns). It is built with a single
+values_list scan joined with the tags and counted with bincount, so a
+crosstab costs no SQL GROUP BY.
+
+Refreshing follows the response cache versions (cache.py): when only
+the 'initiatives' version changed, rows with a newer updated_at are
+merged in (new ids appended, changed rows overwritten, copy-on-write);
+a change of the 'tags' version (tag links, deletes, bulk writes) or
+anything the merge cannot express rebuilds the snapshot. Without NumPy,
+or with INITIATIVE_SNAPSHOT off, the same counts come from a grouped
+SQL query.
+"""
+import datetime
+import threading
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from rest_framework.exceptions import ValidationError
+
+from .cache import SCOPE_INITIATIVES, SCOPE_TAGS, get_version
+from .filters import InitiativeFilterBackend, parse_datetime_param, split_param
+from .models import Initiative, Tag
+from .text import tag_key
+
+try:
+    import numpy as np
+except ImportError: # NumPy jest opcjonalny - bez niego zliczanie w SQL
+    np = None
+
+CHOICE_DIMENSIONS = ('entity_status', 'implementation_area', 'funding_source')
+DIMENSIONS = CHOICE_DIMENSIONS + ('tag', 'month')
+# Zmiany zapisane tyle sekund przed ostatnio widzianą są czytane ponownie
+# (transakcje zatwierdzone później niż ich updated_at)
+REFRESH_OVERLAP = datetime.timedelta(seconds=5)
+# Powyżej tylu komórek zliczanie przez np.unique zamiast bincount
+BINCOUNT_MAX_CELLS = 1 << 22
+
+SCAN_FIELDS = ('id', *CHOICE_DIMENSIONS, 'created_at', 'updated_at', 'tags')
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def is_enabled():
+    return np is not None and getattr(settings, 'INITIATIVE_SNAPSHOT', True)
+
+
+def to_microseconds(value):
+    return (value - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def month_label(month):
+    """Months since 1970-01 -> 'YYYY-MM'."""
+    return f'{1970 + month // 12:04d}-{month % 12 + 1:02d}'
+
+
+def group_rows(rows):
+    """values_list rows (one per tag, ordered by id) -> [(id, codes, created, updated, tag ids)]."""
+    initiatives = []
+    for pk, *codes, created_at, updated_at, tag_id in rows:
+        if not initiatives or initiatives[-1][0] != pk:
+            initiatives.append((pk, codes, created_at, updated_at, set()))
+        if tag_id is not None:
+            initiatives[-1][4].add(tag_id)
+    return initiatives
+
+
+class InitiativeSnapshot:
+    def __init__(self, ids, codes, categories, created, indptr, indices, tag_ids, updated_until):
+        self.ids = ids
+        self.codes = codes # wymiar -> tablica kodów (indeksy w categories)
+        self.categories = categories # wymiar -> lista wartości pola
+        self.created = created
+        self.months = created.astype('datetime64[us]').astype('datetime64[M]').astype(np.int64)
+        self.indptr = indptr
+        self.indices = indices # kolumny tagów kolejnych inicjatyw
+        self.tag_ids = tag_ids # kolumna -> id tagu
+        self.link_rows = np.repeat(np.arange(len(ids)), np.diff(indptr))
+        self.updated_until = updated_until
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, initiatives, updated_until=None):
+        """initiatives: output of group_rows, ordered by id."""
+        categories = {
+            dimension: [code for code, _ in Initiative._meta.get_field(dimension).choices]
+            for dimension in CHOICE_DIMENSIONS
+        }
+        positions = {dimension: {code: i for i, code in enumerate(values)} for dimension, values in categories.items()}
+        tag_columns = {}
+        codes = {dimension: [] for dimension in CHOICE_DIMENSIONS}
+        ids, created, indptr, indices = [], [], [0], []
+        for pk, values, created_at, updated_at, tags in initiatives:
+            ids.append(pk)
+            for dimension, value in zip(CHOICE_DIMENSIONS, values):
+                # Wartości spoza choices (np. ze starszych danych) dopisywane do słownika
+                position = positions[dimension].setdefault(value, len(categories[dimension]))
+                if position == len(categories[dimension]):
+                    categories[dimension].append(value)
+                codes[dimension].append(position)
+            created.append(to_microseconds(created_at))
+            indices.extend(tag_columns.setdefault(tag_id, len(tag_columns)) for tag_id in sorted(tags))
+            indptr.append(len(indices))
+            if updated_until is None or updated_at > updated_until:
+                updated_until = updated_at
+        return cls(
+            ids=np.array(ids, dtype=np.int64),
+            codes={dimension: np.array(values, dtype=np.int16) for dimension, values in codes.items()},
+            categories=categories,
+            created=np.array(created, dtype=np.int64),
+            indptr=np.array(indptr, dtype=np.int64),
+            indices=np.array(indices, dtype=np.int32),
+            tag_ids=np.array(list(tag_columns), dtype=np.int64),
+            updated_until=updated_until,
+        )
+
+    @classmethod
+    def from_database(cls):
+        rows = Initiative.objects.order_by('id').values_list(*SCAN_FIELDS).iterator(chunk_size=10000)
+        return cls.build(group_rows(rows))
+
+    def row_tags(self, row):
+        return set(self.tag_ids[self.indices[self.indptr[row]:self.indptr[row + 1]]].tolist())
+
+    def merged(self, initiatives):
+        """
+        New snapshot with the changed rows applied, or None when the changes
+        need a rebuild (changed tags, an id that is neither known nor new).
+        """
+        if not initiatives:
+            return self
+        last_id = int(self.ids[-1]) if len(self.ids) else 0
+        updated, added = [], []
+        for initiative in initiatives:
+            pk = initiative[0]
+            row = int(np.searchsorted(self.ids, pk))
+            if row < len(self.ids) and self.ids[row] == pk:
+                if self.row_tags(row) != initiative[4]:
+                    return None
+                updated.append((row, initiative))
+            elif pk > last_id:
+                added.append(initiative)
+            else:
+                return None
+
+        codes = {dimension: values.copy() for dimension, values in self.codes.items()}
+        categories = {dimension: list(values) for dimension, values in self.categories.items()}
+        created = self.created.copy()
+        updated_until = self.updated_until
+        for row, (_, values, created_at, updated_at, _) in updated:
+            for dimension, value in zip(CHOICE_DIMENSIONS, values):
+                if value not in categories[dimension]:
+                    categories[dimension].append(value)
+                codes[dimension][row] = categories[dimension].index(value)
+            created[row] = to_microseconds(created_at)
+            updated_until = max(updated_until, updated_at) if updated_until else updated_at
+
+        snapshot = InitiativeSnapshot(self.ids, codes, categories, created, self.indptr, self.indices, self.tag_ids, updated_until)
+        if added:
+            # Nowe wiersze: osobny mały snapshot doklejony na końcu tablic
+            tail = InitiativeSnapshot.build(added, updated_until)
+            snapshot = snapshot.appended(tail)
+        return snapshot
+
+    def appended(self, tail):
+        categories = {dimension: list(values) for dimension, values in self.categories.items()}
+        codes = {}
+        for dimension in CHOICE_DIMENSIONS:
+            for value in tail.categories[dimension]:
+                if value not in categories[dimension]:
+                    categories[dimension].append(value)
+            remap = np.array([categories[dimension].index(value) for value in tail.categories[dimension]], dtype=np.int16)
+            codes[dimension] = np.concatenate([self.codes[dimension], remap[tail.codes[dimension]]])
+
+        tag_ids = self.tag_ids.tolist()
+        columns = {tag_id: column for column, tag_id in enumerate(tag_ids)}
+        for tag_id in tail.tag_ids.tolist():
+            if tag_id not in columns:
+                columns[tag_id] = len(tag_ids)
+                tag_ids.append(tag_id)
+        tag_remap = np.array([columns[tag_id] for tag_id in tail.tag_ids.tolist()], dtype=np.int32)
+        return InitiativeSnapshot(
+            ids=np.concatenate([self.ids, tail.ids]),
+            codes=codes,
+            categories=categories,
+            created=np.concatenate([self.created, tail.created]),
+            indptr=np.concatenate([self.indptr, tail.indptr[1:] + self.indptr[-1]]),
+            indices=np.concatenate([self.indices, tag_remap[tail.indices]]),
+            tag_ids=np.array(tag_ids, dtype=np.int64),
+            updated_until=tail.updated_until,
+        )
+
+    def mask(self, filters):
+        """Boolean row mask for the parsed filters (see parse_filters)."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for dimension in CHOICE_DIMENSIONS:
+            if filters.get(dimension):
+                selected = [i for i, value in enumerate(self.categories[dimension]) if value in filters[dimension]]
+                mask &= np.isin(self.codes[dimension], selected)
+        if filters.get('tag_ids') is not None:
+            link_hits = np.isin(self.tag_ids, list(filters['tag_ids']))[self.indices]
+            mask &= np.bincount(self.link_rows[link_hits], minlength=len(self.ids)) > 0
+        if filters.get('created_after'):
+            mask &= self.created >= to_microseconds(filters['created_after'])
+        if filters.get('created_before'):
+            mask &= self.created <= to_microseconds(filters['created_before'])
+        if filters.get('ids') is not None:
+            mask &= np.isin(self.ids, np.fromiter(filters['ids'], dtype=np.int64))
+        return mask
+
+    def crosstab(self, dimensions, filters):
+        mask = self.mask(filters)
+        total = int(mask.sum())
+        if 'tag' in dimensions:
+            # Jeden element na powiązanie inicjatywa-tag
+            selected = mask[self.link_rows]
+            rows = self.link_rows[selected]
+            tag_columns = self.indices[selected]
+        else:
+            rows = np.flatnonzero(mask)
+        if not len(rows):
+            return total, []
+
+        columns, sizes, decoders = [], [], []
+        for dimension in dimensions:
+            if dimension == 'tag':
+                columns.append(tag_columns)
+                sizes.append(len(self.tag_ids))
+                decoders.append(lambda column: int(self.tag_ids[column]))
+            elif dimension == 'month':
+                months = self.months[rows]
+                first = int(months.min())
+                columns.append(months - first)
+                sizes.append(int(months.max()) - first + 1)
+                decoders.append(lambda column, first=first: month_label(first + column))
+            else:
+                columns.append(self.codes[dimension][rows])
+                sizes.append(len(self.categories[dimension]))
+                decoders.append(lambda column, values=self.categories[dimension]: values[column])
+
+        keys = np.ravel_multi_index(columns, sizes)
+        cells = int(np.prod(sizes))
+        if cells <= BINCOUNT_MAX_CELLS:
+            counts = np.bincount(keys, minlength=cells)
+            present = np.flatnonzero(counts)
+            counts = counts[present]
+        else:
+            present, counts = np.unique(keys, return_counts=True)
+        coordinates = np.unravel_index(present, sizes)
+        result = []
+        for i, count in enumerate(counts.tolist()):
+            cell = {dimension: decode(int(coordinates[d][i])) for d, (dimension, decode) in enumerate(zip(dimensions, decoders))}
+            cell['count'] = count
+            result.append(cell)
+        return total, result
+
+
+_snapshot = None
+_snapshot_versions = None
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """The current snapshot, refreshed when the cache versions changed."""
+    global _snapshot, _snapshot_versions
+    versions = (get_version(SCOPE_INITIATIVES), get_version(SCOPE_TAGS))
+    # Bez wersji (np. DummyCache) nie wiadomo, czy coś się zmieniło
+    if _snapshot is not None and _snapshot_versions == versions and None not in versions:
+        return _snapshot
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is not None and _snapshot_versions == versions and None not in versions:
+            return snapshot
+        if snapshot is not None and _snapshot_versions[1] == versions[1] and None not in versions:
+            changed = Initiative.objects.order_by('id').values_list(*SCAN_FIELDS)
+            if snapshot.updated_until is not None:
+                changed = changed.filter(updated_at__gte=snapshot.updated_until - REFRESH_OVERLAP)
+            snapshot = snapshot.merged(group_rows(changed))
+        else:
+            snapshot = None
+        if snapshot is None:
+            snapshot = InitiativeSnapshot.from_database()
+        _snapshot, _snapshot_versions = snapshot, versions
+    return snapshot
+
+
+def parse_dimensions(value):
+    dimensions = split_param(value)
+    if not dimensions:
+        raise ValidationError({'dimensions': f'Podaj co najmniej jeden wymiar: {", ".join(DIMENSIONS)}.'})
+    invalid = [dimension for dimension in dimensions if dimension not in DIMENSIONS]
+    if invalid:
+        raise ValidationError({'dimensions': f'Nieznane wymiary: {", ".join(invalid)}'})
+    if len(set(dimensions)) != len(dimensions):
+        raise ValidationError({'dimensions': 'Wymiary nie mogą się powtarzać.'})
+    return dimensions
+
+
+def parse_filters(params):
+    """The list filters (InitiativeFilterBackend) in a form the snapshot can apply."""
+    filters = {
+        dimension: InitiativeFilterBackend.choice_values(params, dimension)
+        for dimension in CHOICE_DIMENSIONS
+    }
+    tags = split_param(params.get('tags'))
+    if tags:
+        tag_ids = [int(tag) for tag in tags if tag.isdigit()]
+        tag_keys = [tag_key(tag) for tag in tags if not tag.isdigit()]
+        filters['tag_ids'] = set(Tag.objects.filter(Q(pk__in=tag_ids) | Q(key__in=tag_keys)).values_list('pk', flat=True))
+    if params.get('created_after'):
+        filters['created_after'] = parse_datetime_param('created_after', params['created_after'])
+    if params.get('created_before'):
+        filters['created_before'] = parse_datetime_param('created_before', params['created_before'], end_of_day=True)
+    search = params.get('search', '').strip()
+    if search:
+        # Wyszukiwanie pełnotekstowe tylko w bazie - do maski trafiają pasujące id
+        matching = InitiativeFilterBackend().search(Initiative.objects.order_by(), search)
+        filters['ids'] = list(matching.values_list('pk', flat=True))
+    return filters
+
+
+def sql_crosstab(queryset, dimensions):
+    """The same counts with one grouped query (fallback without the snapshot)."""
+    queryset = queryset.order_by().prefetch_related(None)
+    total = queryset.count()
+    columns = {'tag': 'tags', 'month': 'month_start'}
+    names = [columns.get(dimension, dimension) for dimension in dimensions]
+    if 'tag' in dimensions:
+        queryset = queryset.filter(tags__isnull=False)
+    if 'month' in dimensions:
+        queryset = queryset.annotate(month_start=TruncMonth('created_at', tzinfo=datetime.timezone.utc))
+    cells = []
+    for row in queryset.values(*names).annotate(count=Count('pk')).order_by():
+        cell = {dimension: row[name] for dimension, name in zip(dimensions, names)}
+        if 'month' in cell:
+            cell['month'] = cell['month'].strftime('%Y-%m')
+        cell['count'] = row['count']
+        cells.append(cell)
+    return total, cells
+
+
+def crosstab(request, queryset):
+    """
+    Counts of initiatives per combination of the ?dimensions= values, for
+    the list filters. With the 'tag' dimension an initiative is counted
+    once per tag and initiatives without tags are left out.
+    """
+    params = request.query_params
+    dimensions = parse_dimensions(params.get('dimensions'))
+    if is_enabled():
+        total, cells = get_snapshot().crosstab(dimensions, parse_filters(params))
+    else:
+        total, cells = sql_crosstab(queryset, dimensions)
+    cells.sort(key=lambda cell: [cell[dimension] for dimension in dimensions])
+
+    result = {'dimensions': dimensions, 'total': total, 'cells': cells}
+    if 'tag' in dimensions:
+        tag_ids = {cell['tag'] for cell in cells}
+        result['tags'] = list(Tag.objects.filter(pk__in=tag_ids).order_by('id').values('id', 'name'))
+    return result
@@ -0,0 +1,123 @@
+# initiatives/synthetic.py
+"""
+Deterministic synthetic initiatives for benchmarks.
+
+Rows follow the importer's COLUMN_MAPPING. Names and descriptions are
+built from Polish vocabulary (with diacritics), choice columns mix codes
+and labels like real exports, and tags follow a Zipf-like distribution:
+a few tags are on most initiatives, most tags are rare. The same seed
+always gives the same rows.
+"""
+import csv
+import itertools
+import random
+
+import openpyxl
+
+from .importer import COLUMN_MAPPING
+from .models import Initiative
+
+PROGRAM_TYPES = ['Program', 'Projekt', 'Inicjatywa', 'Akademia', 'Laboratorium', 'Festiwal', 'Sieć', 'Centrum']
+ADJECTIVES = [
+    'Zielona', 'Cyfrowa', 'Otwarta', 'Młodzieżowa', 'Senioralna', 'Społeczna', 'Lokalna', 'Kreatywna',
+    'Czysta', 'Bezpieczna', 'Zdrowa', 'Aktywna', 'Obywatelska', 'Innowacyjna', 'Wspólna', 'Edukacyjna',
+]
+SUBJECTS = [
+    'energia', 'edukacja', 'mobilność', 'przyroda', 'kultura', 'integracja', 'przedsiębiorczość',
+    'współpraca', 'nauka', 'gospodarka', 'rewitalizacja', 'świadomość', 'żegluga', 'łączność',
+]
+ENTITY_TYPES = ['Fundacja', 'Stowarzyszenie', 'Spółka', 'Uniwersytet', 'Gmina', 'Związek', 'Instytut']
+ENTITY_NAMES = [
+    'Rozwoju Regionu', 'Dla Ziemi', 'Nowe Horyzonty', 'Przyszłość', 'Źródło', 'Żywa Tradycja',
+    'Techniczny', 'Przyrodniczy', 'Miejska', 'Łączy Nas Więcej', 'Pomorskie Inicjatywy',
+]
+CITIES = [
+    'Warszawa', 'Kraków', 'Łódź', 'Wrocław', 'Poznań', 'Gdańsk', 'Szczecin', 'Bydgoszcz', 'Lublin',
+    'Białystok', 'Katowice', 'Gdynia', 'Częstochowa', 'Radom', 'Toruń', 'Rzeszów', 'Kielce', 'Olsztyn',
+    'Zielona Góra', 'Opole',
+]
+DESCRIPTION_WORDS = [
+    'działania', 'mieszkańców', 'warsztaty', 'dla', 'dzieci', 'i', 'młodzieży', 'w', 'zakresie',
+    'ochrony', 'środowiska', 'rozwój', 'kompetencji', 'cyfrowych', 'wsparcie', 'organizacji',
+    'pozarządowych', 'współpraca', 'z', 'samorządem', 'spotkania', 'szkolenia', 'zajęcia', 'pikniki',
+    'ścieżki', 'rowerowe', 'ogrody', 'społeczne', 'źródła', 'odnawialne', 'żywność', 'lokalna',
+    'ograniczenie', 'emisji', 'edukacja', 'ekologiczna', 'partnerstwo', 'uczelni', 'biznesu',
+]
+TIMINGS = ['2023', '2024', '2024-2025', '2025-2027', 'od 2022', 'ciągły', '']
+TAG_VOCABULARY = [
+    'ekologia', 'edukacja', 'klimat', 'energia', 'transport', 'rower', 'seniorzy', 'młodzież',
+    'dzieci', 'kultura', 'sport', 'zdrowie', 'cyfryzacja', 'innowacje', 'nauka', 'woda', 'las',
+    'miasto', 'wieś', 'turystyka', 'rolnictwo', 'odpady', 'recykling', 'integracja', 'wolontariat',
+    'przedsiębiorczość', 'zatrudnienie', 'mieszkalnictwo', 'bezpieczeństwo', 'dziedzictwo',
+]
+
+
+def build_tag_names(count):
+    """`count` distinct tag names: the vocabulary, then numbered variants."""
+    names = list(TAG_VOCABULARY[:count])
+    for i in itertools.count(1):
+        if len(names) >= count:
+            return names
+        names.extend(f'{word} {i}' for word in TAG_VOCABULARY[:count - len(names)])
+
+
+def _choice_values(field_name):
+    # W plikach występują zarówno kody ('NGO'), jak i etykiety
+    return [value for code, label in Initiative._meta.get_field(field_name).choices for value in (code, label)]
+
+
+def generate_rows(count, seed=0, tag_count=300, max_tags=5):
+    """Yield the header and `count` data rows in COLUMN_MAPPING order."""
+    rng = random.Random(seed)
+    tag_names = build_tag_names(tag_count)
+    # Rozkład Zipfa: waga tagu k to 1/k
+    tag_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(tag_names) + 1)))
+    choices = {
+        field_name: _choice_values(field_name)
+        for field_name in ('entity_status', 'implementation_area', 'funding_source')
+    }
+    entities = [f'{kind} {name}' for kind in ENTITY_TYPES for name in ENTITY_NAMES]
+    description_length = Initiative._meta.get_field('description').max_length
+
+    yield list(COLUMN_MAPPING)
+    for i in range(count):
+        subject = rng.choice(SUBJECTS)
+        name = f'{rng.choice(PROGRAM_TYPES)} {rng.choice(ADJECTIVES)} {subject} {i}'
+        description = ' '.join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(5, 100))).capitalize()
+        tags = set(rng.choices(tag_names, cum_weights=tag_weights, k=rng.randint(0, max_tags)))
+        values = {
+            'name': name,
+            'acronym': ''.join(word[0] for word in name.split()[:3]).upper() if rng.random() < 0.4 else '',
+            'implementing_entity_name': rng.choice(entities),
+            'entity_status': rng.choice(choices['entity_status']),
+            'implementation_area': rng.choice(choices['implementation_area']),
+            'location_text': rng.choice(CITIES),
+            'implementing_entity_url': f'https://podmiot{i % 997}.example.pl' if rng.random() < 0.5 else '',
+            'description': description[:description_length].rstrip(),
+            'timing': rng.choice(TIMINGS),
+            'funding_source': rng.choice(choices['funding_source']),
+            'url': f'https://inicjatywa{i}.example.pl' if rng.random() < 0.3 else '',
+            'tags': ', '.join(sorted(tags)),
+        }
+        yield [values[field_name] for field_name in COLUMN_MAPPING.values()]
+
+
+def write_csv(path, count, seed=0, encoding='utf-8', delimiter=','):
+    with open(path, 'w', newline='', encoding=encoding) as f:
+        csv.writer(f, delimiter=delimiter).writerows(generate_rows(count, seed))
+
+
+def write_xlsx(path, count, seed=0):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Inicjatywy')
+    for row in generate_rows(count, seed):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def write_file(path, count, seed=0):
+    """Write a CSV or XLSX file, chosen by the extension of path."""
+    if path.lower().endswith('.xlsx'):
+        write_xlsx(path, count, seed)
+    else:
+        write_csv(path, count, seed)
@@ -0,0 +1,89 @@
+# initiatives/tag_merge.py
+"""
+Set-wise merge of tags that share a canonical key (text.tag_key).
+
+Used by the merge_duplicate_tags command (migration 0007 has its own
+frozen copy). Tags are scanned once in id order and the
+first tag of every key is kept. The M2M rows are rewritten with three
+statements over a temporary old_id -> new_id table, so the cost does not
+depend on the number of duplicates.
+"""
+from django.db import connections, transaction
+
+from .text import clean_tag_name, tag_key
+
+MAP_TABLE = 'initiatives_tag_merge_map'
+
+
+def merge_duplicate_tags(tag_model, through_model, using='default', dry_run=False, batch_size=2000):
+    """
+    Merge tags with the same key into the one with the lowest id, then
+    store the key and the cleaned name of the remaining tags. With dry_run
+    everything is executed and rolled back, so the returned counts are exact.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    tag_table = quote(tag_model._meta.db_table)
+    link_table = quote(through_model._meta.db_table)
+    initiative_column = quote(through_model._meta.get_field('initiative').column)
+    tag_column = quote(through_model._meta.get_field('tag').column)
+    map_table = quote(MAP_TABLE)
+
+    stats = {'groups': 0, 'tags_removed': 0, 'links_moved': 0, 'links_removed': 0, 'tags_updated': 0}
+    with transaction.atomic(using=using):
+        # Klucz liczony od nowa z nazwy - zapisany może być pusty lub nieaktualny
+        keep_ids = {}
+        mapping = []
+        changed = []
+        tags = tag_model.objects.using(using).order_by('id').only('id', 'name', 'key')
+        for tag in tags.iterator(chunk_size=batch_size):
+            key = tag_key(tag.name)
+            if key in keep_ids:
+                mapping.append((tag.pk, keep_ids[key]))
+                continue
+            keep_ids[key] = tag.pk
+            name = clean_tag_name(tag.name)
+            if (tag.name, tag.key) != (name, key):
+                tag.name, tag.key = name, key
+                changed.append(tag)
+        stats['groups'] = len({new_id for _, new_id in mapping})
+
+        if mapping:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {map_table}')
+                cursor.execute(f'CREATE TEMPORARY TABLE {map_table} (old_id bigint PRIMARY KEY, new_id bigint NOT NULL)')
+                for start in range(0, len(mapping), batch_size):
+                    cursor.executemany(
+                        f'INSERT INTO {map_table} (old_id, new_id) VALUES (%s, %s)',
+                        mapping[start:start + batch_size],
+                    )
+                # Powiązania z duplikatem przepięte na tag docelowy (bez tworzenia par, które już są)
+                cursor.execute(
+                    f'INSERT INTO {link_table} ({initiative_column}, {tag_column}) '
+                    f'SELECT DISTINCT l.{initiative_column}, m.new_id FROM {link_table} l '
+                    f'JOIN {map_table} m ON l.{tag_column} = m.old_id '
+                    f'WHERE NOT EXISTS (SELECT 1 FROM {link_table} x '
+                    f'WHERE x.{initiative_column} = l.{initiative_column} AND x.{tag_column} = m.new_id)'
+                )
+                stats['links_moved'] = cursor.rowcount
+                cursor.execute(f'DELETE FROM {link_table} WHERE {tag_column} IN (SELECT old_id FROM {map_table})')
+                stats['links_removed'] = cursor.rowcount
+                cursor.execute(f'DELETE FROM {tag_table} WHERE id IN (SELECT old_id FROM {map_table})')
+                stats['tags_removed'] = cursor.rowcount
+                cursor.execute(f'DROP TABLE {map_table}')
+
+        if changed:
+            # Po usunięciu duplikatów nazwy i klucze są unikalne. Najpierw klucze
+            # tymczasowe - nowy klucz jednego tagu może być jeszcze starym kluczem innego
+            final_keys = [tag.key for tag in changed]
+            for tag in changed:
+                tag.key = f'#{tag.pk}'
+            tag_model.objects.using(using).bulk_update(changed, ['key'], batch_size=500)
+            for tag, key in zip(changed, final_keys):
+                tag.key = key
+            tag_model.objects.using(using).bulk_update(changed, ['name', 'key'], batch_size=500)
+        stats['tags_updated'] = len(changed)
+
+        if dry_run:
+            transaction.set_rollback(True, using=using)
+    return stats
@@ -1,3 +1,1350 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import http.server
+import io
+import itertools
+import json
+import re
+import shutil
+import socket
+import tempfile
+import threading
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+import openpyxl
+from asgiref.sync import sync_to_async
+from django.contrib.admin.models import CHANGE, DELETION, LogEntry
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from . import compression, fast_serializers, instrumentation, renderers, snapshot, synthetic
+from .importer import COLUMN_MAPPING
+from .jobs import create_job, run_job
+from .models import ImportJob, Initiative, Tag
+from .pagination import EstimatedCountPaginator
+from .serializers import BulkInitiativeListSerializer, BulkInitiativeSerializer, InitiativeSerializer
+from .views import InitiativeViewSet
+
+
+def make_csv(rows, header=None, encoding='utf-8', delimiter=','):
+    """Build an uploaded CSV file with the importer's column layout."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=delimiter)
+    writer.writerow(header or list(COLUMN_MAPPING))
+    writer.writerows(rows)
+    return SimpleUploadedFile('inicjatywy.csv', out.getvalue().encode(encoding), content_type='text/csv')
+
+
+def make_xlsx(rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(list(COLUMN_MAPPING))
+    for row in rows:
+        sheet.append(row)
+    out = io.BytesIO()
+    workbook.save(out)
+    return SimpleUploadedFile('inicjatywy.xlsx', out.getvalue())
+
+
+def make_row(name, tags='', **overrides):
+    values = {
+        'Nazwa': name,
+        'Podmiot wdrażający': 'Fundacja Testowa',
+        'Statut podmiotu': 'NGO',
+        'Obszar wdrażania': 'Lokalny',
+        'Źródło finansowania': 'Publiczne',
+        'Tagi (oddzielone przecinkiem)': tags,
+    }
+    values.update(overrides)
+    return [values.get(header, '') for header in COLUMN_MAPPING]
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        # Wycofanie transakcji testu nie podbija wersji cache odpowiedzi
+        cache.clear()
+
+
+@override_settings(INITIATIVE_IMPORT_ASYNC=False)
+class InitiativeImportTests(APITestCase):
+    url = reverse('initiative-import')
+
+    def setUp(self):
+        super().setUp()
+        upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_root)
+        settings_override = override_settings(UPLOAD_ROOT=upload_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def post_rows(self, rows, **options):
+        return self.client.post(self.url, {'file': make_csv(rows), **options})
+
+    def test_imports_rows_and_tags(self):
+        response = self.post_rows([
+            make_row('Alfa', 'nauka, innowacje'),
+            make_row('Beta', 'nauka', **{'Statut podmiotu': 'Przedsiębiorstwo'}),
+        ])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], ImportJob.STATUS_COMPLETED)
+        self.assertEqual(response.json()['imported_count'], 2)
+        self.assertEqual(Tag.objects.count(), 2)
+        beta = Initiative.objects.get(name='Beta')
+        self.assertEqual(beta.entity_status, Initiative.ENTITY_STATUS_BUSINESS)
+        self.assertEqual(list(beta.tags.values_list('name', flat=True)), ['nauka'])
+        self.assertEqual(Initiative.objects.get(name='Alfa').tags.count(), 2)
+
+    def test_reuses_existing_tags(self):
+        Tag.objects.create(name='nauka')
+        self.post_rows([make_row('Alfa', 'nauka')])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_invalid_rows_are_skipped_with_row_numbers(self):
+        response = self.post_rows([
+            make_row('Alfa'),
+            make_row(''),
+            make_row('Gamma', **{'Statut podmiotu': 'Nieznany'}),
+        ])
+
+        skipped = response.json()['skipped_rows']
+        self.assertEqual([s['row'] for s in skipped], [3, 4])
+        self.assertEqual(Initiative.objects.count(), 1)
+
+    def test_detects_cp1250_and_semicolons(self):
+        upload = make_csv([make_row('Zażółć', 'społeczne')], encoding='cp1250', delimiter=';')
+        response = self.client.post(self.url, {'file': upload})
+
+        self.assertEqual(response.json()['imported_count'], 1)
+        self.assertTrue(Tag.objects.filter(name='społeczne').exists())
+        self.assertTrue(Initiative.objects.filter(name='Zażółć').exists())
+
+    def test_strips_utf8_bom(self):
+        upload = make_csv([make_row('Alfa')], encoding='utf-8-sig')
+        response = self.client.post(self.url, {'file': upload})
+        self.assertEqual(response.json()['imported_count'], 1)
+
+    def test_imports_xlsx(self):
+        response = self.client.post(self.url, {'file': make_xlsx([make_row('Alfa', 'nauka')])})
+
+        self.assertEqual(response.json()['imported_count'], 1)
+        self.assertEqual(Initiative.objects.get().tags.get().name, 'nauka')
+
+    def test_missing_columns_fail_the_job(self):
+        response = self.client.post(self.url, {'file': make_csv([], header=['Nazwa'])})
+
+        self.assertEqual(response.json()['status'], ImportJob.STATUS_FAILED)
+        self.assertIn('Brakujące wymagane kolumny', response.json()['error'])
+
+    def test_unsupported_format_is_rejected(self):
+        upload = SimpleUploadedFile('inicjatywy.txt', b'Nazwa')
+        response = self.client.post(self.url, {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+    def test_job_status_endpoint(self):
+        job_id = self.post_rows([make_row('Alfa'), make_row('')]).json()['id']
+
+        response = self.client.get(reverse('initiative-import-job', args=[job_id]))
+
+        data = response.json()
+        self.assertEqual(data['rows_total'], 2)
+        self.assertEqual(data['rows_processed'], 2)
+        self.assertEqual(data['skipped_count'], 1)
+        self.assertEqual(data['skipped_rows'][0]['row'], 3)
+        self.assertIsNone(data['eta_seconds'])
+
+    def test_cancel_pending_job(self):
+        job = ImportJob.objects.create(file_name='a.csv', file_path='/nonexistent/a.csv')
+
+        response = self.client.delete(reverse('initiative-import-job', args=[job.pk]))
+
+        self.assertEqual(response.json()['status'], ImportJob.STATUS_CANCELLED)
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_CANCELLED)
+
+    def test_cancel_requested_stops_running_job(self):
+        job = create_job(make_csv([make_row(f'A{i}') for i in range(5)]))
+        ImportJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+
+        with self.settings(INITIATIVE_IMPORT_BATCH_SIZE=2):
+            job = run_job(job.pk)
+
+        self.assertEqual(job.status, ImportJob.STATUS_CANCELLED)
+        self.assertEqual(job.rows_processed, 2)
+
+    def test_process_pool_keeps_row_numbers(self):
+        rows = [make_row(f'A{i}' if i % 3 else '', f't{i % 4}') for i in range(12)]
+
+        with self.settings(INITIATIVE_IMPORT_BATCH_SIZE=4, INITIATIVE_IMPORT_PROCESSES=2):
+            data = self.post_rows(rows).json()
+
+        self.assertEqual(data['imported_count'], 8)
+        self.assertEqual([s['row'] for s in data['skipped_rows']], [2, 5, 8, 11])
+        self.assertEqual(
+            list(Initiative.objects.order_by('id').values_list('name', flat=True)),
+            [f'A{i}' for i in range(12) if i % 3],
+        )
+
+    def test_too_long_tag_skips_row(self):
+        data = self.post_rows([make_row('Alfa', 'nauka, ' + 'x' * 101), make_row('Beta', 'nauka')]).json()
+
+        self.assertEqual(data['imported_count'], 1)
+        self.assertEqual(data['skipped_rows'][0]['row'], 2)
+        self.assertIn('przekracza 100 znaków', data['skipped_rows'][0]['reason'])
+        self.assertEqual(list(Tag.objects.values_list('name', flat=True)), ['nauka'])
+
+    def test_upsert_inserts_updates_and_skips_unchanged(self):
+        self.post_rows([
+            make_row('Alfa', 'nauka, innowacje'),
+            make_row('Beta', 'nauka'),
+            make_row('Gamma'),
+        ])
+        beta_updated_at = Initiative.objects.get(name='Beta').updated_at
+
+        data = self.post_rows([
+            make_row('Alfa', 'nauka, szkolenia', Opis='Nowy opis'),
+            make_row('Beta', 'nauka'),
+            make_row('Delta'),
+            make_row('Delta'),
+        ], mode='upsert').json()
+
+        self.assertEqual(
+            (data['imported_count'], data['updated_count'], data['unchanged_count']),
+            (1, 1, 1),
+        )
+        self.assertEqual(data['skipped_rows'][0]['row'], 5)
+        self.assertEqual(Initiative.objects.count(), 4)
+        alfa = Initiative.objects.get(name='Alfa')
+        self.assertEqual(alfa.description, 'Nowy opis')
+        self.assertEqual(sorted(alfa.tags.values_list('name', flat=True)), ['nauka', 'szkolenia'])
+        self.assertEqual(Initiative.objects.get(name='Beta').updated_at, beta_updated_at)
+
+    def test_upsert_with_custom_key(self):
+        self.post_rows([make_row('Alfa')])
+
+        data = self.post_rows(
+            [make_row('Alfa', **{'Podmiot wdrażający': 'Inny podmiot'})],
+            mode='upsert', key='name',
+        ).json()
+
+        self.assertEqual(data['updated_count'], 1)
+        self.assertEqual(Initiative.objects.get().implementing_entity_name, 'Inny podmiot')
+
+    def test_upsert_matches_whole_natural_key(self):
+        # Ta sama nazwa u wielu podmiotów - zapytanie filtruje po całym kluczu, nie tylko po nazwie
+        self.post_rows([make_row('Alfa', **{'Podmiot wdrażający': f'Podmiot {i}'}) for i in range(5)])
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.post_rows(
+                [make_row('Alfa', Opis='Nowy opis', **{'Podmiot wdrażający': 'Podmiot 3'})], mode='upsert',
+            ).json()
+
+        self.assertEqual((data['imported_count'], data['updated_count']), (0, 1))
+        lookup = next(
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "initiatives_initiative" WHERE' in q['sql']
+        )
+        self.assertIn('"implementing_entity_name" = ', lookup)
+        self.assertEqual(
+            list(Initiative.objects.filter(description='Nowy opis').values_list('implementing_entity_name', flat=True)),
+            ['Podmiot 3'],
+        )
+
+    def test_upsert_matches_empty_key_part_stored_as_empty_string(self):
+        # Inicjatywa z API ma acronym='' - pusta komórka pliku (None) to ten sam klucz
+        existing = create_initiative('Alfa', implementing_entity_name='Fundacja Testowa', acronym='')
+
+        data = self.post_rows([make_row('Alfa', Opis='Nowy opis')], mode='upsert', key='name,acronym').json()
+
+        self.assertEqual((data['imported_count'], data['updated_count']), (0, 1))
+        self.assertEqual(Initiative.objects.get().pk, existing.pk)
+        self.assertEqual(Initiative.objects.get().description, 'Nowy opis')
+
+    def test_invalid_natural_key_is_rejected(self):
+        response = self.post_rows([make_row('Alfa')], mode='upsert', key='tags')
+        self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def count_queries(rows):
+            with CaptureQueriesContext(connection) as ctx:
+                self.post_rows(rows)
+            return len(ctx)
+
+        small = count_queries([make_row(f'A{i}', f'a{i}, wspólny') for i in range(2)])
+        large = count_queries([make_row(f'B{i}', f'b{i}, wspólny') for i in range(40)])
+        self.assertEqual(small, large)
+
+
+def create_initiative(name, tags=(), **fields):
+    values = {
+        'implementing_entity_name': 'Fundacja Testowa',
+        'entity_status': Initiative.ENTITY_STATUS_NGO,
+        'implementation_area': Initiative.IMPLEMENTATION_AREA_LOCAL,
+        'funding_source': Initiative.FUNDING_SOURCE_PUBLIC,
+    }
+    values.update(fields)
+    initiative = Initiative.objects.create(name=name, **values)
+    if tags:
+        initiative.tags.set(tags)
+    return initiative
+
+
+class InitiativeListTests(APITestCase):
+    url = reverse('initiative-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nauka = Tag.objects.create(name='nauka')
+        cls.sport = Tag.objects.create(name='sport')
+        cls.alfa = create_initiative('Alfa', [cls.nauka, cls.sport], acronym='ALF')
+        cls.beta = create_initiative(
+            'Beta', [cls.sport],
+            entity_status=Initiative.ENTITY_STATUS_BUSINESS,
+            funding_source=Initiative.FUNDING_SOURCE_PRIVATE,
+            description='Zajęcia sportowe dla dzieci',
+        )
+        cls.gamma = create_initiative('Gamma', implementation_area=Initiative.IMPLEMENTATION_AREA_NATIONAL)
+        Initiative.objects.filter(pk=cls.gamma.pk).update(created_at=timezone.now() - timezone.timedelta(days=10))
+
+    def names(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['name'] for item in response.json())
+
+    def test_unpaginated_by_default(self):
+        self.assertEqual(self.names(), ['Alfa', 'Beta', 'Gamma'])
+
+    def test_choice_filters(self):
+        self.assertEqual(self.names(entity_status='BUSINESS'), ['Beta'])
+        self.assertEqual(self.names(entity_status='NGO', implementation_area='LOCAL'), ['Alfa'])
+        self.assertEqual(self.names(funding_source='PUBLIC,PRIVATE'), ['Alfa', 'Beta', 'Gamma'])
+        self.assertEqual(self.client.get(self.url, {'entity_status': 'XYZ'}).status_code, 400)
+
+    def test_tag_filter_matches_any_without_duplicates(self):
+        self.assertEqual(self.names(tags=f'{self.nauka.pk},{self.sport.pk}'), ['Alfa', 'Beta'])
+
+    def test_created_range(self):
+        since = (timezone.now() - timezone.timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.names(created_after=since), ['Alfa', 'Beta'])
+        self.assertEqual(self.names(created_before=since), ['Gamma'])
+
+    def test_search(self):
+        self.assertEqual(self.names(search='sportowe'), ['Beta'])
+        self.assertEqual(self.names(search='alf'), ['Alfa'])
+
+    def test_cursor_pagination_walks_all_pages(self):
+        # Identyczne created_at - kolejność rozstrzyga id
+        same_time = timezone.now()
+        for i in range(5):
+            create_initiative(f'Seria {i}')
+        Initiative.objects.filter(name__startswith='Seria').update(created_at=same_time)
+
+        seen = []
+        url = f'{self.url}?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 3)
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+
+        expected = list(Initiative.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_list_query_count_is_constant(self):
+        def count_queries(**params):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(self.url, params)
+            return len(ctx)
+
+        small = count_queries()
+        for i in range(10):
+            create_initiative(f'Dodatkowa {i}', [self.nauka, self.sport])
+
+        self.assertEqual(count_queries(), small)
+        self.assertEqual(count_queries(expand='tags'), small)
+
+    def test_expand_tags(self):
+        data = self.client.get(reverse('initiative-detail', args=[self.alfa.pk]), {'expand': 'tags'}).json()
+        self.assertEqual(
+            sorted(data['tags_details'], key=lambda tag: tag['id']),
+            [{'id': self.nauka.pk, 'name': 'nauka'}, {'id': self.sport.pk, 'name': 'sport'}],
+        )
+        plain = self.client.get(reverse('initiative-detail', args=[self.alfa.pk])).json()
+        self.assertNotIn('tags_details', plain)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nonsense'}).status_code, 404)
+
+
+class FastListTests(APITestCase):
+    url = reverse('initiative-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [Tag.objects.create(name=name) for name in ('nauka', 'sport', 'kultura')]
+        create_initiative('Zażółć gęślą jaźń', tags[::-1], description='Opis\u2028z separatorem "cytat"')
+        create_initiative('Beta', acronym='B', url='https://beta.example.com', location_text='Łódź')
+        create_initiative('Gamma', tags[:1], entity_status=Initiative.ENTITY_STATUS_OTHER)
+
+    def serializer_bytes(self, queryset):
+        request = Request(APIRequestFactory().get(self.url))
+        data = InitiativeSerializer(queryset, many=True, context={'request': request}).data
+        return JSONRenderer().render(data)
+
+    def test_byte_identical_to_serializer(self):
+        expected = self.serializer_bytes(InitiativeViewSet.queryset.all())
+        self.assertEqual(self.client.get(self.url).content, expected)
+
+        with mock.patch.object(fast_serializers, 'orjson', None):
+            self.assertEqual(self.client.get(self.url).content, expected)
+
+    def test_paginated_page_matches_serializer(self):
+        response = self.client.get(self.url, {'page_size': 2})
+        page = InitiativeViewSet.queryset.all()[:2]
+        self.assertIn(b'"results":' + self.serializer_bytes(page), response.content)
+
+    def test_browsable_api_uses_serializer(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/html')
+        self.assertContains(response, 'Beta')
+
+
+@override_settings(INITIATIVE_IMPORT_ASYNC=False)
+class ExportTests(APITestCase):
+    url = reverse('initiative-export')
+
+    @classmethod
+    def setUpTestData(cls):
+        nauka = Tag.objects.create(name='nauka')
+        sport = Tag.objects.create(name='sport')
+        create_initiative('Alfa', [nauka, sport], description='Opis, z przecinkiem')
+        create_initiative('Beta', entity_status=Initiative.ENTITY_STATUS_BUSINESS, location_text='Łódź')
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_csv_uses_import_layout(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0], list(COLUMN_MAPPING))
+        alfa = dict(zip(rows[0], rows[2]))
+        self.assertEqual(alfa['Tagi (oddzielone przecinkiem)'], 'nauka, sport')
+        self.assertEqual(alfa['Opis'], 'Opis, z przecinkiem')
+
+    def test_respects_list_filters(self):
+        rows = self.read_csv(self.client.get(self.url, {'entity_status': 'BUSINESS'}))
+        self.assertEqual([row[0] for row in rows[1:]], ['Beta'])
+
+    def test_ndjson(self):
+        response = self.client.get(self.url, {'format': 'ndjson'})
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record['name'] for record in records], ['Beta', 'Alfa'])
+        self.assertEqual(records[1]['tags'], ['nauka', 'sport'])
+
+    def test_xlsx(self):
+        response = self.client.get(self.url, {'format': 'xlsx'})
+
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        workbook.close()
+        self.assertEqual(list(rows[0]), list(COLUMN_MAPPING))
+        self.assertEqual(len(rows), 3)
+
+    def test_round_trip_through_importer(self):
+        content = b''.join(self.client.get(self.url).streaming_content)
+        upload = SimpleUploadedFile('eksport.csv', content)
+
+        with tempfile.TemporaryDirectory() as upload_root, self.settings(UPLOAD_ROOT=upload_root):
+            data = self.client.post(reverse('initiative-import'), {'file': upload, 'mode': 'upsert'}).json()
+
+        self.assertEqual(data['skipped_rows'], [])
+        self.assertEqual(data['unchanged_count'], 2)
+
+
+class ResponseCacheTests(APITestCase):
+    url = reverse('initiative-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nauka = Tag.objects.create(name='nauka')
+        cls.alfa = create_initiative('Alfa', [cls.nauka])
+
+    def test_repeated_read_is_served_from_cache(self):
+        first = self.client.get(self.url, {'entity_status': 'NGO', 'search': ''})
+        with self.assertNumQueries(0):
+            # Inna kolejność i puste parametry dają ten sam klucz
+            second = self.client.get(self.url, {'search': '', 'entity_status': 'NGO'})
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    def test_if_none_match_returns_304_without_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate_cached_reads(self):
+        etag = self.client.get(self.url)['ETag']
+        create_initiative('Beta')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+        tags_url = reverse('tag-list')
+        self.client.get(tags_url)
+        self.alfa.tags.add(Tag.objects.create(name='sport'))
+        self.assertEqual([tag['name'] for tag in self.client.get(tags_url).json()], ['nauka', 'sport'])
+        detail = self.client.get(reverse('initiative-detail', args=[self.alfa.pk]))
+        self.assertEqual(len(detail.json()['tags']), 2)
+
+    @override_settings(INITIATIVE_IMPORT_ASYNC=False)
+    def test_import_invalidates_cached_reads(self):
+        self.client.get(self.url)
+        upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_root)
+        with override_settings(UPLOAD_ROOT=upload_root):
+            self.client.post(reverse('initiative-import'), {'file': make_csv([make_row('Zaimportowana')])})
+        self.assertEqual(len(self.client.get(self.url).json()), 2)
+
+
+class DatabaseProfileTests(TestCase):
+    def test_sqlite_pragmas_are_applied_on_connect(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Profil SQLite')
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1) # NORMAL
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+
+
+class SearchTests(APITestCase):
+    url = reverse('initiative-search')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lodz = create_initiative('Zielona Łódź', acronym='ZL', description='Nasadzenia drzew w mieście')
+        cls.park = create_initiative(
+            'Park kieszonkowy', description='Zielone podwórka w Łodzi',
+            entity_status=Initiative.ENTITY_STATUS_BUSINESS,
+        )
+        create_initiative('Biblioteka', description='Czytanie dla seniorów')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_diacritic_insensitive_prefix_match(self):
+        self.assertEqual(self.search(q='drzew lodz'), ['Zielona Łódź'])
+        self.assertEqual(self.search(q='ŁODZI'), ['Park kieszonkowy'])
+        self.assertEqual(self.search(q='czyt senior'), ['Biblioteka'])
+
+    def test_name_ranks_above_description(self):
+        self.assertEqual(self.search(q='ziel'), ['Zielona Łódź', 'Park kieszonkowy'])
+        results = self.client.get(self.url, {'q': 'ziel'}).json()['results']
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+    def test_list_filters_and_paging(self):
+        self.assertEqual(self.search(q='ziel', entity_status='BUSINESS'), ['Park kieszonkowy'])
+        first = self.client.get(self.url, {'q': 'ziel', 'limit': 1}).json()
+        self.assertEqual([item['name'] for item in first['results']], ['Zielona Łódź'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([item['name'] for item in second['results']], ['Park kieszonkowy'])
+        self.assertIsNone(second['next'])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(self.url, {'q': ' ?! '}).status_code, 400)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.lodz.name = 'Błękitny Gdańsk'
+        self.lodz.save()
+        self.assertEqual(self.search(q='blekit'), ['Błękitny Gdańsk'])
+        self.assertEqual(self.search(q='zielona'), [])
+        self.park.delete()
+        self.assertEqual(self.search(q='podworka'), [])
+
+    def test_list_search_uses_index(self):
+        response = self.client.get(reverse('initiative-list'), {'search': 'lodz'})
+        self.assertEqual(sorted(item['name'] for item in response.json()), ['Park kieszonkowy', 'Zielona Łódź'])
+
+    @override_settings(INITIATIVE_IMPORT_ASYNC=False)
+    def test_imported_rows_are_indexed(self):
+        upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_root)
+        with override_settings(UPLOAD_ROOT=upload_root):
+            self.client.post(reverse('initiative-import'), {'file': make_csv([make_row('Świetlica środowiskowa')])})
+        self.assertEqual(self.search(q='swietlica'), ['Świetlica środowiskowa'])
+
+
+class FacetTests(APITestCase):
+    url = reverse('initiative-facets')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nauka = Tag.objects.create(name='nauka')
+        cls.sport = Tag.objects.create(name='sport')
+        create_initiative('Alfa', [cls.nauka, cls.sport])
+        create_initiative('Beta', [cls.sport], entity_status=Initiative.ENTITY_STATUS_BUSINESS)
+        create_initiative('Gamma', funding_source=Initiative.FUNDING_SOURCE_PRIVATE)
+
+    def counts(self, facets, field_name):
+        return {item['value']: item['count'] for item in facets[field_name] if item['count']}
+
+    def test_counts_in_two_queries(self):
+        # + jedno zapytanie o Last-Modified dla cache odpowiedzi
+        with self.assertNumQueries(3):
+            facets = self.client.get(self.url).json()
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(self.counts(facets, 'entity_status'), {'NGO': 2, 'BUSINESS': 1})
+        self.assertEqual(self.counts(facets, 'funding_source'), {'PUBLIC': 2, 'PRIVATE': 1})
+        self.assertEqual(len(facets['implementation_area']), len(Initiative.IMPLEMENTATION_AREA_CHOICES))
+        self.assertEqual(
+            [(tag['name'], tag['count']) for tag in facets['tags']],
+            [('sport', 2), ('nauka', 1)],
+        )
+
+    def test_respects_list_filters(self):
+        facets = self.client.get(self.url, {'tags': self.sport.pk, 'entity_status': 'NGO'}).json()
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(self.counts(facets, 'entity_status'), {'NGO': 1})
+        self.assertEqual([(tag['name'], tag['count']) for tag in facets['tags']], [('nauka', 1), ('sport', 1)])
+
+
+class CrosstabTests(APITestCase):
+    url = reverse('initiative-crosstab')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nauka = Tag.objects.create(name='nauka')
+        cls.sport = Tag.objects.create(name='sport')
+        cls.alfa = create_initiative('Alfa', [cls.nauka, cls.sport])
+        create_initiative('Beta', [cls.sport], entity_status=Initiative.ENTITY_STATUS_BUSINESS)
+        create_initiative('Gamma', funding_source=Initiative.FUNDING_SOURCE_PRIVATE)
+        Initiative.objects.filter(name='Gamma').update(created_at=datetime.datetime(2024, 3, 5, tzinfo=datetime.timezone.utc))
+
+    def crosstab(self, params, use_snapshot):
+        with override_settings(INITIATIVE_SNAPSHOT=use_snapshot):
+            cache.clear()
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def modes(self):
+        return [False, True] if snapshot.np is not None else [False]
+
+    def test_counts(self):
+        this_month = timezone.now().strftime('%Y-%m')
+        for use_snapshot in self.modes():
+            with self.subTest(snapshot=use_snapshot):
+                data = self.crosstab({'dimensions': 'entity_status,month'}, use_snapshot)
+                self.assertEqual(data['total'], 3)
+                self.assertEqual(data['cells'], [
+                    {'entity_status': 'BUSINESS', 'month': this_month, 'count': 1},
+                    {'entity_status': 'NGO', 'month': '2024-03', 'count': 1},
+                    {'entity_status': 'NGO', 'month': this_month, 'count': 1},
+                ])
+
+                data = self.crosstab({'dimensions': 'tag,funding_source'}, use_snapshot)
+                self.assertEqual(data['cells'], [
+                    {'tag': self.nauka.pk, 'funding_source': 'PUBLIC', 'count': 1},
+                    {'tag': self.sport.pk, 'funding_source': 'PUBLIC', 'count': 2},
+                ])
+                self.assertEqual(data['tags'], [{'id': self.nauka.pk, 'name': 'nauka'}, {'id': self.sport.pk, 'name': 'sport'}])
+
+    def test_respects_list_filters(self):
+        for use_snapshot in self.modes():
+            with self.subTest(snapshot=use_snapshot):
+                data = self.crosstab({'dimensions': 'entity_status', 'tags': 'Sport', 'search': 'alf'}, use_snapshot)
+                self.assertEqual(data['total'], 1)
+                self.assertEqual(data['cells'], [{'entity_status': 'NGO', 'count': 1}])
+                data = self.crosstab({'dimensions': 'funding_source', 'created_before': '2024-12-31'}, use_snapshot)
+                self.assertEqual(data['cells'], [{'funding_source': 'PRIVATE', 'count': 1}])
+
+    def test_invalid_dimensions(self):
+        for params in ({}, {'dimensions': 'kolor'}, {'dimensions': 'tag,tag'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    @skipUnless(snapshot.np is not None, 'NumPy nie jest zainstalowany')
+    def test_snapshot_refreshed_incrementally(self):
+        self.crosstab({'dimensions': 'entity_status'}, True)
+        self.alfa.entity_status = Initiative.ENTITY_STATUS_UNIVERSITY
+        self.alfa.save()
+        create_initiative('Delta')
+        with mock.patch.object(snapshot.InitiativeSnapshot, 'from_database') as rebuild:
+            data = self.client.get(self.url, {'dimensions': 'entity_status'}).json()
+        rebuild.assert_not_called()
+        self.assertEqual(data['cells'], [
+            {'entity_status': 'BUSINESS', 'count': 1},
+            {'entity_status': 'NGO', 'count': 2},
+            {'entity_status': 'UNIVERSITY', 'count': 1},
+        ])
+
+        # Zmiana tagów wymaga przebudowy
+        self.alfa.tags.remove(self.nauka)
+        data = self.client.get(self.url, {'dimensions': 'tag'}).json()
+        self.assertEqual(data['cells'], [{'tag': self.sport.pk, 'count': 2}])
+
+
+class BulkTests(APITestCase):
+    url = reverse('initiative-bulk')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nauka = Tag.objects.create(name='nauka')
+        cls.sport = Tag.objects.create(name='sport')
+        cls.alfa = create_initiative('Alfa', [cls.nauka])
+        cls.beta = create_initiative('Beta')
+
+    def test_bulk_list_serializer_only_for_bulk(self):
+        self.assertNotIsInstance(InitiativeSerializer(many=True), BulkInitiativeListSerializer)
+        self.assertIsInstance(BulkInitiativeSerializer(many=True), BulkInitiativeListSerializer)
+
+    def new_item(self, name, **fields):
+        return {
+            'op': 'create', 'name': name, 'implementing_entity_name': 'Fundacja Testowa',
+            'entity_status': 'NGO', 'implementation_area': 'LOCAL', 'funding_source': 'PUBLIC',
+            **fields,
+        }
+
+    def post(self, items, **params):
+        url = self.url + ('?partial=true' if params.get('partial') else '')
+        return self.client.post(url, items, content_type='application/json')
+
+    def test_create_update_delete(self):
+        response = self.post([
+            self.new_item('Gamma', tags=[self.nauka.pk, self.sport.pk]),
+            {'id': self.alfa.pk, 'name': 'Alfa 2', 'tags': [self.sport.pk]},
+            {'op': 'delete', 'id': self.beta.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['created'], body['updated'], body['deleted']), (1, 1, 1))
+        gamma = Initiative.objects.get(pk=body['results'][0]['id'])
+        self.assertEqual(set(gamma.tags.values_list('name', flat=True)), {'nauka', 'sport'})
+        self.alfa.refresh_from_db()
+        self.assertEqual(self.alfa.name, 'Alfa 2')
+        self.assertEqual(list(self.alfa.tags.values_list('name', flat=True)), ['sport'])
+        self.assertFalse(Initiative.objects.filter(pk=self.beta.pk).exists())
+
+    def test_query_count_does_not_grow_with_items(self):
+        def run(count):
+            items = [self.new_item(f'Nowa {i}', tags=[self.sport.pk]) for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post(items).status_code, 200)
+            return len(queries)
+        self.assertEqual(run(2), run(50))
+
+    def test_invalid_item_rejects_everything(self):
+        response = self.post([self.new_item('Delta'), self.new_item('', entity_status='XYZ')])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual([error['index'] for error in errors], [1])
+        self.assertEqual(set(errors[0]['errors']), {'name', 'entity_status'})
+        self.assertFalse(Initiative.objects.filter(name='Delta').exists())
+
+    def test_partial_mode_applies_valid_items(self):
+        response = self.post([
+            self.new_item('Delta'),
+            {'id': 999999, 'name': 'Brak'},
+            {'op': 'delete', 'id': self.beta.pk},
+            {'op': 'delete', 'id': self.beta.pk},
+        ], partial=True)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['created'], body['deleted']), (1, 1))
+        self.assertEqual([error['index'] for error in body['errors']], [1, 3])
+        self.assertTrue(Initiative.objects.filter(name='Delta').exists())
+
+    def test_ndjson_body(self):
+        lines = '\n'.join(json.dumps(item) for item in [self.new_item('Epsilon'), self.new_item('Zeta')])
+        response = self.client.post(self.url, lines + '\n', content_type='application/x-ndjson')
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(self.client.get(reverse('initiative-search'), {'q': 'epsilon'}).json()['results'][0]['name'], 'Epsilon')
+
+
+class TagAutocompleteTests(APITestCase):
+    url = reverse('tag-autocomplete')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = {name: Tag.objects.create(name=name) for name in ('Edukacja', 'ekologia', 'Ekonomia', 'łączność')}
+        for i in range(3):
+            create_initiative(f'Eko {i}', [cls.tags['ekologia']])
+        create_initiative('Ekon', [cls.tags['Ekonomia']])
+
+    def complete(self, **params):
+        return [tag['name'] for tag in self.client.get(self.url, params).json()]
+
+    def test_prefix_ranked_by_usage(self):
+        self.assertEqual(self.complete(prefix='EK'), ['ekologia', 'Ekonomia'])
+        self.assertEqual(self.complete(prefix='e', limit=2), ['ekologia', 'Ekonomia'])
+        self.assertEqual(self.complete(prefix='lacz'), ['łączność'])
+        response = self.client.get(self.url, {'prefix': 'ekol'})
+        self.assertEqual(response.json(), [{'id': self.tags['ekologia'].pk, 'name': 'ekologia', 'usage': 3}])
+
+    def test_warm_index_needs_no_queries(self):
+        self.complete(prefix='e')
+        with self.assertNumQueries(0):
+            self.complete(prefix='ed')
+
+    def test_rebuilt_after_tag_changes(self):
+        self.assertEqual(self.complete(prefix='edu'), ['Edukacja'])
+        Tag.objects.create(name='Edukacja zdalna')
+        create_initiative('Szkoła', [self.tags['Edukacja']])
+        self.assertEqual(self.complete(prefix='edu'), ['Edukacja', 'Edukacja zdalna'])
+        Initiative.objects.filter(name='Ekon').delete()
+        self.assertEqual(self.client.get(self.url, {'prefix': 'ekon'}).json()[0]['usage'], 0)
+
+
+class TagKeyTests(APITestCase):
+    def test_key_is_case_and_whitespace_insensitive(self):
+        tag = Tag.objects.create(name='  Zielona   Energia ')
+        self.assertEqual((tag.name, tag.key), ('Zielona Energia', 'zielona energia'))
+        response = self.client.post(reverse('tag-list'), {'name': 'zielona energia '})
+        self.assertEqual(response.status_code, 400)
+
+        # casefold wydłuża 'ß' do 'ss' - klucz nadal mieści się w kolumnie
+        long_tag = Tag.objects.create(name='ß' * 100)
+        self.assertEqual(long_tag.key, 's' * 100)
+
+    @override_settings(INITIATIVE_IMPORT_ASYNC=False)
+    def test_import_reuses_tags_by_key(self):
+        nauka = Tag.objects.create(name='Nauka')
+        upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_root)
+        with override_settings(UPLOAD_ROOT=upload_root):
+            self.client.post(reverse('initiative-import'), {
+                'file': make_csv([make_row('Alfa', 'nauka , NAUKA,Sport'), make_row('Beta', ' sport')]),
+            })
+        self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['Nauka', 'Sport'])
+        self.assertEqual(list(Initiative.objects.get(name='Alfa').tags.order_by('id')), [nauka, Tag.objects.get(key='sport')])
+
+    def test_tag_filter_accepts_names(self):
+        create_initiative('Alfa', [Tag.objects.create(name='Nauka')])
+        create_initiative('Beta')
+        response = self.client.get(reverse('initiative-list'), {'tags': ' NAUKA'})
+        self.assertEqual([item['name'] for item in response.json()], ['Alfa'])
+
+    def test_merge_duplicates_rewrites_links(self):
+        through = Initiative.tags.through
+        nauka = Tag.objects.create(name='nauka')
+        # Duplikaty sprzed wprowadzenia klucza - zapis z pominięciem save()
+        duplicates = Tag.objects.bulk_create([Tag(name='Nauka', key='#1'), Tag(name='nauka ', key='#2')])
+        alfa = create_initiative('Alfa', [nauka, duplicates[0]])
+        beta = create_initiative('Beta', duplicates)
+
+        call_command('merge_duplicate_tags', '--dry-run', stdout=io.StringIO())
+        self.assertEqual(Tag.objects.count(), 3)
+
+        stdout = io.StringIO()
+        call_command('merge_duplicate_tags', stdout=stdout)
+        self.assertIn('usunięte tagi: 2', stdout.getvalue())
+        self.assertEqual(list(Tag.objects.values_list('name', 'key')), [('nauka', 'nauka')])
+        self.assertEqual(
+            sorted(through.objects.values_list('initiative_id', 'tag_id')),
+            [(alfa.pk, nauka.pk), (beta.pk, nauka.pk)],
+        )
+
+
+class ImportCommandTests(APITestCase):
+    def write_file(self, uploaded):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'{directory}/{uploaded.name}'
+        with open(path, 'wb') as f:
+            f.write(uploaded.read())
+        return path
+
+    def test_imports_local_csv(self):
+        path = self.write_file(make_csv([make_row('Alfa', 'nauka'), make_row('Beta'), make_row('')]))
+        stdout = io.StringIO()
+        call_command('import_initiatives', path, '--batch-size', '1', '--workers', '1', stdout=stdout, stderr=io.StringIO())
+        self.assertEqual(sorted(Initiative.objects.values_list('name', flat=True)), ['Alfa', 'Beta'])
+        self.assertIn('Dodano 2, pominięto 1 z 3 wierszy.', stdout.getvalue())
+        self.assertIn('wierszy/s', stdout.getvalue())
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write_file(make_xlsx([make_row('Alfa', 'nauka')]))
+        stdout = io.StringIO()
+        call_command('import_initiatives', path, '--dry-run', stdout=stdout)
+        self.assertIn('Poprawne wiersze: 1', stdout.getvalue())
+        self.assertFalse(Initiative.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_invalid_file(self):
+        path = self.write_file(SimpleUploadedFile('pusty.csv', b''))
+        with self.assertRaisesMessage(CommandError, 'Brakujące wymagane kolumny'):
+            call_command('import_initiatives', path)
+        with self.assertRaises(CommandError):
+            call_command('import_initiatives', path, '--mode', 'merge')
+
+
+class SyntheticDataTests(APITestCase):
+    def test_rows_are_deterministic(self):
+        rows = list(synthetic.generate_rows(50, seed=7))
+        self.assertEqual(rows, list(synthetic.generate_rows(50, seed=7)))
+        self.assertNotEqual(rows, list(synthetic.generate_rows(50, seed=8)))
+        self.assertEqual(rows[0], list(COLUMN_MAPPING))
+        self.assertEqual(len(rows), 51)
+
+    def test_generated_files_import_without_skipped_rows(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for extension in ('csv', 'xlsx'):
+            path = f'{directory}/dane.{extension}'
+            call_command('generate_initiatives', path, '--rows', '200', '--seed', '1', stdout=io.StringIO())
+            stdout = io.StringIO()
+            call_command('import_initiatives', path, '--dry-run', stdout=stdout, stderr=io.StringIO())
+            self.assertIn('Poprawne wiersze: 200, pominięto 0 z 200 wierszy.', stdout.getvalue())
+
+    def test_tags_follow_zipf_distribution(self):
+        usage = {}
+        tags_column = list(COLUMN_MAPPING.values()).index('tags')
+        for row in itertools.islice(synthetic.generate_rows(2000), 1, None):
+            for name in filter(None, row[tags_column].split(', ')):
+                usage[name] = usage.get(name, 0) + 1
+        counts = sorted(usage.values(), reverse=True)
+        # Najpopularniejszy tag zdecydowanie częstszy niż mediana
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2])
+
+
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.registry.reset()
+
+    def test_server_timing_header(self):
+        create_initiative('Alfa', tags=[Tag.objects.create(name='nauka')])
+        response = self.client.get(reverse('initiative-list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serialize;dur=', timing)
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+
+        response = self.client.get(reverse('initiative-list'), {'expand': 'tags'})
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+    def test_structured_log_line(self):
+        with self.assertLogs('initiatives.performance', 'INFO') as logs:
+            self.client.get(reverse('tag-list'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'tag-list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['response_bytes'], 0)
+        self.assertIn('db_queries', record)
+
+    def test_flags_repeated_queries(self):
+        def repeated_queries(request):
+            for _ in range(3):
+                list(Tag.objects.filter(pk=1))
+            return HttpResponse('ok')
+
+        request = APIRequestFactory().get('/')
+        request.resolver_match = None
+        middleware = instrumentation.PerformanceMiddleware(repeated_queries)
+        with override_settings(PERF_DUPLICATE_QUERY_THRESHOLD=3, PERF_QUERY_THRESHOLD=2):
+            with self.assertLogs('initiatives.performance', 'WARNING') as logs:
+                middleware(request)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['flags'], ['too_many_queries', 'n_plus_one'])
+        self.assertEqual(record['repeated_query']['count'], 3)
+
+    @override_settings(PERF_METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_prometheus_metrics(self):
+        self.client.get(reverse('tag-list'))
+        self.client.get(reverse('tag-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        self.assertIn('initiatives_http_requests_total{route="tag-list",method="GET",status="200"} 2', text)
+        self.assertIn('initiatives_http_request_duration_seconds_bucket{route="tag-list",method="GET",le="+Inf"} 2', text)
+        self.assertIn('initiatives_http_request_duration_seconds_count{route="tag-list",method="GET"} 2', text)
+
+    def test_metrics_restricted_to_allowed_ips_and_staff(self):
+        url = reverse('metrics')
+        # Domyślnie pusta lista - także loopback (np. reverse proxy) nie ma dostępu
+        with override_settings(PERF_METRICS_ALLOWED_IPS=[]):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 403)
+        with override_settings(PERF_METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    @override_settings(PERF_INSTRUMENTATION=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('tag-list')))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+
+class AdminTests(APITestCase):
+    url = reverse('admin:initiatives_initiative_changelist')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'haslo')
+        cls.nauka = Tag.objects.create(name='Nauka')
+        cls.alfa = create_initiative('Zielona energia', [cls.nauka])
+        cls.beta = create_initiative('Rowerowa Łódź')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def names(self, response):
+        return sorted(initiative.name for initiative in response.context['cl'].result_list)
+
+    def test_changelist_filters_and_search(self):
+        response = self.client.get(self.url, {'tag': 'nauka'})
+        self.assertEqual(self.names(response), ['Zielona energia'])
+        self.assertContains(response, reverse('tag-autocomplete'))
+        self.assertEqual(self.names(self.client.get(self.url, {'tag': self.nauka.pk})), ['Zielona energia'])
+        self.assertEqual(self.names(self.client.get(self.url, {'q': 'lodz'})), ['Rowerowa Łódź'])
+        self.assertEqual(self.names(self.client.get(self.url)), ['Rowerowa Łódź', 'Zielona energia'])
+
+    def test_estimated_count(self):
+        paginator = EstimatedCountPaginator(Initiative.objects.order_by('id'), 10)
+        paginator.count_limit = 1
+        with mock.patch.object(EstimatedCountPaginator, 'estimate', return_value=5000):
+            self.assertEqual(paginator.count, 5000)
+        filtered = EstimatedCountPaginator(Initiative.objects.filter(name__startswith='Z').order_by('id'), 10)
+        self.assertEqual(filtered.count, 1)
+        bounded = EstimatedCountPaginator(Initiative.objects.filter(name__contains='o').order_by('id'), 10)
+        bounded.count_limit = 1
+        self.assertEqual(bounded.count, 1)
+
+    def run_action(self, action, **data):
+        return self.client.post(self.url, {
+            'action': action,
+            '_selected_action': [self.alfa.pk, self.beta.pk],
+            **data,
+        }, follow=True)
+
+    def test_set_status_action(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.run_action('set_entity_status_business')
+        # Jedno UPDATE dla wszystkich zaznaczonych (jedna paczka)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries), 1)
+        self.assertEqual(set(Initiative.objects.values_list('entity_status', flat=True)), {'BUSINESS'})
+        self.assertEqual(
+            sorted(LogEntry.objects.filter(action_flag=CHANGE).values_list('object_repr', flat=True)),
+            ['Rowerowa Łódź', 'Zielona energia'],
+        )
+
+    def test_tag_actions(self):
+        with mock.patch('initiatives.admin.ACTION_BATCH_SIZE', 1):
+            response = self.run_action('add_tag', tag='  NAUKA ')
+        # Zielona energia miała już ten tag - dodany tylko do jednej inicjatywy
+        self.assertContains(response, 'Dodano tag &quot;Nauka&quot; do 1 inicjatyw.')
+        self.assertEqual(Tag.objects.count(), 1)
+        self.assertEqual(self.nauka.initiatives.count(), 2)
+        self.run_action('remove_tag', tag='nauka')
+        self.assertEqual(self.nauka.initiatives.count(), 0)
+        # Wpis dla każdej zmienionej inicjatywy: 1 dodanie, 2 usunięcia
+        messages = list(LogEntry.objects.filter(action_flag=CHANGE).values_list('change_message', flat=True))
+        self.assertEqual(sorted(message.split(' ')[0] for message in messages), ['Dodano', 'Usunięto', 'Usunięto'])
+        self.run_action('add_tag', tag='Sport')
+        self.assertEqual(Tag.objects.get(key='sport').initiatives.count(), 2)
+
+    def test_delete_action(self):
+        # Najpierw strona potwierdzenia, nic jeszcze nie usunięte
+        response = self.run_action('delete_selected')
+        self.assertTemplateUsed(response, 'admin/delete_selected_confirmation.html')
+        self.assertEqual(Initiative.objects.count(), 2)
+
+        with mock.patch('initiatives.admin.ACTION_BATCH_SIZE', 1):
+            self.run_action('delete_selected', post='yes')
+        self.assertFalse(Initiative.objects.exists())
+        self.assertEqual(LogEntry.objects.filter(action_flag=DELETION).count(), 2)
+        self.assertFalse(Initiative.tags.through.objects.exists())
+        self.assertEqual(self.client.get(reverse('initiative-list'), {'search': 'zielona'}).json(), [])
+
+
+class AsyncViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.nauka = Tag.objects.create(name='nauka')
+        cls.sport = Tag.objects.create(name='sport')
+        cls.alfa = create_initiative('Alfa', [cls.nauka, cls.sport])
+        create_initiative('Beta', [cls.sport], entity_status=Initiative.ENTITY_STATUS_BUSINESS)
+        create_initiative('Gamma')
+
+    async def assert_same_response(self, sync_url, async_url, params=None):
+        sync_response = await sync_to_async(self.client.get)(sync_url, params or {})
+        async_response = await self.async_client.get(async_url, params or {})
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        # Linki paginacji wskazują własny endpoint
+        self.assertEqual(async_response.content.replace(async_url.encode(), sync_url.encode()), sync_response.content)
+        return async_response
+
+    async def test_list_matches_sync_endpoint(self):
+        sync_url, async_url = reverse('initiative-list'), reverse('async-initiative-list')
+        await self.assert_same_response(sync_url, async_url)
+        await self.assert_same_response(sync_url, async_url, {'entity_status': 'NGO', 'tags': 'sport'})
+        first = await self.assert_same_response(sync_url, async_url, {'page_size': 2})
+        cursor = parse_qs(urlsplit(first.json()['next']).query)['cursor'][0]
+        await self.assert_same_response(sync_url, async_url, {'page_size': 2, 'cursor': cursor})
+        response = await self.assert_same_response(sync_url, async_url, {'entity_status': 'XYZ'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_detail_facets_and_tags(self):
+        await self.assert_same_response(
+            reverse('initiative-detail', args=[self.alfa.pk]), reverse('async-initiative-detail', args=[self.alfa.pk]),
+        )
+        response = await self.async_client.get(reverse('async-initiative-detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        await self.assert_same_response(reverse('initiative-facets'), reverse('async-initiative-facets'), {'tags': 'sport'})
+        await self.assert_same_response(reverse('tag-list'), reverse('async-tag-list'))
+
+    async def test_tag_list_fieldsets_match_sync_endpoint(self):
+        sync_url, async_url = reverse('tag-list'), reverse('async-tag-list')
+        await self.assert_same_response(sync_url, async_url, {'fields': 'name'})
+        response = await self.assert_same_response(sync_url, async_url, {'exclude': 'id,name'})
+        self.assertEqual(response.json(), [{}, {}])
+        response = await self.assert_same_response(sync_url, async_url, {'fields': 'slug'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_cached_and_instrumented(self):
+        url = reverse('async-initiative-list')
+        response = await self.async_client.get(url)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="2 queries"')
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual((await self.async_client.post(url)).status_code, 405)
+
+
+class LoadTestCommandTests(TestCase):
+    def test_measures_local_server(self):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self.send_response(200)
+                if self.path == '/chunked':
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    self.wfile.write(b'2\r\n[]\r\n0\r\n\r\n')
+                else:
+                    self.send_header('Content-Length', '2')
+                    self.end_headers()
+                    self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f'http://127.0.0.1:{server.server_port}'
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        output = f'{directory}/wyniki.json'
+        stdout = io.StringIO()
+        call_command(
+            'loadtest', f'{base}/', f'{base}/chunked', '--concurrency', '2', '--seconds', '0.2',
+            '--warmup', '0', '--output', output, stdout=stdout,
+        )
+        with open(output) as f:
+            results = json.load(f)
+        self.assertEqual([result['errors'] for result in results], [0, 0])
+        self.assertTrue(all(result['requests'] > 0 for result in results))
+        self.assertIn('żądań/s względem', stdout.getvalue())
+
+    def test_refused_connections_are_counted(self):
+        # Wolny port bez serwera - każde połączenie odrzucone
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        output = f'{directory}/wyniki.json'
+        call_command(
+            'loadtest', f'http://127.0.0.1:{port}/', '--concurrency', '2', '--seconds', '0.2',
+            '--warmup', '0', '--output', output, stdout=io.StringIO(),
+        )
+        with open(output) as f:
+            result = json.load(f)[0]
+        self.assertEqual(result['requests'], 0)
+        self.assertGreater(result['errors'], 0)
+        self.assertEqual(result['error_types'], ['ConnectionRefusedError'])
+
+
+class WireFormatTests(APITestCase):
+    url = reverse('initiative-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [Tag.objects.create(name=name) for name in ('nauka', 'sport')]
+        for i in range(20):
+            create_initiative(f'Inicjatywa {i}', tags[:i % 3], description='Długi opis inicjatywy ' * 10)
+
+    def test_columnar_matches_json(self):
+        expected = fast_serializers.columnar(self.client.get(self.url).json())
+        response = self.client.get(self.url, {'format': 'columnar'})
+
+        self.assertEqual(response['Content-Type'], 'application/vnd.initiatives.columnar+json')
+        data = response.json()
+        self.assertEqual(data, json.loads(json.dumps(expected)))
+        self.assertNotIn('entity_status_display', data['columns'])
+        self.assertEqual(data['labels']['entity_status']['NGO'], dict(Initiative.ENTITY_STATUS_CHOICES)['NGO'])
+
+        # Ścieżka przez InitiativeSerializer (z wciętym JSON) daje te same dane
+        slow = self.client.get(self.url, HTTP_ACCEPT='application/vnd.initiatives.columnar+json; indent=2')
+        self.assertEqual(slow.json(), data)
+
+    def test_columnar_page_and_detail(self):
+        data = self.client.get(self.url, {'format': 'columnar', 'page_size': 5}).json()
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(len(data['results']['rows']), 5)
+
+        initiative = Initiative.objects.first()
+        detail = self.client.get(reverse('initiative-detail', args=[initiative.pk]), {'format': 'columnar'})
+        self.assertEqual(detail.json()['name'], initiative.name)
+
+    @skipUnless(renderers.msgpack is not None, 'msgpack nie jest zainstalowany')
+    def test_msgpack_matches_json(self):
+        response = self.client.get(self.url, {'page_size': 5}, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content), self.client.get(self.url, {'page_size': 5}).json())
+
+    def test_gzip_compression(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_compression_skipped(self):
+        # Poniżej progu, q=0 i brak Accept-Encoding
+        small = self.client.get(self.url, {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+        for accept_encoding in ('gzip;q=0', 'br', ''):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'), accept_encoding)
+        self.assertEqual(compression.choose_encoding('*'), compression.available_encodings()[0])
+        self.assertEqual(compression.choose_encoding('gzip;q=0.5, *;q=0.1'), 'gzip')
+
+    def test_streaming_export_compressed(self):
+        url = reverse('initiative-export')
+        plain = b''.join(self.client.get(url).streaming_content)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+        xlsx = self.client.get(url, {'format': 'xlsx'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(xlsx.has_header('Content-Encoding'))
+
+    @skipUnless(compression.zstandard is not None, 'zstandard nie jest zainstalowany')
+    def test_zstd_preferred(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, zstd')
+
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+        self.assertEqual(compression.zstandard.ZstdDecompressor().decompress(response.content), plain.content)
+
+
+class SparseFieldsetTests(APITestCase):
+    url = reverse('initiative-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nauka = Tag.objects.create(name='nauka')
+        cls.alfa = create_initiative('Alfa', [cls.nauka], description='Długi opis')
+        cls.beta = create_initiative('Beta')
+
+    def get(self, url, params=None, **extra):
+        """(response, {table: selected columns of each row SELECT from it}); aggregates are skipped."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {}, **extra)
+        columns = {}
+        for query in queries.captured_queries:
+            match = re.match(r'SELECT (.*?) FROM "(\w+)"', query['sql'])
+            if match and not re.match(r'(COUNT|MAX|MIN|SUM|AVG)\(', match.group(1)):
+                select, table = match.groups()
+                columns.setdefault(table, []).append(re.findall(rf'"{table}"\."(\w+)"', select))
+        return response, columns
+
+    def test_list_fields(self):
+        response, columns = self.get(self.url, {'fields': 'name,id', 'page_size': 10})
+
+        self.assertEqual(response.json()['results'], [{'id': self.beta.pk, 'name': 'Beta'}, {'id': self.alfa.pk, 'name': 'Alfa'}])
+        # Tylko wybrane kolumny i klucz paginacji, bez zapytania o tagi
+        self.assertEqual(columns['initiatives_initiative'], [['id', 'name', 'created_at']])
+        self.assertNotIn('initiatives_initiative_tags', columns)
+
+    def test_list_exclude(self):
+        response, columns = self.get(self.url, {'exclude': 'description,entity_status_display'})
+
+        item = response.json()[1]
+        self.assertNotIn('description', item)
+        self.assertNotIn('entity_status_display', item)
+        self.assertEqual(item['tags'], [self.nauka.pk])
+        self.assertNotIn('description', columns['initiatives_initiative'][0])
+        self.assertIn('entity_status', columns['initiatives_initiative'][0])
+        self.assertIn('initiatives_initiative_tags', columns)
+
+    def test_serializer_path_uses_only(self):
+        detail = reverse('initiative-detail', args=[self.alfa.pk])
+        response, columns = self.get(detail, {'fields': 'name,entity_status_display'})
+
+        self.assertEqual(response.json(), {'name': 'Alfa', 'entity_status_display': self.alfa.get_entity_status_display()})
+        self.assertEqual(sorted(columns['initiatives_initiative'][0]), ['created_at', 'entity_status', 'id', 'name'])
+        self.assertNotIn('initiatives_tag', columns)
+
+        # ?expand=tags idzie przez InitiativeSerializer - prefetch tagów tylko gdy potrzebny
+        response, columns = self.get(self.url, {'fields': 'name,tags_details', 'expand': 'tags'})
+        self.assertEqual(response.json()[1], {'name': 'Alfa', 'tags_details': [{'id': self.nauka.pk, 'name': 'nauka'}]})
+        self.assertEqual(sorted(columns['initiatives_initiative'][0]), ['created_at', 'id', 'name'])
+        self.assertIn('initiatives_tag', columns)
+
+    def test_tags_and_async_endpoints(self):
+        response, columns = self.get(reverse('tag-list'), {'fields': 'name'})
+        self.assertEqual(response.json(), [{'name': 'nauka'}])
+        self.assertEqual(columns['initiatives_tag'], [['id', 'name']])
+
+        async_response = self.client.get(reverse('async-initiative-list'), {'fields': 'name,id', 'page_size': 10})
+        self.assertEqual(async_response.json()['results'], self.client.get(self.url, {'fields': 'name,id', 'page_size': 10}).json()['results'])
+        self.assertEqual(self.client.get(reverse('async-tag-list'), {'fields': 'name'}).json(), [{'name': 'nauka'}])
+
+    def test_unknown_field(self):
+        response = self.client.get(self.url, {'fields': 'name,haslo'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('haslo', response.json()['fields'])
+        self.assertEqual(self.client.get(reverse('tag-list'), {'exclude': 'key'}).status_code, 400)
+
+    def test_writes_unaffected(self):
+        response = self.client.patch(
+            reverse('initiative-detail', args=[self.alfa.pk]) + '?fields=name', {'acronym': 'A'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('description', response.json())
@@ -0,0 +1,43 @@
+# initiatives/text.py
+"""
+Text normalization shared by the search index and tag lookups.
+No Django imports - also used by the import worker processes.
+"""
+import re
+import unicodedata
+
+# Litery bez rozkładu NFKD (ł nie jest "l + znak diakrytyczny")
+_FOLD_TABLE = str.maketrans({'ł': 'l', 'Ł': 'L', 'đ': 'd', 'Đ': 'D', 'ø': 'o', 'Ø': 'O', 'ß': 'ss'})
+
+_WORD_RE = re.compile(r'\w+')
+
+# Tag.key max_length - casefold może wydłużyć tekst ('ß' -> 'ss')
+TAG_KEY_MAX_LENGTH = 100
+
+
+def fold(text):
+    """Lowercase and strip diacritics: 'Zażółć Łódź' -> 'zazolc lodz'."""
+    text = text or ''
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text.translate(_FOLD_TABLE))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def words(text):
+    """Folded words of the text, in order."""
+    return _WORD_RE.findall(fold(text))
+
+
+def clean_tag_name(name):
+    """Tag name as stored: surrounding and repeated whitespace removed."""
+    return ' '.join((name or '').split())
+
+
+def tag_key(name):
+    """
+    Canonical tag key: 'Nauka', 'nauka ' and ' NAUKA' are the same tag.
+    Case-insensitive but keeps diacritics ('łąka' and 'laka' stay distinct).
+    Truncated to the length of the Tag.key column.
+    """
+    return unicodedata.normalize('NFC', clean_tag_name(name)).casefold()[:TAG_KEY_MAX_LENGTH]
@@ -2,13 +2,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 # Zaktualizuj importy
-from .views import InitiativeViewSet, TagViewSet, InitiativeImportView
+from . import async_views
+from .views import InitiativeViewSet, TagViewSet, InitiativeImportView, ImportJobView, metrics_view
 
 # Utwórz router i zarejestruj nasze viewsety
 router = DefaultRouter()
 router.register(r'initiatives', InitiativeViewSet, basename='initiative')
 router.register(r'tags', TagViewSet, basename='tag')
 
+# Asynchroniczne wersje endpointów odczytu (pod ASGI, initiatives/async_views.py)
+async_urlpatterns = [
+    path('initiatives/', async_views.initiative_list, name='async-initiative-list'),
+    path('initiatives/facets/', async_views.initiative_facets, name='async-initiative-facets'),
+    path('initiatives/<int:pk>/', async_views.initiative_detail, name='async-initiative-detail'),
+    path('tags/', async_views.tag_list, name='async-tag-list'),
+]
+
 # URL patterns API są teraz automatycznie generowane przez router.
 # Dodaj ścieżkę dla importu
 urlpatterns = [
@@ -17,5 +26,13 @@ urlpatterns = [
         InitiativeImportView.as_view(), 
         name='initiative-import'
     ),
+    path(
+        'initiatives/import/<uuid:job_id>/',
+        ImportJobView.as_view(),
+        name='initiative-import-job'
+    ),
+    # Metryki wydajności w formacie Prometheusa (initiatives/instrumentation.py)
+    path('_metrics/', metrics_view, name='metrics'),
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
 ]
\ No newline at end of file
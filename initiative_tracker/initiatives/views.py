@@ -1,33 +1,260 @@
 # initiatives/views.py
-import csv
-import io # Do obsługi strumieni danych w pamięci
-import openpyxl # Do obsługi plików XLSX
-from django.db import transaction # Do atomowego zapisu wielu obiektów
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db.models import Max, Prefetch
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
-from rest_framework.parsers import MultiPartParser, FormParser # Do obsługi uploadu plików
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser # Do obsługi uploadu plików
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework import status, viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .autocomplete import complete_tags
+from .cache import SCOPE_INITIATIVES, SCOPE_TAGS, cached_read
+from .facets import facet_counts
+from .exporters import stream_csv, stream_ndjson, write_xlsx
+from .fast_serializers import (
+    encode_json, requested_fields, serialize_columns, serialize_rows, tag_ids_by_initiative, values_fields,
+)
+from .fieldsets import SparseFieldsetViewMixin
+from .filters import InitiativeFilterBackend
+from .importer import COLUMN_MAPPING, ImportFileError
+from .instrumentation import is_enabled as instrumentation_enabled, render_metrics, timed
+from .jobs import cancel_job, create_job, submit_job
+from .models import ImportJob, Initiative, Tag
+from .pagination import KeysetPagination
+from .parsers import NDJSONParser
+from .search import query_words, ranked_ids, search_backend
+from .renderers import (
+    LIST_RENDERERS, ColumnarJSONRenderer, CSVExportRenderer, MessagePackRenderer, NDJSONExportRenderer, XLSXExportRenderer,
+)
+from .snapshot import crosstab as crosstab_counts
+from .serializers import (
+    BULK_CREATE, BULK_DELETE, BULK_UPDATE, BulkInitiativeSerializer, ImportJobSerializer, InitiativeSerializer, TagSerializer,
+)
+
+def renderer_content_type(request):
+    """Content-Type header DRF would set for the negotiated renderer."""
+    renderer = request.accepted_renderer
+    if renderer.charset:
+        return f'{renderer.media_type}; charset={renderer.charset}'
+    return renderer.media_type
+
+
+def int_param(request, name, default, maximum=None):
+    value = request.query_params.get(name, '')
+    if value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Oczekiwano liczby całkowitej.'})
+    if value < 0:
+        raise ValidationError({name: 'Wartość nie może być ujemna.'})
+    return min(value, maximum) if maximum is not None else value
+
+
+def initiatives_last_modified(view, request, **kwargs):
+    """Newest updated_at among the initiatives a read returns (Last-Modified)."""
+    queryset = view.filter_queryset(view.get_queryset()).prefetch_related(None)
+    if 'pk' in kwargs:
+        queryset = queryset.filter(pk=kwargs['pk'])
+    return queryset.aggregate(last_modified=Max('updated_at'))['last_modified']
 
-from .models import Initiative, Tag
-from .serializers import InitiativeSerializer, TagSerializer
 
 # ... (istniejące widoki TagViewSet i InitiativeViewSet) ...
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows tags to be viewed or edited.
+    Reads accept ?fields= / ?exclude= (see fieldsets.py).
     """
     queryset = Tag.objects.all().order_by('name')
     serializer_class = TagSerializer
     # permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class InitiativeViewSet(viewsets.ModelViewSet):
+    @cached_read(SCOPE_TAGS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request, *args, **kwargs):
+        """
+        Tags starting with ?prefix= (case and diacritics insensitive),
+        most used first; ?limit= (default 10, max 50).
+        """
+        limit = max(1, int_param(request, 'limit', 10, maximum=50))
+        return Response(complete_tags(request.query_params.get('prefix', ''), limit))
+
+    @cached_read(SCOPE_TAGS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class InitiativeViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows initiatives to be viewed or edited.
+    Supports filtering (see InitiativeFilterBackend), opt-in keyset
+    pagination with ?page_size= / ?cursor=, ?expand=tags and sparse
+    fieldsets with ?fields= / ?exclude= (see fieldsets.py).
+    Besides JSON, responses are available as columnar JSON
+    (?format=columnar) and MessagePack (?format=msgpack, with msgpack installed).
+    Reads are cached and answer conditional requests (see cache.py).
     """
-    queryset = Initiative.objects.all().order_by('-created_at')
+    # Tagi wszystkich inicjatyw na stronie jednym zapytaniem (bez N+1),
+    # posortowane po id tak jak w szybkiej ścieżce listy
+    queryset = Initiative.objects.prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.order_by('id'))
+    ).order_by('-created_at', 'id')
     serializer_class = InitiativeSerializer
-    # permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filter_backends = [InitiativeFilterBackend]
+    pagination_class = KeysetPagination
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + LIST_RENDERERS
+    sparse_actions = ('list', 'retrieve', 'search')
+    required_columns = ('created_at',) # Klucz paginacji keyset
+
+    def use_fast_list(self, request):
+        """The fast path produces compact (columnar) JSON and MessagePack without expanded tags."""
+        renderer = request.accepted_renderer
+        if 'expand' in request.query_params:
+            return False
+        if type(renderer) in (JSONRenderer, ColumnarJSONRenderer):
+            return renderer.get_indent(request.accepted_media_type, {}) is None
+        return type(renderer) is MessagePackRenderer
+
+    @cached_read(SCOPE_INITIATIVES, SCOPE_TAGS, last_modified=initiatives_last_modified)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @cached_read(SCOPE_INITIATIVES, SCOPE_TAGS, last_modified=initiatives_last_modified)
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list(request):
+            return super().list(request, *args, **kwargs)
+
+        # Szybka ścieżka odczytu: .values() + słowniki etykiet zamiast ModelSerializer
+        fields = requested_fields(request)
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*values_fields(fields))
+        renderer = request.accepted_renderer
+        serialize = serialize_columns if isinstance(renderer, ColumnarJSONRenderer) else serialize_rows
+        page = self.paginate_queryset(queryset)
+        with timed('serialize'):
+            if page is not None:
+                tag_ids = tag_ids_by_initiative([row['id'] for row in page]) if 'tags' in fields else {}
+                payload = self.get_paginated_response(serialize(page, tag_ids, fields)).data
+            else:
+                tag_ids = tag_ids_by_initiative(queryset) if 'tags' in fields else {}
+                payload = serialize(queryset.iterator(chunk_size=2000), tag_ids, fields)
+            content = renderer.render(payload) if isinstance(renderer, MessagePackRenderer) else encode_json(payload)
+        return HttpResponse(content, content_type=renderer_content_type(request))
+
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create, update and delete many initiatives in one transaction.
+        Body: JSON array or NDJSON of operations (see BulkInitiativeListSerializer).
+        By default any invalid item rejects the whole request (400);
+        with ?partial=true the valid items are applied and the invalid
+        ones reported in 'errors'.
+        """
+        partial_items = request.query_params.get('partial', '').lower() in ('1', 'true', 'yes')
+        context = {**self.get_serializer_context(), 'partial_items': partial_items}
+        serializer = BulkInitiativeSerializer(data=request.data, many=True, context=context)
+        if not serializer.is_valid():
+            # Błędy pozycji bez konwersji indeksów i id na tekst (jak w ValidationError)
+            if getattr(serializer, 'item_errors', None):
+                return Response({'errors': serializer.item_errors}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        results = serializer.save()
+        return Response({
+            'created': sum(1 for item in results if item['op'] == BULK_CREATE),
+            'updated': sum(1 for item in results if item['op'] == BULK_UPDATE),
+            'deleted': sum(1 for item in results if item['op'] == BULK_DELETE),
+            'results': results,
+            'errors': serializer.item_errors,
+        })
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    @cached_read(SCOPE_INITIATIVES, SCOPE_TAGS, last_modified=initiatives_last_modified)
+    def facets(self, request, *args, **kwargs):
+        """
+        Counts per entity_status, implementation_area, funding_source and tag
+        (plus the total) for the same filters as the list.
+        """
+        return Response(facet_counts(self.filter_queryset(self.get_queryset())))
+
+    @action(detail=False, methods=['get'], url_path='crosstab')
+    @cached_read(SCOPE_INITIATIVES, SCOPE_TAGS, last_modified=initiatives_last_modified)
+    def crosstab(self, request, *args, **kwargs):
+        """
+        Counts per combination of ?dimensions= (entity_status, implementation_area,
+        funding_source, tag, month) for the same filters as the list.
+        """
+        return Response(crosstab_counts(request, self.filter_queryset(self.get_queryset())))
+
+    @action(detail=False, methods=['get'], url_path='search')
+    @cached_read(SCOPE_INITIATIVES, SCOPE_TAGS)
+    def search(self, request, *args, **kwargs):
+        """
+        Ranked full-text search: ?q= (required), ?limit= (default 20, max 100)
+        and ?offset=. List filters apply as well. Results are ordered by
+        'rank' (higher is better, null without a search index).
+        """
+        query = request.query_params.get('q', '')
+        terms = query_words(query)
+        if not terms:
+            raise ValidationError({'q': 'Podaj frazę do wyszukania.'})
+        limit = max(1, int_param(request, 'limit', 20, maximum=100))
+        offset = int_param(request, 'offset', 0)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if search_backend() is None:
+            found = InitiativeFilterBackend().search(queryset, query)[offset:offset + limit + 1]
+            ranked = [(initiative.pk, None) for initiative in found]
+        else:
+            # Zawężenie podzapytaniem tylko gdy są filtry - bez nich ranking czyta sam indeks
+            restrict = queryset if queryset.query.where else None
+            ranked = ranked_ids(terms, restrict, limit + 1, offset)
+
+        initiatives = self.get_queryset().in_bulk([pk for pk, _ in ranked[:limit]])
+        page = [(pk, rank) for pk, rank in ranked[:limit] if pk in initiatives]
+        results = self.get_serializer([initiatives[pk] for pk, _ in page], many=True).data
+        for item, (_, rank) in zip(results, page):
+            item['rank'] = rank
+
+        next_url = None
+        if len(ranked) > limit:
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+        return Response({'next': next_url, 'results': results})
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='export',
+        renderer_classes=[CSVExportRenderer, XLSXExportRenderer, NDJSONExportRenderer],
+    )
+    def export(self, request, *args, **kwargs):
+        """
+        Stream the (filtered) initiatives as ?format=csv (default), xlsx or ndjson.
+        The columns match the importer, so the file can be imported back.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        export_format = request.accepted_renderer.format
+        file_name = f'inicjatywy.{export_format}'
+        content_type = request.accepted_renderer.media_type
+
+        if export_format == 'xlsx':
+            return FileResponse(write_xlsx(queryset), as_attachment=True, filename=file_name, content_type=content_type)
+
+        stream = stream_ndjson(queryset) if export_format == 'ndjson' else stream_csv(queryset)
+        if export_format == 'csv':
+            content_type = f'{content_type}; charset=utf-8'
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        return response
 
 
 # Nowy widok do importu
@@ -35,27 +262,13 @@ class InitiativeImportView(APIView):
     """
     API endpoint for importing initiatives from CSV or XLSX files.
     Expects a POST request with 'file' in form-data.
+    Optional 'mode=upsert' updates existing initiatives matched by 'key'
+    (comma separated fields, default 'name,implementing_entity_name').
     """
     parser_classes = (MultiPartParser, FormParser) # Umożliwia przesyłanie plików
     # permission_classes = [permissions.IsAdminUser] # Opcjonalnie: Zabezpiecz endpoint
 
-    # Zdefiniuj oczekiwane nagłówki kolumn (klucz: nagłówek w pliku, wartość: pole w modelu)
-    # Upewnij się, że te nagłówki pasują do Twoich plików CSV/XLSX
-    COLUMN_MAPPING = {
-        'Nazwa': 'name',
-        'URL': 'url',
-        'Osoba Kontaktowa': 'person',
-        'Kategoria': 'category',
-        'Timing': 'timing',
-        'Czy Publiczna (Tak/Nie)': 'public', # Specjalna obsługa dla boolean
-        'Finansujący': 'funders',
-        'Miejsce': 'place',
-        'Region': 'region',
-        'Opis': 'description',
-        'Grupa Docelowa': 'target',
-        'Tagi (oddzielone przecinkiem)': 'tags', # Specjalna obsługa dla tagów
-        'Kategoria Tematyczna': 'thematic_category',
-    }
+    COLUMN_MAPPING = COLUMN_MAPPING
 
     def post(self, request, *args, **kwargs):
         file_obj = request.FILES.get('file')
@@ -63,106 +276,44 @@ class InitiativeImportView(APIView):
         if not file_obj:
             return Response({'error': 'Nie znaleziono pliku w żądaniu.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        file_name = file_obj.name.lower()
-        imported_count = 0
-        skipped_rows = []
-        errors = []
-
         try:
-            # Użyj transaction.atomic, aby w razie błędu cofnąć wszystkie zmiany
-            with transaction.atomic():
-                if file_name.endswith('.csv'):
-                    reader = self._read_csv(file_obj)
-                elif file_name.endswith('.xlsx'):
-                    reader = self._read_xlsx(file_obj)
-                else:
-                    return Response({'error': 'Nieobsługiwany format pliku. Dozwolone: CSV, XLSX.'}, status=status.HTTP_400_BAD_REQUEST)
-
-                header = next(reader) # Odczytaj nagłówek
-                expected_headers = list(self.COLUMN_MAPPING.keys())
-
-                # Prosta walidacja nagłówków (można ulepszyć)
-                if not all(h in header for h in expected_headers):
-                     missing = [h for h in expected_headers if h not in header]
-                     return Response({'error': f'Brakujące wymagane kolumny w pliku: {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
-
-                # Mapowanie indeksów kolumn na podstawie nagłówka pliku
-                col_indices = {col_name: header.index(col_name) for col_name in expected_headers if col_name in header}
-
-
-                for i, row in enumerate(reader, start=2): # Start=2 bo nagłówek to wiersz 1
-                    initiative_data = {}
-                    tags_to_add = []
-
-                    # Mapuj dane z wiersza na pola modelu
-                    for header_name, model_field in self.COLUMN_MAPPING.items():
-                        try:
-                            cell_value = row[col_indices[header_name]].strip() if col_indices[header_name] < len(row) else ''
-
-                            # Konwersje specjalne
-                            if model_field == 'public':
-                                initiative_data[model_field] = cell_value.lower() == 'tak'
-                            elif model_field == 'tags':
-                                tag_names = [tag.strip() for tag in cell_value.split(',') if tag.strip()]
-                                for tag_name in tag_names:
-                                    tag, created = Tag.objects.get_or_create(name=tag_name)
-                                    tags_to_add.append(tag)
-                            elif cell_value: # Tylko jeśli wartość nie jest pusta
-                                initiative_data[model_field] = cell_value
-                            else:
-                                # Ustaw null dla pól które mogą być null, jeśli komórka jest pusta
-                                model_field_obj = Initiative._meta.get_field(model_field)
-                                if model_field_obj.null:
-                                     initiative_data[model_field] = None
-
-                        except IndexError:
-                            # Jeśli wiersz jest krótszy niż oczekiwano
-                            skipped_rows.append({'row': i, 'reason': f'Brak danych w kolumnie "{header_name}" lub wiersz jest za krótki.'})
-                            initiative_data = None # Oznacz ten wiersz jako błędny
-                            break
-                        except Exception as e:
-                            skipped_rows.append({'row': i, 'reason': f'Błąd przetwarzania kolumny "{header_name}": {e}'})
-                            initiative_data = None # Oznacz ten wiersz jako błędny
-                            break
-
-                    # Jeśli dane dla wiersza są poprawne, utwórz lub zaktualizuj inicjatywę
-                    if initiative_data and 'name' in initiative_data and initiative_data['name']:
-                        try:
-                            # Tutaj można dodać logikę aktualizacji jeśli inicjatywa o tej nazwie już istnieje
-                            # np. initiative, created = Initiative.objects.update_or_create(name=initiative_data['name'], defaults=initiative_data)
-                            # Na razie prosty create:
-                            initiative = Initiative.objects.create(**initiative_data)
-                            if tags_to_add:
-                                initiative.tags.set(tags_to_add) # Dodaj tagi
-                            imported_count += 1
-                        except Exception as e:
-                            # Błąd zapisu do bazy (np. naruszenie unikalności, błąd walidacji modelu)
-                            skipped_rows.append({'row': i, 'reason': f'Błąd zapisu do bazy: {e}'})
-                    elif initiative_data: # Jeśli nie było błędu przetwarzania, ale brakuje nazwy
-                         skipped_rows.append({'row': i, 'reason': 'Brak wymaganej nazwy inicjatywy.'})
-
-
-        except Exception as e:
-            # Ogólny błąd przetwarzania pliku
-            errors.append(f'Wystąpił błąd podczas przetwarzania pliku: {e}')
-            # Transakcja zostanie automatycznie wycofana
-
-        if errors:
-             return Response({'errors': errors}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        else:
-            return Response({
-                'message': f'Import zakończony. Dodano {imported_count} inicjatyw.',
-                'skipped_rows': skipped_rows
-            }, status=status.HTTP_201_CREATED if imported_count > 0 else status.HTTP_200_OK)
-
-    def _read_csv(self, file_obj):
-        # Dekoduj plik jako tekst
-        decoded_file = io.StringIO(file_obj.read().decode('utf-8')) # Załóż kodowanie UTF-8
-        reader = csv.reader(decoded_file)
-        return reader
-
-    def _read_xlsx(self, file_obj):
-        workbook = openpyxl.load_workbook(file_obj, read_only=True)
-        sheet = workbook.active # Odczytaj pierwszy arkusz
-        # Zwróć iterator wierszy (każdy wiersz jako lista wartości komórek)
-        return ([cell.value if cell.value is not None else '' for cell in row] for row in sheet.iter_rows(values_only=True))
\ No newline at end of file
+            job = create_job(file_obj, mode=request.data.get('mode'), natural_key=request.data.get('key'))
+        except ImportFileError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Import działa w tle - zwróć od razu identyfikator zadania
+        submit_job(job)
+        job.refresh_from_db()
+        data = ImportJobSerializer(job).data
+        data['status_url'] = reverse('initiative-import-job', kwargs={'job_id': job.pk}, request=request)
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobView(APIView):
+    """
+    API endpoint reporting the progress of an import job.
+    GET returns the progress, DELETE requests cancellation.
+    """
+    def get(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(ImportJob, pk=job_id)
+        return Response(ImportJobSerializer(job).data)
+
+    def delete(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(ImportJob, pk=job_id)
+        if not job.is_finished:
+            job = cancel_job(job)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def metrics_view(request):
+    """
+    Request metrics of this process in the Prometheus text format.
+    Only for staff users and PERF_METRICS_ALLOWED_IPS (by REMOTE_ADDR, so
+    never list a reverse proxy there).
+    """
+    if not instrumentation_enabled():
+        raise Http404
+    allowed_ips = getattr(settings, 'PERF_METRICS_ALLOWED_IPS', ())
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+from filesToTxt import IgnoreRules, is_ignored, walk
+
+
+def ignored(patterns, rel_path, is_dir=False):
+    return is_ignored(rel_path, is_dir, [IgnoreRules(patterns)])
+
+
+class IgnoreRulesTests(unittest.TestCase):
+    def test_last_matching_rule_wins(self):
+        self.assertTrue(ignored(['*.log'], 'a/b.log'))
+        self.assertFalse(ignored(['*.log', '!keep.log'], 'keep.log'))
+        self.assertTrue(ignored(['*.log', '!keep.log', 'keep.log'], 'keep.log'))
+
+    def test_negation_without_match_keeps_file(self):
+        self.assertFalse(ignored(['!*.py'], 'main.py'))
+        self.assertFalse(ignored(['*.log'], 'main.py'))
+
+    def test_anchoring(self):
+        # Ukośnik na początku lub w środku zakotwicza wzorzec w katalogu .gitignore
+        self.assertTrue(ignored(['/build'], 'build', True))
+        self.assertFalse(ignored(['/build'], 'src/build', True))
+        self.assertTrue(ignored(['docs/out'], 'docs/out', True))
+        self.assertFalse(ignored(['docs/out'], 'x/docs/out', True))
+        self.assertTrue(ignored(['build'], 'src/build', True))
+
+    def test_dir_only_rules(self):
+        self.assertTrue(ignored(['cache/'], 'a/cache', True))
+        self.assertFalse(ignored(['cache/'], 'a/cache', False))
+
+    def test_double_star(self):
+        self.assertTrue(ignored(['**/tmp'], 'tmp', True))
+        self.assertTrue(ignored(['**/tmp'], 'a/b/tmp', True))
+        self.assertTrue(ignored(['a/**/b'], 'a/b', True))
+        self.assertTrue(ignored(['a/**/b'], 'a/x/y/b', True))
+        self.assertTrue(ignored(['logs/**'], 'logs/x/y.txt'))
+        self.assertFalse(ignored(['logs/**'], 'logs', True))
+        # Pojedyncza gwiazdka nie przechodzi przez '/'
+        self.assertFalse(ignored(['a/*.txt'], 'a/b/c.txt'))
+
+    def test_brackets(self):
+        self.assertTrue(ignored(['file[0-9].txt'], 'file3.txt'))
+        self.assertFalse(ignored(['file[0-9].txt'], 'filex.txt'))
+        self.assertTrue(ignored(['file[!0-9].txt'], 'filex.txt'))
+        self.assertTrue(ignored(['[]a]'], ']'))
+        self.assertTrue(ignored(['[]a]'], 'a'))
+        self.assertTrue(ignored(['[!]]x'], 'ax'))
+        self.assertFalse(ignored(['[!]]x'], ']x'))
+        self.assertTrue(ignored(['[[]x'], '[x'))
+        self.assertTrue(ignored(['[a&&b]'], '&'))
+
+    def test_odd_brackets_do_not_raise(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            # '[' bez zamknięcia jest znakiem dosłownym
+            self.assertTrue(ignored(['[]', '[[]x', 'x['], '[]'))
+            self.assertTrue(ignored(['x['], 'x['))
+
+
+class NestedGitignoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, rel_path, content=''):
+        path = os.path.join(self.tmp.name, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def collected(self):
+        return [rel_path for rel_path, _, _ in walk(self.tmp.name, '', [], set())]
+
+    def test_deeper_gitignore_takes_precedence(self):
+        self.write('.gitignore', '*.log\n')
+        self.write('a.log')
+        self.write('sub/.gitignore', '!keep.log\n')
+        self.write('sub/keep.log')
+        self.write('sub/other.log')
+
+        self.assertEqual(self.collected(), ['.gitignore', 'sub/.gitignore', 'sub/keep.log'])
+
+    def test_nested_rules_are_relative_to_their_directory(self):
+        self.write('sub/.gitignore', '/only\n')
+        self.write('sub/only')
+        self.write('only')
+
+        self.assertEqual(self.collected(), ['only', 'sub/.gitignore'])
+
+    def test_ignored_directory_is_not_entered(self):
+        # Wyjątek '!' nie przywraca pliku z zignorowanego katalogu
+        self.write('.gitignore', 'out/\n!out/keep.txt\n')
+        self.write('out/keep.txt')
+
+        self.assertEqual(self.collected(), ['.gitignore'])
+
+
+if __name__ == '__main__':
+    unittest.main()